@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib.externals.loky import get_reusable_executor
+
+from lead_features import engineer_features, map_probability_to_category
+from lead_model import CACHE_DIR
+from lead_inference import compile_pipeline, predict_proba_compiled
+from lead_compact import compact_path, load_compiled_model
+from lead_drift import capture_sketches, merge_sketches, load_reference_sketches, drift_report, save_sketches
+from lead_io import read_leads
+
+# ============================================================================
+# SHARDED BATCH SCORING
+# ============================================================================
+#
+# Backfills split the raw lead frame into contiguous row ranges. Each range is
+# feature-engineered and scored in a worker process; the compiled model is
+# dumped once to a joblib file that every worker memory-maps, so its node
+# tables are shared through the page cache instead of pickled per task.
+# Results come back in submission order and are concatenated as-is.
+
+MIN_SHARD_ROWS = 10000
+SHARDS_PER_WORKER = 4
+
+_worker_models = {}
+
+
+def export_shared_model(compiled, name="compiled"):
+    """Dump a compiled model for workers to memory-map; returns the absolute path"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.abspath(os.path.join(CACHE_DIR, f"{name}_{os.getpid()}.joblib"))
+    joblib.dump(compiled, path)
+    return path
+
+
+def _load_shared_model(path):
+    """Memory-map the compiled model once per worker process"""
+    if path not in _worker_models:
+        _worker_models[path] = joblib.load(path, mmap_mode="r")
+    return _worker_models[path]
+
+
+def _warm_worker(path):
+    """Import this module and map the model in a worker ahead of timed work"""
+    _load_shared_model(path)
+
+
+def _score_shard(model_path, shard, features, stats, reference_time, sketch=False):
+    """Engineer features for one row range and score it (runs in a worker process)"""
+    compiled = _load_shared_model(model_path)
+    engineer_features(shard, stats, reference_time)
+    for col in features:
+        if col not in shard.columns:
+            shard[col] = None
+    # One process per core already; threads inside would only oversubscribe
+    probability = predict_proba_compiled(compiled, shard[features], n_threads=1)
+    return (probability, capture_sketches(shard)) if sketch else probability
+
+
+def shard_bounds(n_rows, n_workers):
+    """Contiguous row ranges, a few per worker so slow shards don't stall the pool"""
+    n_shards = max(1, min(n_workers * SHARDS_PER_WORKER, n_rows // MIN_SHARD_ROWS))
+    edges = np.linspace(0, n_rows, n_shards + 1).astype(int)
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def score_sharded(df, model_path, features, stats, n_workers=None, reference_time=None, sketch=False):
+    """Score raw leads across a process pool; returns P(converted) in input order.
+
+    `model_path` is a file written by export_shared_model. All shards measure
+    recency against the same reference time. With one worker the shards are
+    scored in this process. With `sketch`, each shard also sketches its
+    engineered columns and (probability, merged sketches) is returned.
+    """
+    n_workers = n_workers or os.cpu_count() or 1
+    reference_time = pd.Timestamp.now() if reference_time is None else pd.Timestamp(reference_time)
+    bounds = shard_bounds(len(df), n_workers)
+
+    if n_workers == 1:
+        parts = [
+            _score_shard(model_path, df.iloc[start:stop].copy(), features, stats, reference_time, sketch)
+            for start, stop in bounds
+        ]
+    else:
+        # loky workers don't re-import the Streamlit script as __main__
+        pool = get_reusable_executor(max_workers=n_workers)
+        futures = [
+            pool.submit(_score_shard, model_path, df.iloc[start:stop], features, stats, reference_time, sketch)
+            for start, stop in bounds
+        ]
+        parts = [f.result() for f in futures]
+
+    if sketch:
+        sketches = {}
+        for _, part in parts:
+            sketches = merge_sketches(sketches, part)
+        parts = [probability for probability, _ in parts]
+    probability = np.concatenate(parts) if parts else np.empty(0)
+    return (probability, sketches) if sketch else probability
+
+
+def score_file(path, version=None, n_workers=None):
+    """Score a leads file with a registered model (production by default).
+
+    The drift report against the model's training data, when it has one, is
+    left in the result's attrs['drift'].
+    """
+    entry, compiled = load_compiled_model(version)
+    if entry is None:
+        raise ValueError(f"No registered model found (version={version or 'production'})")
+
+    df = read_leads(path)
+    # A compact artifact is already memory-mappable; workers map it in place
+    model_path = compact_path(entry['version'])
+    exported = not os.path.exists(model_path)
+    if exported:
+        model_path = export_shared_model(compiled, entry['version'])
+    try:
+        probability, sketches = score_sharded(
+            df, model_path, entry['features'], entry['feature_stats'], n_workers, sketch=True
+        )
+    finally:
+        if exported:
+            os.remove(model_path)
+
+    save_sketches(entry['version'], path, 'scoring', sketches, len(df))
+    reference = load_reference_sketches(entry['version'])
+    drift = drift_report(reference, sketches) if reference else None
+
+    df["lead_score"] = np.round(probability * 100).astype(int)
+    df["lead_category"] = df["lead_score"].apply(map_probability_to_category)
+    df.attrs['drift'] = drift
+    return df
+
+
+def benchmark_sharded(df, compiled, features, stats, workers=(1, 2, 4, 8)):
+    """Time sharded scoring at each worker count and check results match one worker"""
+    model_path = export_shared_model(compiled, "bench")
+    reference_time = pd.Timestamp.now()
+    results = []
+    try:
+        baseline = None
+        for n_workers in workers:
+            if n_workers > 1:
+                # Start the pool and map the model outside the timed region
+                pool = get_reusable_executor(max_workers=n_workers)
+                list(pool.map(_warm_worker, [model_path] * n_workers))
+            start = time.perf_counter()
+            probability = score_sharded(df, model_path, features, stats, n_workers, reference_time)
+            elapsed = time.perf_counter() - start
+
+            if baseline is None:
+                baseline = (probability, elapsed)
+            results.append({
+                'workers': n_workers,
+                'rows': len(df),
+                'seconds': elapsed,
+                'rows_per_sec': len(df) / elapsed if elapsed > 0 else float("inf"),
+                'speedup': baseline[1] / elapsed if elapsed > 0 else float("inf"),
+                'identical': bool(np.array_equal(baseline[0], probability)),
+            })
+    finally:
+        os.remove(model_path)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sharded multi-process lead scoring")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_score = sub.add_parser("score", help="Score a leads file with a registered model")
+    p_score.add_argument("data")
+    p_score.add_argument("--output", default="sharded_lead_scores.csv")
+    p_score.add_argument("--model-version", default=None, help="Registered version (default: production)")
+    p_score.add_argument("--workers", type=int, default=None)
+
+    p_bench = sub.add_parser("bench", help="Measure scaling across worker counts")
+    p_bench.add_argument("--data", default="5000_rental_crm_leads.xlsx")
+    p_bench.add_argument("--rows", type=int, default=1000000, help="Tile the data up to this many rows")
+    p_bench.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+
+    args = parser.parse_args()
+    if args.command == "score":
+        scored = score_file(args.data, args.model_version, args.workers)
+        scored.to_csv(args.output, index=False)
+        print(f"Scored {len(scored):,} leads -> {args.output}")
+        drift = scored.attrs.get('drift')
+        if drift:
+            print(f"Drift: max PSI {drift['max_psi']:.3f}"
+                  + (f", retraining advised ({', '.join(drift['drifted'])})" if drift['retrain_advised'] else ""))
+    else:
+        from lead_features import feature_stats, build_target, pseudo_labels
+        from lead_model import build_pipeline
+
+        raw = read_leads(args.data)
+        train = raw.copy()
+        stats = feature_stats(train)
+        features = engineer_features(train, stats)
+        X, y = build_target(train, train[features].copy())
+        if y is None:
+            y = pseudo_labels(X)
+        compiled = compile_pipeline(build_pipeline(X).fit(X, y))
+
+        repeats = -(-args.rows // len(raw))
+        df = pd.concat([raw] * repeats, ignore_index=True).head(args.rows)
+        print(json.dumps({
+            'cpu_count': os.cpu_count(),
+            'results': benchmark_sharded(df, compiled, features, stats, args.workers),
+        }, indent=2))
@@ -0,0 +1,452 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import subprocess
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from lead_features import engineer_features, feature_stats, build_target, map_probability_to_category
+from lead_model import build_pipeline
+from lead_inference import compile_pipeline, predict_proba_compiled, attach_reason_codes
+from lead_profiler import StageProfiler
+from lead_dedup import dedupe_leads
+from lead_drift import capture_sketches
+from lead_compact import compact_model
+from lead_schema import load_leads
+from lead_cube import build_cube, cube_frame
+
+# ============================================================================
+# SYNTHETIC LEAD GENERATOR
+# ============================================================================
+#
+# Mirrors the schema of 5000_rental_crm_leads.xlsx and adds the behaviour,
+# interaction, recency and label columns the app can use. Every lead gets a
+# latent intent; engagement counts, recency and conversion all rise with it,
+# so the generated labels are learnable the way real ones would be.
+
+NAMES = [
+    'Amit', 'Anjali', 'Arjun', 'Ayesha', 'Deepa', 'Karan', 'Komal', 'Meena', 'Mohit', 'Nikita',
+    'Pooja', 'Priya', 'Rahul', 'Ritesh', 'Riya', 'Rohan', 'Sahil', 'Sneha', 'Suresh', 'Vikas',
+]
+SOURCES = ['Website', 'Referral', 'Facebook', 'Google Ads', 'Instagram', 'WhatsApp']
+AREAS = [
+    'Hinjewadi', 'Thane', 'Wakad', 'Whitefield', 'Bandra', 'Kukatpally', 'Powai', 'Madhapur',
+    'Koramangala', 'Baner', 'Goregaon', 'Gachibowli', 'Andheri', 'Kharadi', 'Malad', 'Indiranagar',
+]
+USER_TYPES = ['Bachelor', 'Company Guest', 'Working Professionals', 'Family']
+MOVE_IN_TIMES = ['Immediate', 'Within 15 Days', '1 Month', '2 Months']
+BUDGET_MINS = [7000, 8000, 10000, 12000, 15000, 20000]
+BUDGET_MAXS = [12000, 15000, 18000, 20000, 25000, 30000]
+
+# Leads moving in sooner convert more often
+MOVE_IN_LIFT = np.array([0.8, 0.4, 0.0, -0.4])
+
+
+def _zipf_probs(k, skew):
+    """Category probabilities; skew=0 is uniform, larger values concentrate on the first few"""
+    weights = 1.0 / np.arange(1, k + 1) ** skew
+    return weights / weights.sum()
+
+
+def _choice(rng, values, n, skew):
+    codes = rng.choice(len(values), size=n, p=_zipf_probs(len(values), skew))
+    return np.asarray(values, dtype=object)[codes], codes
+
+
+def _calibrate_intercept(logits, target_rate):
+    """Bisect the intercept so the mean conversion probability hits target_rate"""
+    sample = logits[:100000]
+    lo, hi = -20.0, 20.0
+    for _ in range(40):
+        mid = (lo + hi) / 2
+        if (1 / (1 + np.exp(-(sample + mid)))).mean() < target_rate:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def _inject_duplicates(df, rng, duplicate_rate):
+    """Re-enter a share of leads as the last rows, with reformatted phones and name variants"""
+    n_dup = int(len(df) * duplicate_rate)
+    df['phone'] = df['phone'].astype(str)
+    if n_dup:
+        source = rng.integers(0, len(df) - n_dup, size=n_dup)
+        target = np.arange(len(df) - n_dup, len(df))
+
+        phone = df['phone'].iloc[source].reset_index(drop=True)
+        phone_style = rng.integers(0, 3, size=n_dup)
+        df.loc[target, 'phone'] = np.select(
+            [phone_style == 1, phone_style == 2],
+            ["+91 " + phone.str[:5] + " " + phone.str[5:], "0" + phone.str[:5] + "-" + phone.str[5:]],
+            phone,
+        )
+
+        name = df['name'].iloc[source].reset_index(drop=True)
+        initial = pd.Series(rng.choice(list("ABDKMPRS"), size=n_dup))
+        name_style = rng.integers(0, 3, size=n_dup)
+        df.loc[target, 'name'] = np.select(
+            [name_style == 1, name_style == 2],
+            [name.str.upper(), name + " " + initial + "."],
+            name,
+        )
+    df.attrs['injected_duplicates'] = n_dup
+    return df
+
+
+def make_leads(n, seed=42, skew=0.0, conversion_rate=0.2, missing_rate=0.02, reference_time=None,
+               duplicate_rate=0.0):
+    """Generate `n` synthetic CRM leads.
+
+    `skew` concentrates source, area, user type and move-in time on their
+    first few values (Zipf exponent; 0 reproduces the workbook's near-uniform
+    mix). `conversion_rate` sets the share of converted leads and
+    `missing_rate` blanks out that share of behaviour values and activity
+    timestamps. `duplicate_rate` re-enters that share of leads a second time
+    under a reformatted phone number and a variant of the name (phones are
+    then strings, as in messy CRM exports).
+    """
+    rng = np.random.default_rng(seed)
+    reference_time = pd.Timestamp.now().normalize() if reference_time is None else pd.Timestamp(reference_time)
+    intent = rng.standard_normal(n)
+
+    source, _ = _choice(rng, SOURCES, n, skew)
+    area, _ = _choice(rng, AREAS, n, skew)
+    user_type, _ = _choice(rng, USER_TYPES, n, skew)
+    move_in, move_in_codes = _choice(rng, MOVE_IN_TIMES, n, skew)
+    budget_min = rng.choice(BUDGET_MINS, size=n)
+    budget_max = np.maximum(rng.choice(BUDGET_MAXS, size=n), budget_min + 2000)
+
+    df = pd.DataFrame({
+        'lead_id': np.arange(1, n + 1),
+        'name': _choice(rng, NAMES, n, 0.0)[0],
+        'phone': rng.integers(9_000_000_000, 10_000_000_000, size=n),
+        'source': source,
+        'budget_min': budget_min,
+        'budget_max': budget_max,
+        'preferred_area': area,
+        'bhk': rng.integers(1, 4, size=n),
+        'user_type': user_type,
+        'move_in_time': move_in,
+        'views_count': rng.poisson(np.exp(1.2 + 0.5 * intent)).astype(float),
+        'avg_view_time_sec': np.round(rng.gamma(2.0, 30.0 * np.exp(0.3 * intent)), 1),
+        'saved_properties': rng.poisson(np.exp(-0.5 + 0.6 * intent)).astype(float),
+        'repeated_visits': rng.poisson(np.exp(0.3 + 0.4 * intent)).astype(float),
+        'whatsapp_clicks': rng.poisson(np.exp(-0.3 + 0.5 * intent)),
+        'call_clicks': rng.poisson(np.exp(-1.0 + 0.6 * intent)),
+        'chat_messages': rng.poisson(np.exp(0.2 + 0.5 * intent)),
+    })
+
+    days_inactive = rng.exponential(20.0 * np.exp(-0.5 * intent)).astype(int)
+    df['last_active_time'] = reference_time - pd.to_timedelta(days_inactive, unit='D')
+
+    if missing_rate > 0:
+        for col in ['views_count', 'avg_view_time_sec', 'saved_properties', 'repeated_visits']:
+            df.loc[rng.random(n) < missing_rate, col] = np.nan
+        df.loc[rng.random(n) < missing_rate, 'last_active_time'] = pd.NaT
+
+    logits = 1.5 * intent + MOVE_IN_LIFT[move_in_codes]
+    logits += _calibrate_intercept(logits, conversion_rate)
+    df['converted'] = (rng.random(n) < 1 / (1 + np.exp(-logits))).astype(int)
+    if duplicate_rate > 0:
+        df = _inject_duplicates(df, rng, duplicate_rate)
+    return df
+
+# ============================================================================
+# BENCHMARK HARNESS
+# ============================================================================
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+# Writing/reading .xlsx is the app's path but far too slow at scale; larger
+# inputs are staged as CSV instead, and Excel exports are skipped past this
+EXCEL_MAX_ROWS = 100_000
+
+
+def dashboard_aggregates(df):
+    """The summaries the dashboard tabs compute from scored_df"""
+    counts = df['lead_category'].value_counts()
+    summary = {
+        'total': len(df),
+        'hot': int(counts.get('Hot', 0)),
+        'avg_score': float(df['lead_score'].mean()),
+        'hot_pct': float((df['lead_score'] > 70).sum() / len(df) * 100),
+    }
+    # The analytics tabs answer from the cube, built once per scored frame
+    cube = build_cube(df)
+    if 'source' in cube['dimensions']:
+        source_stats = cube_frame(cube, ['source'])
+        summary['sources'] = len(source_stats)
+    priority = df[df['lead_category'] == 'Hot'].sort_values('lead_score', ascending=False).head(100)
+    summary['priority_rows'] = len(priority)
+    return summary
+
+
+def _stage_input(df, directory):
+    """Write the raw leads the way they'd arrive; returns (path, format)"""
+    if len(df) <= EXCEL_MAX_ROWS:
+        path = os.path.join(directory, "leads.xlsx")
+        df.to_excel(path, index=False)
+        return path, "xlsx"
+    path = os.path.join(directory, "leads.csv")
+    df.to_csv(path, index=False)
+    return path, "csv"
+
+
+def bench_size(n, seed=42, skew=0.0, train_cap=200_000, trace_memory=False):
+    """Run every pipeline stage once on `n` synthetic leads; returns (stages, info)"""
+    profiler = StageProfiler(trace_memory=trace_memory)
+    info = {'rows': n}
+
+    with profiler.stage("generate"):
+        raw = make_leads(n, seed=seed, skew=skew)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path, fmt = _stage_input(raw, directory)
+        info['input_format'] = fmt
+        del raw
+        with profiler.stage("load_data"):
+            df = load_leads(path)
+        info['reader'] = df.attrs['reader']['engine']
+
+    with profiler.stage("dedup"):
+        df, dedup = dedupe_leads(df)
+    info['duplicates_merged'] = dedup['duplicates_merged']
+
+    with profiler.stage("feature_stats"):
+        stats = feature_stats(df)
+    features = engineer_features(df, stats, profiler=profiler)
+
+    with profiler.stage("sketch"):
+        capture_sketches(df)
+
+    with profiler.stage("target"):
+        X, y = build_target(df, df[features].copy())
+
+    # Train on a capped sample so the largest sizes still finish
+    train_rows = min(len(X), train_cap)
+    info['train_rows'] = train_rows
+    with profiler.stage("fit"):
+        sample = X.sample(train_rows, random_state=seed) if train_rows < len(X) else X
+        pipeline = build_pipeline(X).fit(sample, y.loc[sample.index])
+
+    with profiler.stage("compile"):
+        compiled = compile_pipeline(pipeline)
+
+    # Scored with the compact model, as the app does after training
+    with profiler.stage("compact"):
+        holdout = X.sample(min(len(X), 50_000), random_state=seed + 1)
+        compiled, compaction = compact_model(compiled, holdout, y.loc[holdout.index])
+    info['compact_trees'] = compaction['trees_after']
+
+    with profiler.stage("score"):
+        probability = predict_proba_compiled(compiled, X)
+        df["lead_score"] = np.round(probability * 100).astype(int)
+
+    with profiler.stage("categorize"):
+        df["lead_category"] = df["lead_score"].apply(map_probability_to_category)
+
+    with profiler.stage("explain"):
+        attach_reason_codes(df, compiled, features)
+
+    with profiler.stage("dashboard"):
+        dashboard_aggregates(df)
+
+    with profiler.stage("export_csv"):
+        df.to_csv(index=False)
+
+    if len(df) <= EXCEL_MAX_ROWS:
+        with profiler.stage("export_excel"):
+            output = BytesIO()
+            with pd.ExcelWriter(output, engine='openpyxl') as writer:
+                df.to_excel(writer, index=False, sheet_name='Scored Leads')
+
+    return profiler.stages, info
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, seed=42, skew=0.0, train_cap=200_000, trace_memory=False, log=print):
+    """Benchmark each size in turn; a size that fails (e.g. out of memory) is recorded and skipped"""
+    results = {
+        'meta': {
+            'timestamp': pd.Timestamp.now().isoformat(),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'seed': seed,
+            'skew': skew,
+            'train_cap': train_cap,
+        },
+        'runs': [],
+    }
+    for n in sizes:
+        log(f"Benchmarking {n:,} leads...")
+        start = time.perf_counter()
+        try:
+            stages, info = bench_size(n, seed, skew, train_cap, trace_memory)
+        except MemoryError:
+            results['runs'].append({'rows': n, 'error': 'MemoryError'})
+            log(f"  {n:,} leads: out of memory, skipped")
+            continue
+        for stage in stages:
+            stage['rows_per_sec'] = n / stage['wall_sec'] if stage['wall_sec'] > 0 else None
+        results['runs'].append(dict(info, total_sec=time.perf_counter() - start, stages=stages))
+        log(f"  {n:,} leads: {time.perf_counter() - start:.1f}s")
+    return results
+
+
+def compare_results(current, baseline, tolerance=0.25, min_seconds=0.05):
+    """Stages that got more than `tolerance` slower than the baseline run of the same size"""
+    base = {
+        (run['rows'], s['stage']): s['wall_sec']
+        for run in baseline.get('runs', []) for s in run.get('stages', [])
+    }
+    regressions = []
+    for run in current['runs']:
+        for s in run.get('stages', []):
+            before = base.get((run['rows'], s['stage']))
+            if before is None or max(before, s['wall_sec']) < min_seconds:
+                continue
+            if s['wall_sec'] > before * (1 + tolerance):
+                regressions.append({
+                    'rows': run['rows'],
+                    'stage': s['stage'],
+                    'baseline_sec': before,
+                    'current_sec': s['wall_sec'],
+                    'ratio': s['wall_sec'] / before,
+                })
+    return regressions
+
+
+# ============================================================================
+# STARTUP BENCHMARK
+# ============================================================================
+
+# Runs in a fresh interpreter so every import is cold
+_STARTUP_PROBE = """
+import sys, json, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+result = {'streamlit_import_sec': time.perf_counter() - start}
+
+at = AppTest.from_file(sys.argv[1], default_timeout=300)
+start = time.perf_counter()
+at.run()
+result['login_cold_sec'] = time.perf_counter() - start
+result['login_modules'] = {m: m in sys.modules for m in ('sklearn', 'plotly', 'pyarrow', 'scipy')}
+
+start = time.perf_counter()
+at.run()
+result['login_warm_sec'] = time.perf_counter() - start
+
+at.session_state['logged_in'] = True
+at.session_state['user'] = {'id': 1, 'username': 'admin', 'role': sys.argv[2], 'is_active': 1, 'session_token': 'bench'}
+start = time.perf_counter()
+at.run()
+result['dashboard_first_sec'] = time.perf_counter() - start
+result['errors'] = [str(e.value) for e in at.exception]
+print(json.dumps(result))
+"""
+
+
+def measure_startup(app_dir=None, repeats=3, role="admin"):
+    """Cold-start and login-page render times of the Streamlit app (medians over fresh processes)"""
+    import shutil
+
+    app_dir = app_dir or os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as work:
+            # A scratch copy so the run starts from an empty database
+            for name in os.listdir(app_dir):
+                src = os.path.join(app_dir, name)
+                if name.endswith((".py", ".xlsx")):
+                    shutil.copy(src, work)
+                elif name == "assets" and os.path.isdir(src):
+                    shutil.copytree(src, os.path.join(work, name))
+            out = subprocess.check_output(
+                [sys.executable, "-c", _STARTUP_PROBE, os.path.join(work, "lead_scoring.py"), role],
+                cwd=work, stderr=subprocess.DEVNULL
+            )
+            samples.append(json.loads(out.decode().strip().splitlines()[-1]))
+
+    timings = {
+        key: float(np.median([s[key] for s in samples]))
+        for key in samples[0] if key.endswith("_sec")
+    }
+    return dict(timings, login_modules=samples[-1]['login_modules'], errors=samples[-1]['errors'], repeats=repeats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic lead generator and pipeline benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_gen = sub.add_parser("generate", help="Write a synthetic leads file (.xlsx, .csv or .parquet)")
+    p_gen.add_argument("--rows", type=int, default=5000)
+    p_gen.add_argument("--output", default="synthetic_leads.xlsx")
+    p_gen.add_argument("--seed", type=int, default=42)
+    p_gen.add_argument("--skew", type=float, default=0.0)
+    p_gen.add_argument("--conversion-rate", type=float, default=0.2)
+    p_gen.add_argument("--duplicate-rate", type=float, default=0.0)
+
+    p_run = sub.add_parser("run", help="Time every pipeline stage at several sizes")
+    p_run.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    p_run.add_argument("--output", default="bench_results.json")
+    p_run.add_argument("--seed", type=int, default=42)
+    p_run.add_argument("--skew", type=float, default=0.0)
+    p_run.add_argument("--train-cap", type=int, default=200_000)
+    p_run.add_argument("--trace-memory", action="store_true")
+    p_run.add_argument("--compare", default=None, help="Baseline results file; exit 1 on regressions")
+    p_run.add_argument("--tolerance", type=float, default=0.25)
+
+    p_start = sub.add_parser("startup", help="Measure cold-start and login-page render times")
+    p_start.add_argument("--repeats", type=int, default=3)
+    p_start.add_argument("--output", default=None)
+
+    args = parser.parse_args()
+    if args.command == "startup":
+        result = measure_startup(repeats=args.repeats)
+        print(json.dumps(result, indent=2))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(result, f, indent=2)
+    elif args.command == "generate":
+        leads = make_leads(args.rows, args.seed, args.skew, args.conversion_rate,
+                           duplicate_rate=args.duplicate_rate)
+        if args.output.endswith(".csv"):
+            leads.to_csv(args.output, index=False)
+        elif args.output.endswith(".parquet"):
+            leads.to_parquet(args.output, index=False)
+        else:
+            leads.to_excel(args.output, index=False)
+        print(f"Wrote {len(leads):,} leads -> {args.output}")
+    else:
+        results = run_benchmarks(args.sizes, args.seed, args.skew, args.train_cap, args.trace_memory)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+        print(f"Results -> {args.output}")
+
+        if args.compare:
+            with open(args.compare) as f:
+                regressions = compare_results(results, json.load(f), args.tolerance)
+            for r in regressions:
+                print(f"REGRESSION {r['rows']:,} rows / {r['stage']}: "
+                      f"{r['baseline_sec']:.3f}s -> {r['current_sec']:.3f}s ({r['ratio']:.2f}x)")
+            sys.exit(1 if regressions else 0)
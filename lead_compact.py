@@ -0,0 +1,325 @@
+import os
+import json
+import time
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from lead_features import map_probability_to_category
+from lead_model import MODEL_DIR, get_registered_models, roc_auc_np
+from lead_inference import compile_pipeline, predict_proba_compiled, index_cuts, to_cells, transform_compiled
+
+# ============================================================================
+# COMPACT MODEL ARTIFACTS
+# ============================================================================
+#
+# A compiled forest is shrunk in three steps:
+#   - trees: ranked by holdout AUC, the shortest prefix is kept whose AUC is
+#     within AUC_TOLERANCE of the full forest and whose scores move less than
+#     MAX_SCORE_SHIFT points on average
+#   - values: node probabilities become uint8 (p * 255); subtrees whose
+#     leaves all quantize to the same value collapse into one leaf
+#   - splits: thresholds are stored as float32, rounded down, so comparisons
+#     stay exact for the float32 features the preprocessor produces; node
+#     tables use the narrowest integer types that fit
+#
+# Trees are picked on one half of the holdout and the compact model is
+# evaluated on the other, so the metrics reported for a version are those of
+# the artifact that actually serves it, measured on leads that played no part
+# in pruning it.
+#
+# The result keeps the compiled layout, so every scorer runs it unchanged.
+# It's saved as an uncompressed joblib file next to the registered pipeline
+# and memory-mapped on load: no sklearn objects are unpickled, and processes
+# serving the same model share its pages.
+
+AUC_TOLERANCE = 0.005
+MAX_SCORE_SHIFT = 0.5
+MIN_TREES = 10
+LEAF_LEVELS = 255
+# Holdouts smaller than this per half select and evaluate on the same leads
+MIN_EVAL_ROWS = 20
+
+
+def compact_path(version):
+    """Compact artifact path of a registered version (next to its pipeline)"""
+    return os.path.join(MODEL_DIR, f"model_{version}.compact.joblib")
+
+
+def _tree_bounds(compiled):
+    """(start, end) node offsets of every tree"""
+    roots = np.asarray(compiled['roots'])
+    return np.stack([roots, np.r_[roots[1:], len(compiled['feature'])]], axis=1)
+
+
+def _tree_predictions(compiled, cells):
+    """P(converted) from each tree separately, shape (rows, trees)"""
+    feature, rank, children = compiled['feature'], compiled['rank'], compiled['children']
+    leaf_value = compiled['leaf_value'].astype(np.float64) / compiled['leaf_scale']
+    flat = cells.ravel()
+    row_base = np.arange(len(cells), dtype=np.intp) * cells.shape[1]
+    out = np.empty((len(cells), len(compiled['roots'])))
+    for t, root in enumerate(compiled['roots']):
+        node = np.full(len(cells), root, dtype=np.intp)
+        for _ in range(compiled['max_depth']):
+            go_left = flat[row_base + feature[node]] <= rank[node]
+            node = children[2 * node + go_left]
+        out[:, t] = leaf_value[node]
+    return out
+
+
+def select_trees(compiled, X, y, auc_tolerance=AUC_TOLERANCE, max_score_shift=MAX_SCORE_SHIFT):
+    """Indices of the trees to keep, plus the holdout AUC before and after"""
+    per_tree = _tree_predictions(compiled, to_cells(compiled, transform_compiled(compiled, X)))
+    n_trees = per_tree.shape[1]
+    full = per_tree.mean(axis=1)
+    y = np.asarray(y)
+    if len(np.unique(y)) < 2:
+        # No AUC to hold on to without both classes; keep the forest whole
+        return np.arange(n_trees), None, None
+
+    full_auc = roc_auc_np(y, full)
+    order = np.argsort([-roc_auc_np(y, per_tree[:, t]) for t in range(n_trees)], kind="stable")
+    running = np.cumsum(per_tree[:, order], axis=1)
+    for k in range(min(MIN_TREES, n_trees), n_trees + 1):
+        scores = running[:, k - 1] / k
+        shift = np.mean(np.abs(np.round(scores * 100) - np.round(full * 100)))
+        auc = roc_auc_np(y, scores)
+        if auc >= full_auc - auc_tolerance and shift <= max_score_shift:
+            break
+    return np.sort(order[:k]), full_auc, auc
+
+
+def _floor_float32(values):
+    """Largest float32 not above each value, so float32 x <= t keeps its outcome"""
+    rounded = values.astype(np.float32)
+    over = rounded.astype(np.float64) > values
+    rounded[over] = np.nextafter(rounded[over], np.float32(-np.inf))
+    return rounded
+
+
+def _split_thresholds(compiled, leaf):
+    """Float threshold of every split node, recovered from its feature's cut points"""
+    threshold = np.zeros(len(compiled['feature']))
+    for f, f_cuts in enumerate(compiled['cuts']):
+        on_f = (compiled['feature'] == f) & ~leaf
+        threshold[on_f] = f_cuts[compiled['rank'][on_f]]
+    return threshold
+
+
+def _narrowest(max_value):
+    """Smallest signed integer type holding 0..max_value"""
+    for dtype in (np.int16, np.int32):
+        if max_value < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def compact_forest(compiled, trees):
+    """Rebuild the kept trees with uint8 node values, collapsed subtrees and float32 thresholds"""
+    children = np.asarray(compiled['children'])
+    right, left = children[0::2], children[1::2]
+    node_ids = np.arange(len(left))
+    leaf = left == node_ids
+    quantized = np.round(compiled['leaf_value'] / compiled['leaf_scale'] * LEAF_LEVELS).astype(np.uint8)
+    threshold = _split_thresholds(compiled, leaf)
+
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for start, end in _tree_bounds(compiled)[trees]:
+        l, r = left[start:end] - start, right[start:end] - start
+        is_leaf = leaf[start:end]
+        lo = quantized[start:end].copy()
+        hi = lo.copy()
+        # Children always come after their parent, so one reverse pass bounds every subtree
+        for i in range(end - start - 1, -1, -1):
+            if not is_leaf[i]:
+                lo[i] = min(lo[l[i]], lo[r[i]])
+                hi[i] = max(hi[l[i]], hi[r[i]])
+        collapsed = is_leaf | (lo == hi)
+
+        # Breadth-first renumbering of the nodes still reachable
+        order, depth = [0], [0]
+        k = 0
+        while k < len(order):
+            i = order[k]
+            if not collapsed[i]:
+                order += [l[i], r[i]]
+                depth += [depth[k] + 1] * 2
+            k += 1
+        order = np.asarray(order)
+        remap = np.zeros(end - start, dtype=np.intp)
+        remap[order] = np.arange(len(order))
+        now_leaf = collapsed[order]
+
+        own = np.arange(len(order))
+        lefts.append(np.where(now_leaf, own, remap[l[order]]) + offset)
+        rights.append(np.where(now_leaf, own, remap[r[order]]) + offset)
+        features.append(np.where(now_leaf, -1, compiled['feature'][start + order]))
+        thresholds.append(threshold[start + order])
+        # A collapsed subtree's leaves all share lo (== hi)
+        values.append(np.where(now_leaf, lo[order], quantized[start + order]))
+        roots.append(offset)
+        offset += len(order)
+        max_depth = max(max_depth, max(depth))
+
+    n_features = compiled['n_features']
+    threshold = np.concatenate(thresholds)
+    feature = np.concatenate(features)
+    max_cuts = max([len(np.unique(threshold[feature == f])) for f in range(n_features)] + [0])
+    feature, rank, cuts, multipliers = index_cuts(
+        feature, _floor_float32(threshold), n_features, rank_dtype=_narrowest(max_cuts + 1)
+    )
+    node_dtype = _narrowest(2 * offset + 1)
+    children = np.stack([np.concatenate(rights), np.concatenate(lefts)], axis=1).ravel()
+    return dict(
+        compiled,
+        feature=feature.astype(_narrowest(n_features)),
+        rank=rank,
+        children=children.astype(node_dtype),
+        leaf_value=np.concatenate(values).astype(np.uint8),
+        leaf_scale=float(LEAF_LEVELS),
+        roots=np.asarray(roots, dtype=node_dtype),
+        cuts=cuts,
+        cell_multipliers=multipliers,
+        max_depth=int(max_depth),
+    )
+
+
+def compact_model(compiled, X, y, auc_tolerance=AUC_TOLERANCE, max_score_shift=MAX_SCORE_SHIFT):
+    """Prune and quantize a compiled model against holdout leads; returns (compact, report)"""
+    start = time.perf_counter()
+    trees, auc_before, auc_after = select_trees(compiled, X, y, auc_tolerance, max_score_shift)
+    compact = compact_forest(compiled, trees)
+
+    before = predict_proba_compiled(compiled, X)
+    after = predict_proba_compiled(compact, X)
+    scores_before = np.round(before * 100)
+    scores_after = np.round(after * 100)
+    categories = (pd.Series(scores_before).map(map_probability_to_category).to_numpy()
+                  == pd.Series(scores_after).map(map_probability_to_category).to_numpy())
+    if auc_before is not None:
+        auc_after = roc_auc_np(np.asarray(y), after)
+    report = {
+        'trees_before': len(compiled['roots']),
+        'trees_after': len(compact['roots']),
+        'nodes_before': len(compiled['feature']),
+        'nodes_after': len(compact['feature']),
+        'auc_before': auc_before,
+        'auc_after': auc_after,
+        'max_abs_diff': float(np.max(np.abs(before - after))) if len(X) else 0.0,
+        'mean_score_shift': float(np.mean(np.abs(scores_before - scores_after))) if len(X) else 0.0,
+        'same_score': float(np.mean(scores_before == scores_after)) if len(X) else 1.0,
+        'same_category': float(np.mean(categories)) if len(X) else 1.0,
+        'elapsed_sec': time.perf_counter() - start,
+    }
+    return compact, report
+
+
+def split_holdout(X, y, min_rows=MIN_EVAL_ROWS):
+    """(X_select, X_eval, y_select, y_eval): trees are chosen on one half, the compact model scored on the other.
+
+    A holdout too small to split, or with a class too rare to stratify, serves as both.
+    """
+    y = pd.Series(np.asarray(y), index=X.index)
+    counts = y.value_counts()
+    if len(X) < 2 * min_rows or counts.min() < 2:
+        return X, X, y, y
+    from sklearn.model_selection import train_test_split
+    return train_test_split(X, y, test_size=0.5, random_state=42, stratify=y if len(counts) > 1 else None)
+
+
+def holdout_metrics(compiled, X, y):
+    """(accuracy, ROC AUC) of a compiled model on labelled leads; AUC is None without both classes"""
+    proba = predict_proba_compiled(compiled, X)
+    y = np.asarray(y)
+    accuracy = float(np.mean((proba > 0.5).astype(y.dtype) == y)) if len(y) else 0.0
+    roc_auc = roc_auc_np(y, proba) if len(np.unique(y)) == 2 else None
+    return accuracy, roc_auc
+
+
+def save_compact(compact, path):
+    """Write an uncompressed artifact (memory-mappable) under a temporary name, then rename"""
+    tmp = f"{path}.tmp"
+    joblib.dump(compact, tmp)
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def load_compact(path):
+    """Memory-map a compact artifact read-only"""
+    return joblib.load(path, mmap_mode="r")
+
+
+def load_compiled_model(version=None):
+    """Registry entry and compiled model (production when version is None).
+
+    Uses the version's compact artifact when it has one, so every scorer of a
+    version agrees; otherwise compiles the pickled pipeline.
+    """
+    for entry in get_registered_models():
+        if (version is None and entry['is_production']) or entry['version'] == version:
+            path = compact_path(entry['version'])
+            if os.path.exists(path):
+                return entry, load_compact(path)
+            return entry, compile_pipeline(joblib.load(entry['path']))
+    return None, None
+
+
+def save_registered(version, compact, report):
+    """Save a compact artifact beside its registered pipeline, adding both sizes to the report"""
+    report['artifact_bytes'] = save_compact(compact, compact_path(version))
+    report['pipeline_bytes'] = os.path.getsize(os.path.join(MODEL_DIR, f"model_{version}.joblib"))
+    return report
+
+
+def compact_registered(version, compiled, X, y, auc_tolerance=AUC_TOLERANCE):
+    """Compact a registered model against holdout leads and save the artifact beside its pipeline"""
+    compact, report = compact_model(compiled, X, y, auc_tolerance)
+    return compact, save_registered(version, compact, report)
+
+
+def benchmark_load(entry, repeats=5):
+    """Load time of the pickled pipeline (plus compiling it) versus the memory-mapped artifact"""
+    timings = {}
+    for label, load in [
+        ('pipeline', lambda: compile_pipeline(joblib.load(entry['path']))),
+        ('compact', lambda: load_compact(compact_path(entry['version']))),
+    ]:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            load()
+        timings[label + '_load_ms'] = (time.perf_counter() - start) / repeats * 1000
+    return timings
+
+
+if __name__ == "__main__":
+    from sklearn.model_selection import train_test_split
+    from lead_features import build_target, pseudo_labels
+    from lead_featstore import engineer_features_cached
+    from lead_model import load_registered_model
+    from lead_io import read_leads
+
+    parser = argparse.ArgumentParser(description="Compact model artifacts")
+    parser.add_argument("data", help="Leads to measure AUC and parity on (labels or pseudo-labels)")
+    parser.add_argument("--model-version", default=None, help="Registered version (default: production)")
+    parser.add_argument("--auc-tolerance", type=float, default=AUC_TOLERANCE)
+
+    args = parser.parse_args()
+    pipeline, entry = load_registered_model(args.model_version)
+    if pipeline is None:
+        raise SystemExit(f"No registered model found (version={args.model_version or 'production'})")
+
+    df = read_leads(args.data)
+    engineer_features_cached(df, entry['feature_stats'])
+    X, y = build_target(df, df[entry['features']].copy())
+    if y is None:
+        y = pseudo_labels(X)
+    _, X_test, _, y_test = train_test_split(X, y, test_size=0.25, random_state=42)
+
+    _, report = compact_registered(entry['version'], compile_pipeline(pipeline), X_test, y_test, args.auc_tolerance)
+    report.update(benchmark_load(entry))
+    print(json.dumps(report, indent=2, default=float))
@@ -0,0 +1,183 @@
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# ANALYTICS CUBE
+# ============================================================================
+#
+# The analytics tab slices scored leads by their profile columns. Instead of
+# regrouping the scored frame on every rerun, the scoring run builds a dense
+# cube once: each dimension is factorized to integer codes, the codes are
+# combined into one flat cell index, and np.bincount accumulates lead counts,
+# score sums and Hot/Warm/Cold counts per cell in a single pass each.
+# A drill-down (group by some dimensions, filter on others) then only slices
+# and sums these small arrays, independent of the number of leads.
+#
+# Rare members beyond MAX_MEMBERS per dimension are folded into OTHER so a
+# free-text column can't blow up the cell count, and while the product of
+# the dimension sizes exceeds MAX_CELLS the largest dimension folds more of
+# its rarest members; missing values get their own MISSING member.
+
+CUBE_DIMENSIONS = ["source", "preferred_area", "bhk", "user_type", "move_in_time"]
+CATEGORIES = ["Hot", "Warm", "Cold"]
+MAX_MEMBERS = 60
+MAX_CELLS = 100_000
+OTHER = "Other"
+MISSING = "(missing)"
+
+
+def _encode(values, max_members=MAX_MEMBERS):
+    """(codes, member labels) of a dimension column, most frequent members first"""
+    values = pd.Series(values).astype(object).where(pd.Series(values).notna(), MISSING)
+    counts = values.value_counts(sort=True)
+    members = counts.index[:max_members].tolist()
+    if len(counts) > max_members:
+        members.append(OTHER)
+    codes = pd.Index(members).get_indexer(values)
+    codes[codes < 0] = len(members) - 1
+    return codes, np.array(members, dtype=object)
+
+
+def _member_limits(df, dimensions, max_members=MAX_MEMBERS, max_cells=MAX_CELLS):
+    """Members kept per dimension so the cube has at most max_cells cells (OTHER counts as one)"""
+    distinct = {dim: df[dim].nunique(dropna=False) for dim in dimensions}
+    limits = {dim: min(n, max_members) for dim, n in distinct.items()}
+
+    def size(dim):
+        return limits[dim] + (limits[dim] < distinct[dim])
+
+    while dimensions and np.prod([size(d) for d in dimensions], dtype=float) > max_cells:
+        widest = max(dimensions, key=size)
+        if limits[widest] <= 1:
+            break
+        limits[widest] = max(1, limits[widest] - max(1, limits[widest] // 10))
+    return limits
+
+
+def build_cube(df, dimensions=CUBE_DIMENSIONS, score_col="lead_score", category_col="lead_category",
+               max_cells=MAX_CELLS):
+    """Counts, score sums and per-category counts of scored leads over every combination of the dimensions"""
+    start = time.perf_counter()
+    dimensions = [d for d in dimensions if d in df.columns]
+    limits = _member_limits(df, dimensions, max_cells=max_cells)
+    codes, members = [], {}
+    for dim in dimensions:
+        dim_codes, members[dim] = _encode(df[dim], limits[dim])
+        codes.append(dim_codes)
+    shape = tuple(len(members[d]) for d in dimensions)
+    size = int(np.prod(shape)) if shape else 1
+    flat = np.ravel_multi_index(codes, shape) if codes else np.zeros(len(df), dtype=np.intp)
+
+    score = pd.to_numeric(df[score_col], errors="coerce").fillna(0).to_numpy(dtype=float)
+    category = pd.Index(CATEGORIES).get_indexer(df[category_col])
+    # One bincount over (cell, category) pairs; leads without a category only count towards totals
+    labelled = category >= 0
+    by_category = np.bincount(flat[labelled] * len(CATEGORIES) + category[labelled], minlength=size * len(CATEGORIES))
+
+    return {
+        'dimensions': dimensions,
+        'members': members,
+        'count': np.bincount(flat, minlength=size).reshape(shape),
+        'score_sum': np.bincount(flat, weights=score, minlength=size).reshape(shape),
+        'categories': by_category.reshape(shape + (len(CATEGORIES),)),
+        'rows': len(df),
+        'build_sec': time.perf_counter() - start,
+    }
+
+
+def _selector(cube, dim, values):
+    """Member positions of a dimension matching the filter values (compared as strings too, for widget input)"""
+    members = cube['members'][dim]
+    wanted = set(values) | {str(v) for v in values}
+    return np.array([i for i, m in enumerate(members) if m in wanted or str(m) in wanted], dtype=np.intp)
+
+
+def rollup(cube, by=(), where=None):
+    """Totals of the cells matching `where` ({dimension: [members]}), grouped by the `by` dimensions.
+
+    Returns (members of each `by` dimension, count, score_sum, categories),
+    the arrays shaped by the `by` dimensions in their given order.
+    """
+    count, score_sum, categories = cube['count'], cube['score_sum'], cube['categories']
+    dims = cube['dimensions']
+    index = [slice(None)] * len(dims)
+    for dim, values in (where or {}).items():
+        if dim in dims and values:
+            index[dims.index(dim)] = _selector(cube, dim, values)
+    if any(isinstance(i, np.ndarray) for i in index):
+        # np.ix_ keeps the filtered axes independent (an outer product, not a zip)
+        ix = np.ix_(*[i if isinstance(i, np.ndarray) else np.arange(n) for i, n in zip(index, count.shape)])
+        count, score_sum, categories = count[ix], score_sum[ix], categories[ix + (slice(None),)]
+
+    keep = [dims.index(d) for d in by]
+    drop = tuple(i for i in range(len(dims)) if i not in keep)
+    count, score_sum, categories = count.sum(axis=drop), score_sum.sum(axis=drop), categories.sum(axis=drop)
+    # Summing leaves the kept axes in cube order; put them in the requested order
+    order = np.argsort(np.argsort(keep))
+    count, score_sum = count.transpose(order), score_sum.transpose(order)
+    categories = categories.transpose(tuple(order) + (len(keep),))
+    labels = []
+    for d in by:
+        selected = index[dims.index(d)]
+        labels.append(cube['members'][d] if isinstance(selected, slice) else cube['members'][d][selected])
+    return labels, count, score_sum, categories
+
+
+def cube_frame(cube, by, where=None, min_count=1):
+    """Drill-down table: one row per combination of the `by` members with leads, sorted by average score"""
+    labels, count, score_sum, categories = rollup(cube, by, where)
+    # The grand total (no `by`) is a single cell
+    count, score_sum = np.atleast_1d(count), np.atleast_1d(score_sum)
+    categories = categories.reshape(count.shape + (len(CATEGORIES),))
+    cells = count >= min_count
+    positions = np.nonzero(cells)
+    data = {d: labels[i][positions[i]] for i, d in enumerate(by)}
+    data['Count'] = count[cells]
+    data['Avg Score'] = np.round(score_sum[cells] / count[cells], 2)
+    for j, category in enumerate(CATEGORIES):
+        data[f"{category} Leads"] = categories[..., j][cells]
+    frame = pd.DataFrame(data).sort_values('Avg Score', ascending=False)
+    return frame.set_index(list(by)) if by else frame
+
+
+def benchmark_cube(df, drilldowns=None, repeats=200):
+    """Cube build time, then per-query latency of cube drill-downs against groupby on the scored frame"""
+    drilldowns = drilldowns or [
+        (['source'], None),
+        (['preferred_area', 'bhk'], None),
+        (['source'], {'bhk': [2, 3], 'user_type': ['Family']}),
+        (['move_in_time', 'user_type'], {'source': ['Website']}),
+    ]
+    cube = build_cube(df)
+    results = {'rows': len(df), 'cells': int(cube['count'].size), 'build_sec': cube['build_sec'], 'queries': []}
+    for by, where in drilldowns:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            rollup(cube, by, where)
+        cube_us = (time.perf_counter() - start) / repeats * 1e6
+
+        start = time.perf_counter()
+        for _ in range(max(1, repeats // 20)):
+            frame = df
+            for dim, values in (where or {}).items():
+                frame = frame[frame[dim].isin(values)]
+            frame.groupby(by).agg(count=('lead_score', 'size'), avg=('lead_score', 'mean'),
+                                  hot=('lead_category', lambda x: (x == 'Hot').sum()))
+        groupby_us = (time.perf_counter() - start) / max(1, repeats // 20) * 1e6
+        results['queries'].append({'by': by, 'where': where, 'cube_us': cube_us, 'groupby_us': groupby_us})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the analytics cube over scored leads and time drill-downs")
+    parser.add_argument("data", help="Scored leads (with lead_score and lead_category)")
+    parser.add_argument("--repeats", type=int, default=200)
+
+    args = parser.parse_args()
+    from lead_io import read_leads
+
+    print(json.dumps(benchmark_cube(read_leads(args.data), repeats=args.repeats), indent=2, default=str))
@@ -0,0 +1,250 @@
+import json
+import time
+import argparse
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# DATETIME INGESTION
+# ============================================================================
+#
+# pd.to_datetime without a format guesses one from the first value, and
+# mixed CRM exports then need per-element parsing (format="mixed"), which
+# goes through dateutil one string at a time. Here the format is detected
+# once from a sample: every candidate in DATE_FORMATS is tried on up to
+# DETECT_SAMPLE distinct values and the one parsing most of them wins
+# (day-first before month-first, as Indian CRMs write dates). The column is
+# then parsed vectorized with that explicit format; rows it leaves unparsed
+# get a format of their own, up to MAX_FORMATS per column.
+#
+# Numbers (or numeric strings) in the Excel serial range are converted as
+# serial dates directly. Detection runs on every load; the formats that
+# parsed an export layout's column before are only preferred, winning when
+# they parse at least as much of the sample as any other candidate. A
+# column never mixes a format with its day/month swap: rows only the swap
+# would parse are reported as ambiguous. Rows that no format parses are
+# reported, never guessed at.
+
+DATE_FORMATS = [
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S",
+    "%Y/%m/%d %H:%M:%S", "%Y/%m/%d",
+    "%d-%m-%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%d-%m-%Y",
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y", "%d/%m/%Y %I:%M %p",
+    "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%m/%d/%Y", "%m/%d/%Y %I:%M %p",
+    "%d %b %Y", "%d %b %Y %H:%M", "%d-%b-%Y", "%d %B %Y", "%b %d, %Y", "%B %d, %Y",
+    "ISO8601",
+]
+DETECT_SAMPLE = 500
+MAX_FORMATS = 4
+MAX_REPORTED_ROWS = 20
+
+# Serial day numbers 20000-80000 are 1954-2119; the 1900 system counts from 1899-12-30
+EXCEL_SERIAL_RANGE = (20000, 80000)
+EXCEL_EPOCH = "1899-12-30"
+
+
+def _to_datetime(values, fmt):
+    """Parse with one explicit format; unparseable values become NaT, offsets are normalised to naive UTC"""
+    return pd.to_datetime(values, format=fmt, errors="coerce", utc=True).dt.tz_convert(None)
+
+
+def swapped_format(fmt):
+    """The format with day and month exchanged, or None when it doesn't have both"""
+    if "%d" not in fmt or "%m" not in fmt:
+        return None
+    return fmt.replace("%d", "\0").replace("%m", "%d").replace("\0", "%m")
+
+
+def detect_format(values, formats=DATE_FORMATS, sample_size=DETECT_SAMPLE):
+    """The candidate format parsing most of a sample of distinct strings, or None if none parses any.
+
+    Ties go to the earlier candidate.
+    """
+    sample = pd.Series(pd.unique(values[:sample_size * 20]))
+    if len(sample) > sample_size:
+        sample = sample.sample(sample_size, random_state=42)
+    best, best_rate = None, 0.0
+    for fmt in formats:
+        rate = _to_datetime(sample, fmt).notna().mean()
+        if rate > best_rate:
+            best, best_rate = fmt, rate
+            if rate == 1.0:
+                break
+    return best
+
+
+def parse_datetimes(values, formats=None):
+    """Parse a column of dates vectorized; returns (datetime Series, report).
+
+    Each pass detects the best format for the rows still unparsed; the
+    preferred `formats` (e.g. from the source's cache) win ties. The report
+    lists the formats that parsed anything, those not among the preferred,
+    the Excel serials converted, the rows only a day/month swap of a format
+    already used would parse (ambiguous) and the rows no format parsed.
+    """
+    start = time.perf_counter()
+    series = pd.Series(values)
+    report = {'formats': [], 'detected': [], 'excel_serials': 0, 'ambiguous': 0, 'ambiguous_rows': [],
+              'failed': 0, 'failed_rows': [], 'failed_examples': []}
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if series.dt.tz is not None:
+            series = series.dt.tz_convert(None)
+        report['elapsed_sec'] = time.perf_counter() - start
+        return series, report
+
+    out = np.full(len(series), np.datetime64("NaT"), dtype="datetime64[us]")
+    present = series.notna().to_numpy()
+    ambiguous = np.zeros(len(series), dtype=bool)
+
+    numbers = series if pd.api.types.is_numeric_dtype(series) else pd.to_numeric(series, errors="coerce")
+    numbers = numbers.to_numpy(dtype=float, na_value=np.nan)
+    serial = (numbers >= EXCEL_SERIAL_RANGE[0]) & (numbers <= EXCEL_SERIAL_RANGE[1])
+    if serial.any():
+        # Serial days to whole microseconds since the epoch; float days carry sub-microsecond noise
+        micros = np.round(numbers[serial] * 86_400_000_000).astype("int64")
+        out[serial] = np.datetime64(EXCEL_EPOCH, "us") + micros.astype("timedelta64[us]")
+        report['excel_serials'] = int(serial.sum())
+
+    if not pd.api.types.is_numeric_dtype(series):
+        remaining = present & ~serial
+        text = series.astype("str").str.strip()
+        preferred = list(formats or [])
+        candidates = list(dict.fromkeys(preferred + DATE_FORMATS))
+        while remaining.any() and len(report['formats']) < MAX_FORMATS:
+            fmt = detect_format(text[remaining].to_numpy(), candidates)
+            if fmt is None:
+                break
+            candidates.remove(fmt)
+            parsed = _to_datetime(text[remaining], fmt)
+            hit = parsed.notna().to_numpy()
+            rows = np.flatnonzero(remaining)[hit]
+            remaining[rows] = False
+            if fmt in [swapped_format(f) for f in report['formats']]:
+                # 03/04 can't be read both ways in one column; these rows aren't trusted to either reading
+                ambiguous[rows] = True
+                continue
+            out[rows] = parsed[hit].dt.as_unit("us").to_numpy()
+            report['formats'].append(fmt)
+            if fmt not in preferred:
+                report['detected'].append(fmt)
+
+    out = pd.Series(out, index=series.index, name=series.name)
+    report['ambiguous'] = int(ambiguous.sum())
+    report['ambiguous_rows'] = series.index[ambiguous][:MAX_REPORTED_ROWS].tolist()
+    failed = present & out.isna().to_numpy() & ~ambiguous
+    report['failed'] = int(failed.sum())
+    report['failed_rows'] = series.index[failed][:MAX_REPORTED_ROWS].tolist()
+    report['failed_examples'] = [str(v) for v in pd.unique(series[failed])[:5]]
+    report['elapsed_sec'] = time.perf_counter() - start
+    return out, report
+
+# ============================================================================
+# FORMAT CACHE
+# ============================================================================
+
+def init_format_cache():
+    """Create the detected-format table"""
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS datetime_formats
+                 (dataset TEXT NOT NULL,
+                  column_name TEXT NOT NULL,
+                  formats TEXT NOT NULL,
+                  detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  PRIMARY KEY (dataset, column_name))''')
+    conn.commit()
+    conn.close()
+
+
+def cached_formats(dataset, column):
+    """Formats that parsed a dataset's column last time, or []"""
+    init_format_cache()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute("SELECT formats FROM datetime_formats WHERE dataset = ? AND column_name = ?", (str(dataset), column))
+    row = c.fetchone()
+    conn.close()
+    return json.loads(row[0]) if row else []
+
+
+def save_formats(dataset, column, formats):
+    """Remember the formats that parsed a dataset's column"""
+    init_format_cache()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute("INSERT OR REPLACE INTO datetime_formats (dataset, column_name, formats) VALUES (?, ?, ?)",
+              (str(dataset), column, json.dumps(formats)))
+    conn.commit()
+    conn.close()
+
+
+def parse_source_datetimes(values, dataset, column):
+    """parse_datetimes preferring the formats cached for `dataset` (an export layout key), updating the cache"""
+    formats = cached_formats(dataset, column)
+    parsed, report = parse_datetimes(values, formats)
+    report['cache_hit'] = bool(formats) and not report['detected']
+    if report['formats'] and report['formats'] != formats:
+        save_formats(dataset, column, report['formats'])
+    return parsed, report
+
+
+def make_mixed_dates(n, seed=42):
+    """Activity timestamps the way mixed CRM exports hold them: two string formats and Excel serials"""
+    rng = np.random.default_rng(seed)
+    stamps = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365 * 24 * 3600, n), unit="s")
+    kind = rng.random(n)
+    values = pd.Series(stamps.strftime("%Y-%m-%d %H:%M:%S"), dtype=object)
+    day_first = kind >= 0.7
+    values[day_first] = stamps[day_first].strftime("%d/%m/%Y %H:%M")
+    serial = kind >= 0.9
+    values[serial] = ((stamps[serial] - pd.Timestamp(EXCEL_EPOCH)) / pd.Timedelta(days=1)).astype(float)
+    values[rng.random(n) < 0.01] = "not a date"
+    return values
+
+
+def benchmark_parsing(n=200_000, seed=42):
+    """Explicit-format parsing against pandas' inference and per-element ('mixed') parsing"""
+    values = make_mixed_dates(n, seed)
+    results = {'rows': n}
+    for label, parse in [
+        ('inferred', lambda: pd.to_datetime(values, errors="coerce")),
+        ('mixed', lambda: pd.to_datetime(values.astype(str), format="mixed", errors="coerce")),
+        ('explicit', lambda: parse_datetimes(values)[0]),
+    ]:
+        start = time.perf_counter()
+        try:
+            parsed = parse()
+            results[label] = {'sec': time.perf_counter() - start, 'parsed': int(parsed.notna().sum())}
+        except (ValueError, TypeError) as e:
+            results[label] = {'sec': time.perf_counter() - start, 'error': str(e)[:200]}
+    _, report = parse_datetimes(values)
+    results['explicit']['formats'] = report['formats']
+    results['explicit']['excel_serials'] = report['excel_serials']
+    results['explicit']['failed'] = report['failed']
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Explicit-format datetime parsing")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_detect = sub.add_parser("detect", help="Detect and parse a date column of a leads file")
+    p_detect.add_argument("data")
+    p_detect.add_argument("--column", default="last_active_time")
+
+    p_bench = sub.add_parser("bench", help="Compare parsing strategies on synthetic mixed-format dates")
+    p_bench.add_argument("--rows", type=int, default=200_000)
+
+    args = parser.parse_args()
+    if args.command == "detect":
+        from lead_io import read_leads
+
+        df = read_leads(args.data, usecols=[args.column])
+        if args.column not in df.columns:
+            raise SystemExit(f"No '{args.column}' column in {args.data}")
+        _, report = parse_source_datetimes(df[args.column], args.data, args.column)
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print(json.dumps(benchmark_parsing(args.rows), indent=2))
@@ -0,0 +1,247 @@
+import json
+import time
+import argparse
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+from lead_features import INTERACTION_COLS
+from lead_dates import parse_datetimes
+
+# ============================================================================
+# DUPLICATE LEAD DETECTION
+# ============================================================================
+#
+# CRM exports list the same person several times: the same phone number in
+# different formats and slight variations of the name. Leads are blocked on
+# their normalized phone (one hash-table pass via pd.factorize), so names are
+# only compared inside a block instead of across all n² pairs. Within a
+# block, leads whose names are similar enough are clustered (single linkage)
+# and each cluster collapses into its first lead, with behaviour and
+# interaction counts summed across the duplicates before features are built.
+# Leads without a name only attach afterwards, and only when the block's
+# named leads form one cluster: a nameless lead never links two people who
+# happen to share a number.
+
+PHONE_DIGITS = 10
+NAME_SIMILARITY = 0.8
+# Blocks this large are shared numbers (office lines, placeholders), not one person
+MAX_BLOCK_SIZE = 50
+
+SUM_COLS = ["views_count", "saved_properties", "repeated_visits"] + INTERACTION_COLS
+LAST_ACTIVE_COL = "last_active_time"
+
+
+def normalize_phones(phones):
+    """Last PHONE_DIGITS digits of each phone number; NA when too short to be one"""
+    digits = phones.astype("string").str.replace(r"\.0$", "", regex=True).str.replace(r"\D", "", regex=True)
+    digits = digits.str[-PHONE_DIGITS:]
+    return digits.where(digits.str.len() == PHONE_DIGITS)
+
+
+def normalize_names(names):
+    """Lower-case names with punctuation dropped and whitespace collapsed"""
+    cleaned = names.astype("string").str.lower().str.replace(r"[^\w\s]", " ", regex=True)
+    return cleaned.str.split().str.join(" ").fillna("")
+
+
+def name_similarity(a, b):
+    """1.0 for equal names or when one's words contain the other's, else the edit ratio.
+
+    A missing name leaves the decision to the phone number.
+    """
+    if not a or not b or a == b:
+        return 1.0
+    words_a, words_b = set(a.split()), set(b.split())
+    if words_a <= words_b or words_b <= words_a:
+        return 1.0
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def _cluster_block(positions, names, threshold):
+    """Single-linkage clusters of one phone block; returns (cluster root per lead, pairs compared)"""
+    block_names = [names[p] for p in positions]
+    if len(set(block_names)) == 1:
+        return [positions[0]] * len(positions), 0
+
+    parent = list(range(len(positions)))
+    named = [i for i, name in enumerate(block_names) if name]
+    nameless = [i for i, name in enumerate(block_names) if not name]
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            # Lower position wins so each cluster keeps its first lead
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    pairs = 0
+    for a, i in enumerate(named):
+        for j in named[a + 1:]:
+            pairs += 1
+            if name_similarity(block_names[i], block_names[j]) >= threshold:
+                union(i, j)
+
+    # Nameless leads join the one person on this number (who stays the representative),
+    # or each other when it's several
+    roots = {find(i) for i in named}
+    if len(roots) == 1:
+        anchor = roots.pop()
+        for i in nameless:
+            parent[i] = anchor
+    else:
+        for i in nameless[1:]:
+            union(i, nameless[0])
+    return [positions[find(i)] for i in range(len(positions))], pairs
+
+
+def find_duplicates(df, threshold=NAME_SIMILARITY, max_block=MAX_BLOCK_SIZE):
+    """Position of each lead's cluster representative (itself when unique) and blocking stats"""
+    n = len(df)
+    cluster = np.arange(n)
+    stats = {'blocks': 0, 'oversized_blocks': 0, 'pairs_compared': 0, 'no_phone': n}
+    if "phone" not in df.columns or n == 0:
+        return cluster, stats
+
+    codes, _ = pd.factorize(normalize_phones(df["phone"]))
+    has_phone = codes >= 0
+    stats['no_phone'] = int((~has_phone).sum())
+    sizes = np.bincount(codes[has_phone]) if has_phone.any() else np.zeros(0, dtype=int)
+    stats['blocks'] = int((sizes > 1).sum())
+    stats['oversized_blocks'] = int((sizes > max_block).sum())
+
+    candidate = has_phone.copy()
+    candidate[has_phone] = (sizes[codes[has_phone]] > 1) & (sizes[codes[has_phone]] <= max_block)
+    positions = np.flatnonzero(candidate)
+    if not len(positions):
+        return cluster, stats
+
+    # Only leads sharing a phone ever have their names compared
+    names = np.full(n, "", dtype=object)
+    if "name" in df.columns:
+        names[positions] = normalize_names(df["name"].iloc[positions]).to_numpy()
+    order = positions[np.argsort(codes[positions], kind="stable")]
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    for block in np.split(order, bounds):
+        roots, pairs = _cluster_block(block.tolist(), names, threshold)
+        cluster[block] = roots
+        stats['pairs_compared'] += pairs
+    return cluster, stats
+
+
+def _assign(merged, targets, col, values):
+    """Write per-cluster values, keeping integer columns integer when nothing is missing"""
+    if pd.api.types.is_integer_dtype(merged[col].dtype) and not pd.isna(values).any():
+        values = values.astype(merged[col].dtype)
+    merged.loc[targets, col] = values
+
+
+def merge_duplicates(df, cluster):
+    """Collapse each cluster into its representative lead, combining activity"""
+    n = len(df)
+    sizes = np.bincount(cluster, minlength=n)
+    keep = cluster == np.arange(n)
+    merged = df.iloc[keep].copy()
+    merged["duplicate_count"] = sizes[keep]
+    if "lead_id" in df.columns:
+        merged["merged_lead_ids"] = ""
+
+    multi = sizes[cluster] > 1
+    if not multi.any():
+        return merged
+
+    group = cluster[multi]
+    members = df.iloc[multi]
+    targets = df.index[np.unique(group)]
+
+    for col in [c for c in SUM_COLS if c in df.columns]:
+        totals = pd.to_numeric(members[col], errors="coerce").groupby(group).sum(min_count=1)
+        _assign(merged, targets, col, totals.to_numpy())
+
+    if "avg_view_time_sec" in df.columns:
+        avg = pd.to_numeric(members["avg_view_time_sec"], errors="coerce")
+        if "views_count" in df.columns:
+            views = pd.to_numeric(members["views_count"], errors="coerce").where(avg.notna())
+            weighted = (avg * views).groupby(group).sum(min_count=1) / views.groupby(group).sum(min_count=1)
+            # Clusters without view counts fall back to the plain mean
+            avg = weighted.where(np.isfinite(weighted), avg.groupby(group).mean())
+        else:
+            avg = avg.groupby(group).mean()
+        merged.loc[targets, "avg_view_time_sec"] = avg.to_numpy()
+
+    if LAST_ACTIVE_COL in df.columns:
+        # Keep the raw value of each cluster's latest activity (NaT sorts first)
+        stamps = parse_datetimes(members[LAST_ACTIVE_COL])[0].to_numpy("datetime64[ns]").view(np.int64)
+        latest = np.lexsort((stamps, group))
+        last = np.r_[np.flatnonzero(np.diff(group[latest])), len(latest) - 1]
+        merged.loc[targets, LAST_ACTIVE_COL] = members[LAST_ACTIVE_COL].to_numpy()[latest[last]]
+
+    if "converted" in df.columns:
+        converted = pd.to_numeric(members["converted"], errors="coerce").groupby(group).max()
+        _assign(merged, targets, "converted", converted.to_numpy())
+
+    if "lead_id" in df.columns:
+        by_cluster = np.argsort(group, kind="stable")
+        ids = members["lead_id"].astype(str).to_numpy()[by_cluster]
+        bounds = np.flatnonzero(np.diff(group[by_cluster])) + 1
+        merged.loc[targets, "merged_lead_ids"] = [";".join(chunk) for chunk in np.split(ids, bounds)]
+
+    return merged
+
+
+def dedupe_leads(df, threshold=NAME_SIMILARITY, max_block=MAX_BLOCK_SIZE):
+    """Merge duplicate leads; returns (deduplicated frame, report)"""
+    start = time.perf_counter()
+    cluster, stats = find_duplicates(df, threshold, max_block)
+    deduped = merge_duplicates(df, cluster)
+    elapsed = time.perf_counter() - start
+
+    cluster_sizes = deduped["duplicate_count"].to_numpy()
+    report = dict(
+        stats,
+        rows_in=len(df),
+        rows_out=len(deduped),
+        duplicates_merged=len(df) - len(deduped),
+        clusters=int((cluster_sizes > 1).sum()),
+        largest_cluster=int(cluster_sizes.max()) if len(cluster_sizes) else 0,
+        elapsed_sec=elapsed,
+        rows_per_sec=len(df) / elapsed if elapsed > 0 else float("inf"),
+    )
+    return deduped, report
+
+
+if __name__ == "__main__":
+    from lead_io import read_leads
+
+    parser = argparse.ArgumentParser(description="Duplicate lead detection")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_dedupe = sub.add_parser("dedupe", help="Merge duplicate leads in a file")
+    p_dedupe.add_argument("data")
+    p_dedupe.add_argument("--output", default="deduplicated_leads.csv")
+    p_dedupe.add_argument("--threshold", type=float, default=NAME_SIMILARITY)
+
+    p_bench = sub.add_parser("bench", help="Measure throughput on synthetic leads with injected duplicates")
+    p_bench.add_argument("--rows", type=int, default=1000000)
+    p_bench.add_argument("--duplicate-rate", type=float, default=0.1)
+    p_bench.add_argument("--seed", type=int, default=42)
+
+    args = parser.parse_args()
+    if args.command == "dedupe":
+        raw = read_leads(args.data)
+        deduped, report = dedupe_leads(raw, args.threshold)
+        deduped.to_csv(args.output, index=False)
+        print(json.dumps(report, indent=2))
+    else:
+        from lead_bench import make_leads
+
+        raw = make_leads(args.rows, seed=args.seed, duplicate_rate=args.duplicate_rate)
+        deduped, report = dedupe_leads(raw)
+        report['injected_duplicates'] = int(raw.attrs.get('injected_duplicates', 0))
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,328 @@
+import json
+import math
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# DISTRIBUTION SKETCHES
+# ============================================================================
+#
+# Each monitored column is summarized in one vectorized pass:
+#   - numerics: a log-bucketed quantile sketch (DDSketch style). A value x
+#     lands in bucket ceil(log_gamma |x|), so every quantile read back is
+#     within RELATIVE_ACCURACY of the true value. Buckets depend only on
+#     gamma, so two sketches merge by adding counts and their CDFs can be
+#     compared bucket by bucket.
+#   - categoricals: a Misra-Gries top-k summary. Counts are exact while a
+#     column has at most TOP_K distinct values; beyond that the rarest are
+#     folded into "other". Summaries merge by adding counters and trimming.
+# Missing values are counted separately in both.
+
+RELATIVE_ACCURACY = 0.01
+_LOG_GAMMA = math.log((1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY))
+# Magnitudes below this count as zero
+MIN_INDEXABLE = 1e-9
+TOP_K = 64
+
+DRIFT_NUMERIC = ["budget_mid", "budget_match", "engagement_score", "total_interactions", "recency_score"]
+DRIFT_CATEGORICAL = ["source", "preferred_area", "bhk", "user_type", "move_in_time"]
+
+
+def _bucket_counts(magnitudes):
+    """{bucket key: count} for positive magnitudes"""
+    if not len(magnitudes):
+        return {}
+    keys = np.ceil(np.log(magnitudes) / _LOG_GAMMA).astype(np.int64)
+    low = int(keys.min())
+    counts = np.bincount(keys - low)
+    nonzero = np.flatnonzero(counts)
+    return dict(zip((nonzero + low).tolist(), counts[nonzero].tolist()))
+
+
+def numeric_sketch(values):
+    """Quantile sketch of a numeric column"""
+    x = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=float)
+    finite = np.isfinite(x)
+    x = x[finite]
+    pos = x > MIN_INDEXABLE
+    neg = x < -MIN_INDEXABLE
+    return {
+        'type': 'numeric',
+        'count': int(len(x)),
+        'missing': int((~finite).sum()),
+        'zero': int(len(x) - pos.sum() - neg.sum()),
+        'pos': _bucket_counts(x[pos]),
+        'neg': _bucket_counts(-x[neg]),
+    }
+
+
+def _trim_counters(counters, k=TOP_K):
+    """Misra-Gries reduction to at most k counters"""
+    if len(counters) <= k:
+        return counters
+    cutoff = sorted(counters.values(), reverse=True)[k]
+    return {v: c - cutoff for v, c in counters.items() if c > cutoff}
+
+
+def categorical_sketch(values, k=TOP_K):
+    """Top-k frequency summary of a categorical column"""
+    values = pd.Series(values)
+    present = values.dropna()
+    # Integer codes read back as floats once a column has gaps; 2 and 2.0 are one category
+    keys = present.astype(float).map("{:g}".format) if pd.api.types.is_numeric_dtype(present) else present.astype(str)
+    counts = keys.value_counts()
+    return {
+        'type': 'categorical',
+        'count': int(counts.sum()),
+        'missing': int(values.isna().sum()),
+        'counters': _trim_counters({str(v): int(c) for v, c in counts.items()}, k),
+    }
+
+
+def _add_counts(a, b):
+    merged = dict(a)
+    for key, count in b.items():
+        merged[key] = merged.get(key, 0) + count
+    return merged
+
+
+def merge_sketch(a, b):
+    """Combine two sketches of the same column"""
+    merged = {'type': a['type'], 'count': a['count'] + b['count'], 'missing': a['missing'] + b['missing']}
+    if a['type'] == 'numeric':
+        merged['zero'] = a['zero'] + b['zero']
+        merged['pos'] = _add_counts(a['pos'], b['pos'])
+        merged['neg'] = _add_counts(a['neg'], b['neg'])
+    else:
+        merged['counters'] = _trim_counters(_add_counts(a['counters'], b['counters']))
+    return merged
+
+
+def capture_sketches(df):
+    """Sketch every monitored column present in an engineered lead frame"""
+    sketches = {}
+    for col in DRIFT_NUMERIC:
+        if col in df.columns:
+            sketches[col] = numeric_sketch(df[col])
+    for col in DRIFT_CATEGORICAL:
+        if col in df.columns:
+            sketches[col] = categorical_sketch(df[col])
+    return sketches
+
+
+def merge_sketches(a, b):
+    """Combine per-column sketch sets (e.g. from several shards)"""
+    merged = dict(a)
+    for col, sketch in b.items():
+        merged[col] = merge_sketch(merged[col], sketch) if col in merged else sketch
+    return merged
+
+
+def _to_json(sketches):
+    """JSON text; bucket maps become [key, count] pairs so integer keys survive"""
+    encoded = {}
+    for col, s in sketches.items():
+        s = dict(s)
+        if s['type'] == 'numeric':
+            s['pos'] = sorted(s['pos'].items())
+            s['neg'] = sorted(s['neg'].items())
+        encoded[col] = s
+    return json.dumps(encoded)
+
+
+def _from_json(text):
+    sketches = json.loads(text)
+    for s in sketches.values():
+        if s['type'] == 'numeric':
+            s['pos'] = {int(k): c for k, c in s['pos']}
+            s['neg'] = {int(k): c for k, c in s['neg']}
+    return sketches
+
+# ============================================================================
+# DRIFT SCORES
+# ============================================================================
+#
+# Numerics get PSI over the reference sketch's deciles and the KS statistic
+# over all bucket boundaries; categoricals get PSI over their values plus an
+# "other" bin. Missing values are their own PSI bin in both. Rule-of-thumb
+# PSI bands: under 0.1 stable, 0.1-0.25 moderate, above 0.25 significant.
+
+PSI_MODERATE = 0.1
+PSI_SIGNIFICANT = 0.25
+KS_SIGNIFICANT = 0.2
+# New categories above this share of the current data count as drift
+NEW_VALUE_SHARE = 0.05
+PSI_EPSILON = 1e-4
+
+
+def _buckets(sketch):
+    """Bucket representative values (ascending) and counts"""
+    neg = sorted(sketch['neg'].items(), reverse=True)
+    pos = sorted(sketch['pos'].items())
+    gamma = math.exp(_LOG_GAMMA)
+    values = (
+        [-2 * gamma ** k / (gamma + 1) for k, _ in neg]
+        + ([0.0] if sketch['zero'] else [])
+        + [2 * gamma ** k / (gamma + 1) for k, _ in pos]
+    )
+    counts = [c for _, c in neg] + ([sketch['zero']] if sketch['zero'] else []) + [c for _, c in pos]
+    return np.asarray(values, dtype=float), np.asarray(counts, dtype=float)
+
+
+def _cdf(sketch, points):
+    """Share of non-missing values at or below each point"""
+    values, counts = _buckets(sketch)
+    if not sketch['count']:
+        return np.zeros(len(points))
+    cumulative = np.concatenate([[0.0], np.cumsum(counts)]) / sketch['count']
+    return cumulative[np.searchsorted(values, points, side="right")]
+
+
+def sketch_quantile(sketch, q):
+    """Approximate q-quantile of the sketched column (None when empty)"""
+    values, counts = _buckets(sketch)
+    if not len(values):
+        return None
+    rank = q * (sketch['count'] - 1)
+    return float(values[min(np.searchsorted(np.cumsum(counts), rank, side="right"), len(values) - 1)])
+
+
+def _psi(expected, actual):
+    expected = np.clip(np.asarray(expected, dtype=float), PSI_EPSILON, None)
+    actual = np.clip(np.asarray(actual, dtype=float), PSI_EPSILON, None)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def _shares(counts, missing):
+    total = float(np.sum(counts) + missing)
+    return np.append(counts, missing) / total if total else np.zeros(len(counts) + 1)
+
+
+def numeric_drift(reference, current):
+    """PSI over the reference deciles and the KS statistic between two numeric sketches"""
+    edges = np.unique([sketch_quantile(reference, q) for q in np.arange(0.1, 1.0, 0.1)])
+    bins_ref = np.diff(np.concatenate([[0.0], _cdf(reference, edges), [1.0]])) * reference['count']
+    bins_cur = np.diff(np.concatenate([[0.0], _cdf(current, edges), [1.0]])) * current['count']
+
+    points = np.union1d(_buckets(reference)[0], _buckets(current)[0])
+    ks = float(np.max(np.abs(_cdf(reference, points) - _cdf(current, points)))) if len(points) else 0.0
+    return {
+        'psi': _psi(_shares(bins_ref, reference['missing']), _shares(bins_cur, current['missing'])),
+        'ks': ks,
+        'reference_median': sketch_quantile(reference, 0.5),
+        'current_median': sketch_quantile(current, 0.5),
+    }
+
+
+def categorical_drift(reference, current):
+    """PSI over category shares and the categories the reference never saw"""
+    categories = sorted(set(reference['counters']) | set(current['counters']))
+
+    def counts(sketch):
+        kept = np.array([sketch['counters'].get(c, 0) for c in categories], dtype=float)
+        return np.append(kept, sketch['count'] - kept.sum())
+
+    ref_counts, cur_counts = counts(reference), counts(current)
+    total = current['count'] + current['missing']
+    new_values = {
+        c: current['counters'][c] / total
+        for c in current['counters'] if c not in reference['counters'] and total
+    }
+    return {
+        'psi': _psi(_shares(ref_counts, reference['missing']), _shares(cur_counts, current['missing'])),
+        'ks': None,
+        'new_values': dict(sorted(new_values.items(), key=lambda kv: -kv[1])),
+    }
+
+
+def drift_report(reference, current):
+    """Per-column drift scores and whether retraining is advised"""
+    features = []
+    for col in DRIFT_NUMERIC + DRIFT_CATEGORICAL:
+        if col not in reference:
+            continue
+        if col not in current:
+            features.append({'feature': col, 'type': reference[col]['type'], 'psi': None, 'ks': None,
+                             'status': 'missing'})
+            continue
+        ref, cur = reference[col], current[col]
+        if not ref['count'] or not cur['count']:
+            # An all-missing column has no distribution to compare
+            features.append({'feature': col, 'type': ref['type'], 'psi': None, 'ks': None, 'status': 'missing'})
+            continue
+        scores = numeric_drift(ref, cur) if ref['type'] == 'numeric' else categorical_drift(ref, cur)
+
+        status = 'stable'
+        if scores['psi'] >= PSI_MODERATE:
+            status = 'moderate'
+        if (scores['psi'] >= PSI_SIGNIFICANT
+                or (scores['ks'] or 0.0) >= KS_SIGNIFICANT
+                or any(share >= NEW_VALUE_SHARE for share in scores.get('new_values', {}).values())):
+            status = 'drift'
+        features.append(dict(scores, feature=col, type=ref['type'], status=status))
+
+    drifted = [f['feature'] for f in features if f['status'] in ('drift', 'missing')]
+    return {
+        'features': features,
+        'drifted': drifted,
+        'retrain_advised': bool(drifted),
+        'max_psi': max((f['psi'] for f in features if f['psi'] is not None), default=0.0),
+    }
+
+# ============================================================================
+# SKETCH STORE
+# ============================================================================
+
+def init_drift_store():
+    """Create the sketch table"""
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS drift_sketches
+                 (model_version TEXT NOT NULL,
+                  dataset TEXT NOT NULL,
+                  kind TEXT NOT NULL,
+                  sketches TEXT NOT NULL,
+                  rows INTEGER,
+                  captured_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  PRIMARY KEY (model_version, dataset, kind))''')
+    conn.commit()
+    conn.close()
+
+
+def save_sketches(model_version, dataset, kind, sketches, rows):
+    """Store the training (reference) or latest scoring sketches for a model and dataset"""
+    init_drift_store()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute("INSERT OR REPLACE INTO drift_sketches (model_version, dataset, kind, sketches, rows) "
+              "VALUES (?, ?, ?, ?, ?)",
+              (model_version, str(dataset), kind, _to_json(sketches), int(rows)))
+    conn.commit()
+    conn.close()
+
+
+def load_reference_sketches(model_version):
+    """Sketches of the data a model was trained on, or None"""
+    init_drift_store()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute("SELECT sketches FROM drift_sketches WHERE model_version = ? AND kind = 'training' "
+              "ORDER BY captured_at DESC LIMIT 1", (model_version,))
+    row = c.fetchone()
+    conn.close()
+    return _from_json(row[0]) if row else None
+
+
+def check_drift(df, model_version, dataset):
+    """Sketch leads scored by a model, store them and compare with its training data.
+
+    Returns the drift report, or None when the model has no training sketches.
+    """
+    sketches = capture_sketches(df)
+    save_sketches(model_version, dataset, 'scoring', sketches, len(df))
+    reference = load_reference_sketches(model_version)
+    if reference is None:
+        return None
+    return dict(drift_report(reference, sketches), reference_version=model_version)
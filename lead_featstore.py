@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import inspect
+import hashlib
+import argparse
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import lead_features
+from lead_features import (
+    BEHAVIOR_COLS, INTERACTION_COLS, FEATURE_BLOCKS, engineer_features, feature_columns, feature_stats,
+    recency_features,
+)
+from lead_store import _atomic_write, _to_arrow_table
+
+# ============================================================================
+# ENGINEERED FEATURE STORE
+# ============================================================================
+#
+# feature_store/<dataset hash>/<feature version>.arrow   uncompressed Arrow IPC
+#
+# The budget, area, behaviour and interaction blocks depend only on the raw
+# columns they read and on the normalisation stats, so they're computed once
+# and every later stage (training, evaluation, drift sketches, explanations,
+# shadow scoring) maps the stored matrix instead of re-engineering it:
+#   - the dataset hash covers the raw columns the blocks read
+#   - the feature version covers the block definitions (their source) and
+#     the stats; editing a block or training on other stats is a new version
+# Recency depends on the time of scoring, so it's recomputed on every read.
+#
+# Files are written like the scored store's (temporary name, atomic rename)
+# and memory-mapped read-only; numeric columns without nulls wrap the mapped
+# pages. Registered models hold references to the version they were trained
+# on; gc_feature_store removes versions nothing references once they're older
+# than GC_GRACE_SECONDS, and drops references held by models no longer in the
+# registry.
+
+FEATURE_STORE_DIR = "feature_store"
+GC_GRACE_SECONDS = 24 * 3600
+
+# Raw columns the stored blocks read
+SOURCE_COLS = ["budget_min", "budget_max", "budget", "preferred_area"] + BEHAVIOR_COLS + INTERACTION_COLS
+# Columns the stored blocks write (behaviour and interaction counts are cleaned in place)
+STORED_COLS = (
+    ["budget_mid", "budget_match", "area_match"]
+    + BEHAVIOR_COLS + [c + "_norm" for c in BEHAVIOR_COLS] + ["engagement_score"]
+    + INTERACTION_COLS + ["total_interactions"]
+)
+
+_definition_version = None
+_mapped_features = {}
+
+
+def definition_version():
+    """Hash of the stored feature blocks' source code"""
+    global _definition_version
+    if _definition_version is None:
+        h = hashlib.sha1()
+        for _, block in FEATURE_BLOCKS:
+            h.update(inspect.getsource(block).encode())
+        h.update(inspect.getsource(lead_features._budget_mid).encode())
+        h.update(json.dumps([SOURCE_COLS, STORED_COLS]).encode())
+        _definition_version = h.hexdigest()[:12]
+    return _definition_version
+
+
+def feature_version(stats):
+    """Feature-definition version: the block definitions plus the stats they normalise with (recency excluded)"""
+    params = {k: v for k, v in stats.items() if k != 'recency'}
+    stats_hash = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:12]
+    return f"{definition_version()}-{stats_hash}"
+
+
+def dataset_hash(df):
+    """Hash of the raw columns the stored blocks read"""
+    cols = [c for c in SOURCE_COLS if c in df.columns]
+    h = hashlib.sha1(",".join(cols).encode())
+    h.update(str(len(df)).encode())
+    for col in cols:
+        try:
+            hashed = pd.util.hash_pandas_object(df[col], index=False)
+        except TypeError:
+            hashed = pd.util.hash_pandas_object(df[col].astype(str), index=False)
+        h.update(hashed.to_numpy().tobytes())
+    return h.hexdigest()[:16]
+
+
+def _feature_path(key):
+    dataset, version = key
+    return os.path.join(FEATURE_STORE_DIR, dataset, f"{version}.arrow")
+
+
+def save_features(key, features):
+    """Write a feature matrix for (dataset hash, feature version)"""
+    path = _feature_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = _to_arrow_table(features.reset_index(drop=True))
+
+    def write_table(tmp):
+        with pa.OSFile(tmp, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    _atomic_write(path, write_table)
+    return path
+
+
+def load_features(key):
+    """Memory-map a stored feature matrix read-only, or None; cached per process until the file changes"""
+    path = os.path.abspath(_feature_path(key))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    identity = (stat.st_ino, stat.st_mtime_ns)
+    cached = _mapped_features.get(path)
+    if cached is None or cached[0] != identity:
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        cached = (identity, table.to_pandas(split_blocks=True))
+        _mapped_features[path] = cached
+    return cached[1]
+
+
+def engineer_features_cached(df, stats=None, reference_time=None, profiler=None):
+    """engineer_features, with the stored blocks read from the feature store when this data was seen before.
+
+    Same effect on df and return value as engineer_features. What happened
+    (key, hit, seconds) is left in df.attrs['feature_store'].
+    """
+    start = time.perf_counter()
+    if stats is None:
+        stats = feature_stats(df)
+    key = (dataset_hash(df), feature_version(stats))
+    stored = load_features(key)
+
+    if stored is not None and len(stored) == len(df):
+        for col in stored.columns:
+            # Series assignment keeps the mapped buffers; copy-on-write copies a column only if it's modified
+            df[col] = stored[col].set_axis(df.index)
+        recency_features(df, stats.get('recency'), reference_time)
+        feature_cols = feature_columns(df)
+        hit = True
+    else:
+        feature_cols = engineer_features(df, stats, reference_time, profiler)
+        save_features(key, df[[c for c in STORED_COLS if c in df.columns]])
+        hit = False
+
+    df.attrs['feature_store'] = {'key': list(key), 'hit': hit, 'seconds': time.perf_counter() - start}
+    return feature_cols
+
+# ============================================================================
+# REFERENCES AND GARBAGE COLLECTION
+# ============================================================================
+
+def init_feature_refs():
+    """Create the feature store reference table"""
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS feature_refs
+                 (dataset_hash TEXT NOT NULL,
+                  feature_version TEXT NOT NULL,
+                  holder TEXT NOT NULL,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  PRIMARY KEY (dataset_hash, feature_version, holder))''')
+    conn.commit()
+    conn.close()
+
+
+def add_feature_ref(key, holder):
+    """Mark a stored version as used by `holder` (e.g. 'model:<version>') so GC keeps it"""
+    init_feature_refs()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute("INSERT OR IGNORE INTO feature_refs (dataset_hash, feature_version, holder) VALUES (?, ?, ?)",
+              (key[0], key[1], holder))
+    conn.commit()
+    conn.close()
+
+
+def gc_feature_store(grace_seconds=GC_GRACE_SECONDS):
+    """Drop references of models gone from the registry, then delete unreferenced versions past the grace period"""
+    init_feature_refs()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'models'")
+    if c.fetchone():
+        c.execute("""DELETE FROM feature_refs WHERE holder LIKE 'model:%'
+                     AND substr(holder, 7) NOT IN (SELECT version FROM models)""")
+    dropped_refs = c.rowcount
+    conn.commit()
+    referenced = set(c.execute("SELECT dataset_hash, feature_version FROM feature_refs").fetchall())
+    conn.close()
+
+    report = {'dropped_refs': max(dropped_refs, 0), 'removed': [], 'kept': 0, 'bytes_freed': 0}
+    if not os.path.isdir(FEATURE_STORE_DIR):
+        return report
+    now = time.time()
+    for dataset in os.listdir(FEATURE_STORE_DIR):
+        directory = os.path.join(FEATURE_STORE_DIR, dataset)
+        for filename in os.listdir(directory):
+            if not filename.endswith(".arrow"):
+                continue
+            path = os.path.join(directory, filename)
+            version = filename[:-len(".arrow")]
+            stat = os.stat(path)
+            if (dataset, version) in referenced or now - stat.st_mtime < grace_seconds:
+                report['kept'] += 1
+                continue
+            try:
+                # Open mappings stay valid on POSIX
+                os.remove(path)
+                report['removed'].append(f"{dataset}/{version}")
+                report['bytes_freed'] += stat.st_size
+            except OSError:
+                pass
+        if not os.listdir(directory):
+            os.rmdir(directory)
+    return report
+
+
+def benchmark_store(df, stats=None, repeats=5):
+    """Engineering from raw columns against a feature-store hit, on copies of the same raw frame"""
+    stats = stats or feature_stats(df)
+    timings = {'engineer': [], 'store_hit': []}
+    engineer_features_cached(df.copy(), stats)
+    for _ in range(repeats):
+        raw = df.copy()
+        start = time.perf_counter()
+        engineer_features(raw, stats)
+        timings['engineer'].append(time.perf_counter() - start)
+
+        raw = df.copy()
+        start = time.perf_counter()
+        engineer_features_cached(raw, stats)
+        timings['store_hit'].append(time.perf_counter() - start)
+        assert raw.attrs['feature_store']['hit']
+    key = raw.attrs['feature_store']['key']
+    stored = load_features(tuple(key))
+    shared = sum(np.shares_memory(raw[c].to_numpy(), stored[c].to_numpy()) for c in stored.columns)
+    return {
+        'rows': len(df),
+        'key': key,
+        'engineer_sec': min(timings['engineer']),
+        'store_hit_sec': min(timings['store_hit']),
+        'zero_copy_columns': f"{shared}/{len(stored.columns)}",
+        'file_mb': os.path.getsize(_feature_path(tuple(key))) / 1024**2,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Versioned engineered-feature store")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_bench = sub.add_parser("bench", help="Compare feature engineering with a store hit on a leads file")
+    p_bench.add_argument("data")
+    p_bench.add_argument("--repeats", type=int, default=5)
+
+    p_gc = sub.add_parser("gc", help="Delete stored versions no registered model references")
+    p_gc.add_argument("--grace-seconds", type=float, default=GC_GRACE_SECONDS)
+
+    args = parser.parse_args()
+    if args.command == "bench":
+        from lead_io import read_leads
+
+        print(json.dumps(benchmark_store(read_leads(args.data), repeats=args.repeats), indent=2))
+    else:
+        print(json.dumps(gc_feature_store(args.grace_seconds), indent=2))
@@ -0,0 +1,225 @@
+from contextlib import nullcontext
+
+import pandas as pd
+import numpy as np
+
+from lead_dates import parse_datetimes
+
+# ============================================================================
+# FEATURE ENGINEERING
+# ============================================================================
+
+BEHAVIOR_COLS = ["views_count", "avg_view_time_sec", "saved_properties", "repeated_visits"]
+INTERACTION_COLS = ["whatsapp_clicks", "call_clicks", "chat_messages"]
+BASE_FEATURE_COLS = [
+    "budget_match", "area_match", "engagement_score",
+    "total_interactions", "recency_score",
+]
+
+# Missing or unparseable activity dates count as this many days inactive
+INACTIVE_DAYS = 999
+
+
+def reciprocal_decay(days, half_life_days=None):
+    """Original recency curve: 1 / (1 + days)"""
+    return 1 / (1 + days)
+
+
+def exponential_decay(days, half_life_days=7.0):
+    """Recency halves every `half_life_days` days"""
+    return np.power(0.5, days / half_life_days)
+
+
+# Decay curves selectable by name; the choice is stored with the model's feature stats
+DECAY_FUNCTIONS = {
+    'reciprocal': reciprocal_decay,
+    'exponential': exponential_decay,
+}
+DEFAULT_RECENCY = {'decay': 'reciprocal', 'half_life_days': 7.0}
+
+
+def map_probability_to_category(prob_score):
+    """Map probability (0-100) to category label."""
+    if prob_score >= 70:
+        return "Hot"
+    elif prob_score >= 40:
+        return "Warm"
+    else:
+        return "Cold"
+
+
+def _budget_mid(df):
+    """Midpoint of the lead's budget range (or the single budget column)"""
+    if "budget_min" in df.columns and "budget_max" in df.columns:
+        return df[["budget_min", "budget_max"]].mean(axis=1)
+    elif "budget" in df.columns:
+        return pd.to_numeric(df["budget"], errors='coerce')
+    return pd.Series(np.nan, index=df.index)
+
+
+def feature_stats(df, recency=None):
+    """Dataset-level statistics the engineered features are normalized with"""
+    budget_mid = _budget_mid(df)
+    stats = {
+        'budget_min': float(budget_mid.min()) if budget_mid.notna().any() else None,
+        'budget_max': float(budget_mid.max()) if budget_mid.notna().any() else None,
+        'area_freq': None,
+        'behavior_max': {},
+        'recency': dict(DEFAULT_RECENCY, **(recency or {})),
+    }
+    if "preferred_area" in df.columns:
+        area_freq = df["preferred_area"].fillna("unknown").value_counts(normalize=True)
+        stats['area_freq'] = {str(k): float(v) for k, v in area_freq.items()}
+    for c in BEHAVIOR_COLS:
+        if c in df.columns:
+            stats['behavior_max'][c] = float(pd.to_numeric(df[c], errors="coerce").fillna(0).max())
+        else:
+            stats['behavior_max'][c] = 0.0
+    return stats
+
+
+def recency_features(df, recency=None, reference_time=None):
+    """Recompute the time-dependent columns in place against `reference_time` (default now)"""
+    if "last_active_time" not in df.columns:
+        df["recency_score"] = 0.0
+        return
+
+    recency = dict(DEFAULT_RECENCY, **(recency or {}))
+    decay = DECAY_FUNCTIONS[recency['decay']]
+    now = pd.Timestamp.now() if reference_time is None else pd.Timestamp(reference_time)
+
+    if not pd.api.types.is_datetime64_any_dtype(df["last_active_time"]):
+        df["last_active_time"] = parse_datetimes(df["last_active_time"])[0]
+    df["days_since_active"] = (now - df["last_active_time"]).dt.days.fillna(INACTIVE_DAYS)
+    df["recency_score"] = decay(df["days_since_active"].to_numpy(dtype=float), recency['half_life_days'])
+
+
+def _budget_features(df, stats):
+    """Budget midpoint and its position in the training budget range"""
+    df["budget_mid"] = _budget_mid(df)
+
+    if df["budget_mid"].notna().any():
+        min_b, max_b = stats['budget_min'], stats['budget_max']
+        if min_b is None or max_b is None or min_b == max_b:
+            df["budget_match"] = 1.0
+        else:
+            df["budget_match"] = (df["budget_mid"] - min_b) / (max_b - min_b)
+    else:
+        df["budget_match"] = 0.5
+
+
+def _area_features(df, stats):
+    """Popularity of the lead's preferred area in the training data"""
+    if "preferred_area" in df.columns and stats['area_freq'] is not None:
+        area = df["preferred_area"].fillna("unknown").astype(str)
+        df["area_match"] = area.map(stats['area_freq']).fillna(0.5)
+    else:
+        df["area_match"] = 0.5
+
+
+def _behavior_features(df, stats):
+    """Normalized browsing behaviour and the weighted engagement score"""
+    for c in BEHAVIOR_COLS:
+        if c not in df.columns:
+            df[c] = 0
+        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0)
+
+    # Normalize behavior columns
+    for c in BEHAVIOR_COLS:
+        mx = stats['behavior_max'][c]
+        if mx > 0:
+            df[c + "_norm"] = df[c] / mx
+        else:
+            df[c + "_norm"] = 0.0
+
+    df["engagement_score"] = (
+        0.4 * df["views_count_norm"] +
+        0.2 * df["avg_view_time_sec_norm"] +
+        0.25 * df["saved_properties_norm"] +
+        0.15 * df["repeated_visits_norm"]
+    )
+
+
+def _interaction_features(df, stats):
+    """Total contact interactions (WhatsApp, calls, chat)"""
+    for c in INTERACTION_COLS:
+        if c not in df.columns:
+            df[c] = 0
+        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0)
+
+    df["total_interactions"] = df[INTERACTION_COLS].sum(axis=1)
+
+
+FEATURE_BLOCKS = [
+    ("budget", _budget_features),
+    ("area", _area_features),
+    ("behavior", _behavior_features),
+    ("interactions", _interaction_features),
+]
+
+
+def engineer_features(df, stats=None, reference_time=None, profiler=None):
+    """Add engineered feature columns to df in place and return feature column names.
+
+    Normalization uses `stats` (see feature_stats) when given, so leads scored
+    later are engineered the same way as the data the model was trained on.
+    Recency is measured against `reference_time` (default now). Each feature
+    block is timed as a `features.<block>` stage when a profiler is given.
+    """
+    if stats is None:
+        stats = feature_stats(df)
+
+    for name, block in FEATURE_BLOCKS:
+        with profiler.stage("features." + name) if profiler else nullcontext():
+            block(df, stats)
+
+    with profiler.stage("features.recency") if profiler else nullcontext():
+        recency_features(df, stats.get('recency'), reference_time)
+
+    return feature_columns(df)
+
+
+def feature_columns(df):
+    """Model input columns of an engineered frame"""
+    feature_cols = list(BASE_FEATURE_COLS)
+    if "source" in df.columns:
+        feature_cols.append("source")
+    if "bhk" in df.columns:
+        feature_cols.append("bhk")
+    return feature_cols
+
+
+def build_target(df, X, min_labels=0):
+    """Return (X, y) with rows lacking a label dropped, or y=None when no labels exist.
+
+    With fewer than `min_labels` labelled rows (and some unlabelled), every
+    row is kept: the labels override KMeans pseudo-labels of the rest.
+    """
+    y = None
+    if "converted" in df.columns:
+        y = pd.to_numeric(df["converted"], errors="coerce")
+
+    if y is None or y.isna().all():
+        return X, None
+
+    mask = y.notna()
+    if mask.sum() < min_labels and not mask.all():
+        pseudo = pseudo_labels(X)
+        # Cluster numbering is arbitrary; take the one that agrees with the known outcomes
+        if (pseudo[mask] == y[mask]).mean() < 0.5:
+            pseudo = 1 - pseudo
+        return X, pseudo.where(~mask, y).astype(int)
+
+    X = X[mask].reset_index(drop=True)
+    y = y[mask].astype(int).reset_index(drop=True)
+    return X, y
+
+
+def pseudo_labels(X):
+    """Create pseudo-labels with KMeans when no conversion labels are available"""
+    from sklearn.cluster import KMeans
+
+    numeric_for_kmeans = X.select_dtypes(include=[np.number]).fillna(0)
+    kmeans = KMeans(n_clusters=2, random_state=42)
+    labels = kmeans.fit_predict(numeric_for_kmeans)
+    return pd.Series(labels, index=X.index)
@@ -0,0 +1,288 @@
+import copy
+import json
+import sqlite3
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, roc_auc_score
+from sklearn.utils.class_weight import compute_class_weight
+
+from lead_model import load_registered_model, register_model
+from lead_store import published_datasets, load_scored
+from lead_drift import capture_sketches, merge_sketches, load_reference_sketches, save_sketches
+
+# ============================================================================
+# CONVERSION OUTCOMES
+# ============================================================================
+#
+# Conversions are reported per lead as they happen (lead_id, converted,
+# timestamp) and accumulate in lead_outcomes; the latest report for a lead
+# wins. Labels are joined to the engineered features already published in
+# the scored-lead store, i.e. the lead as it looked when it was scored, so
+# no historical workbook has to be read again.
+
+TRUE_VALUES = {"1", "true", "yes", "y", "converted", "won"}
+FALSE_VALUES = {"0", "false", "no", "n", "lost"}
+
+
+def init_outcomes():
+    """Create the outcome and feedback-run tables"""
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS lead_outcomes
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  lead_id TEXT NOT NULL,
+                  converted INTEGER NOT NULL,
+                  outcome_at TIMESTAMP,
+                  received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_lead_outcomes_lead ON lead_outcomes (lead_id)")
+    c.execute('''CREATE TABLE IF NOT EXISTS feedback_runs
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  parent_version TEXT,
+                  model_version TEXT,
+                  labels INTEGER,
+                  auc_before REAL,
+                  auc_after REAL,
+                  promoted BOOLEAN,
+                  trained_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    conn.commit()
+    conn.close()
+
+
+def _parse_converted(value):
+    """0/1 from the usual CRM spellings; None when unrecognised"""
+    if isinstance(value, (bool, np.bool_)):
+        return int(value)
+    if isinstance(value, (int, float, np.integer, np.floating)) and not pd.isna(value):
+        return int(value) if value in (0, 1) else None
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return 1
+    if text in FALSE_VALUES:
+        return 0
+    return None
+
+
+def record_outcomes(records):
+    """Store conversion outcomes (list of dicts or DataFrame); returns accepted/rejected counts"""
+    if isinstance(records, pd.DataFrame):
+        records = records.to_dict("records")
+
+    rows, rejected = [], []
+    for i, record in enumerate(records):
+        lead_id = record.get('lead_id')
+        converted = _parse_converted(record.get('converted'))
+        if lead_id is None or (isinstance(lead_id, float) and np.isnan(lead_id)) or converted is None:
+            rejected.append({'row': i, 'error': "needs lead_id and converted (0/1)"})
+            continue
+        if isinstance(lead_id, float) and lead_id.is_integer():
+            lead_id = int(lead_id)
+        timestamp = pd.to_datetime(record.get('timestamp'), errors="coerce")
+        rows.append((str(lead_id), converted, None if pd.isna(timestamp) else timestamp.isoformat()))
+
+    if rows:
+        init_outcomes()
+        conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+        c = conn.cursor()
+        c.executemany("INSERT INTO lead_outcomes (lead_id, converted, outcome_at) VALUES (?, ?, ?)", rows)
+        conn.commit()
+        conn.close()
+    return {'accepted': len(rows), 'rejected': len(rejected), 'errors': rejected[:20]}
+
+
+def latest_outcomes():
+    """Most recent outcome per lead"""
+    init_outcomes()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    outcomes = pd.read_sql_query(
+        "SELECT lead_id, converted, outcome_at, received_at FROM lead_outcomes ORDER BY id", conn
+    )
+    conn.close()
+    return outcomes.drop_duplicates('lead_id', keep='last').reset_index(drop=True)
+
+
+def apply_outcomes(df):
+    """Fill missing `converted` labels in a raw lead frame from recorded outcomes; returns how many"""
+    if "lead_id" not in df.columns:
+        return 0
+    outcomes = latest_outcomes()
+    if outcomes.empty:
+        return 0
+
+    labels = df["lead_id"].astype(str).map(outcomes.set_index('lead_id')['converted'])
+    current = pd.to_numeric(df["converted"], errors="coerce") if "converted" in df.columns else pd.Series(np.nan, index=df.index)
+    fill = current.isna() & labels.notna()
+    if fill.any():
+        df["converted"] = current.where(~fill, labels)
+    return int(fill.sum())
+
+
+def pending_labels(model_entry):
+    """Outcomes received since a model was registered"""
+    init_outcomes()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute("SELECT COUNT(DISTINCT lead_id) FROM lead_outcomes WHERE received_at > ?", (model_entry['created_at'],))
+    count = c.fetchone()[0]
+    conn.close()
+    return int(count)
+
+
+def labelled_snapshot(features):
+    """Published feature rows of every lead with an outcome; returns (X, y)"""
+    outcomes = latest_outcomes()
+    if outcomes.empty:
+        return None, None
+
+    wanted = set(outcomes['lead_id'])
+    frames = []
+    # Oldest publication first so a lead's latest snapshot wins
+    for pointer in sorted(published_datasets(), key=lambda p: p['published_at']):
+        scored, _ = load_scored(pointer['dataset'])
+        if scored is None or "lead_id" not in scored.columns:
+            continue
+        ids = scored["lead_id"].astype(str)
+        hits = ids.isin(wanted).to_numpy()
+        if hits.any():
+            cols = [c for c in features if c in scored.columns]
+            frames.append(scored.loc[hits, cols].assign(lead_id=ids[hits].to_numpy()))
+    if not frames:
+        return None, None
+
+    snapshot = pd.concat(frames, ignore_index=True).drop_duplicates('lead_id', keep='last')
+    snapshot = snapshot.merge(outcomes[['lead_id', 'converted']], on='lead_id', how='inner')
+    for col in features:
+        if col not in snapshot.columns:
+            snapshot[col] = None
+    return snapshot[features], snapshot['converted'].astype(int)
+
+# ============================================================================
+# WARM-STARTED RETRAINING
+# ============================================================================
+#
+# The production forest keeps its trees and grows WARM_START_TREES new ones
+# fitted on the labelled snapshot, with the preprocessing left as fitted so
+# feature encodings don't move. Once the forest passes MAX_TREES the oldest
+# trees are retired, so models first trained on pseudo-labels drift towards
+# real outcomes over successive rounds. The result is registered as a new
+# version and promoted unless its holdout AUC falls more than AUC_TOLERANCE
+# below the current model's on the same leads.
+
+RETRAIN_MIN_LABELS = 200
+WARM_START_TREES = 50
+MAX_TREES = 400
+AUC_TOLERANCE = 0.01
+
+_retrain_lock = threading.Lock()
+
+
+def warm_start_retrain(min_labels=RETRAIN_MIN_LABELS, extra_trees=WARM_START_TREES, force=False):
+    """Grow the production model on accumulated outcomes once enough are pending; returns a summary"""
+    if not _retrain_lock.acquire(blocking=False):
+        return {'status': 'running'}
+    try:
+        pipeline, entry = load_registered_model()
+        if pipeline is None:
+            return {'status': 'no_model'}
+        pending = pending_labels(entry)
+        if pending < min_labels and not force:
+            return {'status': 'waiting', 'pending': pending, 'required': min_labels}
+
+        X, y = labelled_snapshot(entry['features'])
+        if X is None or len(X) < 20 or y.nunique() < 2:
+            return {'status': 'insufficient', 'pending': pending, 'labels': 0 if X is None else len(X)}
+
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.25, random_state=42, stratify=y)
+        auc_before = roc_auc_score(y_test, pipeline.predict_proba(X_test)[:, 1])
+
+        model = copy.deepcopy(pipeline)
+        rf = model.named_steps["rf"]
+        rf.set_params(warm_start=True, n_estimators=len(rf.estimators_) + extra_trees)
+        if rf.class_weight in ("balanced", "balanced_subsample"):
+            # Presets would be re-estimated per call; fix them from the labelled leads instead
+            classes = np.array([0, 1])
+            rf.set_params(class_weight=dict(zip(classes, compute_class_weight("balanced", classes=classes, y=y_train))))
+        rf.fit(model.named_steps["preprocess"].transform(X_train), y_train)
+        if len(rf.estimators_) > MAX_TREES:
+            rf.estimators_ = rf.estimators_[-MAX_TREES:]
+            rf.n_estimators = MAX_TREES
+        rf.set_params(warm_start=False)
+
+        auc_after = roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+        promote = auc_after >= auc_before - AUC_TOLERANCE
+        version = register_model(
+            model, entry['features'], dict(entry['params'], n_estimators=rf.n_estimators),
+            cv_scores={
+                'holdout_accuracy': accuracy_score(y_test, model.predict(X_test)),
+                'holdout_roc_auc': auc_after,
+                'feedback_labels': len(X),
+            },
+            training_mode="warm-start",
+            promote=promote,
+            feature_stats=entry['feature_stats'],
+        )
+
+        # Drift reference: the parent's training data plus the newly labelled leads
+        sketches = capture_sketches(X)
+        reference = load_reference_sketches(entry['version'])
+        save_sketches(version, 'feedback', 'training', merge_sketches(reference, sketches) if reference else sketches, len(X))
+
+        conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+        c = conn.cursor()
+        c.execute("INSERT INTO feedback_runs (parent_version, model_version, labels, auc_before, auc_after, promoted) "
+                  "VALUES (?, ?, ?, ?, ?, ?)",
+                  (entry['version'], version, len(X), float(auc_before), float(auc_after), promote))
+        conn.commit()
+        conn.close()
+
+        return {
+            'status': 'promoted' if promote else 'rejected',
+            'parent_version': entry['version'],
+            'model_version': version,
+            'labels': len(X),
+            'pending': pending,
+            'trees': rf.n_estimators,
+            'auc_before': float(auc_before),
+            'auc_after': float(auc_after),
+        }
+    finally:
+        _retrain_lock.release()
+
+
+def get_feedback_runs(limit=20):
+    """Recent warm-start runs, newest first"""
+    init_outcomes()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    runs = pd.read_sql_query(
+        "SELECT parent_version, model_version, labels, auc_before, auc_after, promoted, trained_at "
+        "FROM feedback_runs ORDER BY id DESC LIMIT ?", conn, params=(limit,)
+    )
+    conn.close()
+    return runs
+
+
+if __name__ == "__main__":
+    from lead_io import read_leads
+
+    parser = argparse.ArgumentParser(description="Conversion outcome feedback loop")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_ingest = sub.add_parser("ingest", help="Record outcomes from a CSV/Excel file (lead_id, converted[, timestamp])")
+    p_ingest.add_argument("data")
+    p_ingest.add_argument("--no-retrain", action="store_true")
+
+    p_retrain = sub.add_parser("retrain", help="Warm-start the production model on accumulated outcomes")
+    p_retrain.add_argument("--force", action="store_true", help="Retrain even below the label threshold")
+    p_retrain.add_argument("--min-labels", type=int, default=RETRAIN_MIN_LABELS)
+
+    args = parser.parse_args()
+    if args.command == "ingest":
+        outcomes = read_leads(args.data)
+        print(json.dumps(record_outcomes(outcomes), indent=2))
+        if not args.no_retrain:
+            print(json.dumps(warm_start_retrain(), indent=2))
+    else:
+        print(json.dumps(warm_start_retrain(args.min_labels, force=args.force), indent=2))
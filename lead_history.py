@@ -0,0 +1,408 @@
+import os
+import re
+import json
+import time
+import argparse
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from lead_store import _atomic_write
+
+# ============================================================================
+# SCORE HISTORY
+# ============================================================================
+#
+# score_history/<dataset>/leads-<run>.parquet   lead ids first seen in a run
+# score_history/<dataset>/run-<run>.parquet     (lead, score, category) segment
+#
+# Leads are numbered in order of first appearance, so a lead is a uint32
+# code and its id is stored once. A run's segment holds only the leads whose
+# score or category changed since their last recorded value (plus new leads,
+# and leads that left the dataset with score MISSING), sorted by code; every
+# KEYFRAME_EVERY runs a segment holds every lead, so reading the recent runs
+# never replays the whole history. Sorted codes go through Parquet's
+# DELTA_BINARY_PACKED encoding and scores and categories are uint8, so a
+# segment costs a few bits per changed lead.
+#
+# Reading replays the segments from the latest keyframe into a dense
+# (leads x runs) uint8 matrix, carrying each lead's last value forward; the
+# trending view is computed on that matrix. The sorted codes double as the
+# per-lead index: a lead's history is one binary search per segment.
+#
+# A run is a delta against the runs before it, so recording is serialised
+# per database: record_run holds a BEGIN IMMEDIATE transaction from picking
+# the run id until its row is committed, and readers only see runs whose
+# segments are already written.
+
+HISTORY_DIR = "score_history"
+KEYFRAME_EVERY = 30
+MISSING = 255
+# Category codes in ascending order, so "trending up" is an increasing code
+CATEGORY_CODES = {'Cold': 0, 'Warm': 1, 'Hot': 2}
+CATEGORY_NAMES = np.array(list(CATEGORY_CODES) + [None], dtype=object)
+TREND_WINDOW = 7
+
+_segment_cache = {}
+_lead_indexes = {}
+
+
+def _history_dir(dataset):
+    key = re.sub(r"[^A-Za-z0-9_.-]", "_", str(dataset)) or "dataset"
+    return os.path.join(HISTORY_DIR, key)
+
+
+def init_history_runs():
+    """Create the score history run table"""
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS score_history_runs
+                 (dataset TEXT NOT NULL,
+                  run_id INTEGER NOT NULL,
+                  model_version TEXT,
+                  leads INTEGER,
+                  changed INTEGER,
+                  new_leads INTEGER,
+                  keyframe BOOLEAN,
+                  bytes INTEGER,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  PRIMARY KEY (dataset, run_id))''')
+    conn.commit()
+    conn.close()
+
+
+def history_runs(dataset):
+    """Recorded runs of a dataset, oldest first"""
+    init_history_runs()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    runs = pd.read_sql_query(
+        "SELECT * FROM score_history_runs WHERE dataset = ? ORDER BY run_id", conn, params=(str(dataset),)
+    )
+    conn.close()
+    return runs
+
+
+def _write_segment(path, columns, delta_cols=()):
+    table = pa.table(columns)
+    _atomic_write(path, lambda tmp: pq.write_table(
+        table, tmp, compression="zstd", use_dictionary=False,
+        column_encoding={c: "DELTA_BINARY_PACKED" for c in delta_cols}))
+    return os.path.getsize(path)
+
+
+def _read_segment(path):
+    """A segment's columns as numpy arrays, cached per process until the file changes"""
+    identity = os.stat(path).st_mtime_ns
+    cached = _segment_cache.get(path)
+    if cached is None or cached[0] != identity:
+        table = pq.read_table(path)
+        cached = (identity, {name: table[name].to_numpy() for name in table.column_names})
+        _segment_cache[path] = cached
+    return cached[1]
+
+
+def lead_dictionary(dataset, runs=None):
+    """Lead ids in code order, and an Index over them (a lead's position is its code)"""
+    runs = history_runs(dataset) if runs is None else runs
+    identity = tuple(runs['run_id'])
+    cached = _lead_indexes.get(str(dataset))
+    if cached is None or cached[0] != identity:
+        directory = _history_dir(dataset)
+        parts = [_read_segment(os.path.join(directory, f"leads-{r}.parquet"))['lead_id'] for r in identity]
+        ids = np.concatenate(parts) if parts else np.array([], dtype=object)
+        cached = (identity, ids, pd.Index(ids))
+        _lead_indexes[str(dataset)] = cached
+    return cached[1], cached[2]
+
+
+def _replay(directory, runs, n_leads, skip=0):
+    """Dense (leads x runs) score and category matrices, replaying segments with values carried forward.
+
+    `runs` must start at a keyframe; the first `skip` runs are replayed
+    but left out of the matrices.
+    """
+    scores = np.full((n_leads, len(runs) - skip), MISSING, dtype=np.uint8)
+    categories = np.full((n_leads, len(runs) - skip), MISSING, dtype=np.uint8)
+    state_score = np.full(n_leads, MISSING, dtype=np.uint8)
+    state_category = np.full(n_leads, MISSING, dtype=np.uint8)
+    for j, (run_id, keyframe) in enumerate(zip(runs['run_id'], runs['keyframe'])):
+        if keyframe:
+            state_score[:], state_category[:] = MISSING, MISSING
+        segment = _read_segment(os.path.join(directory, f"run-{run_id}.parquet"))
+        codes = segment['lead']
+        state_score[codes] = segment['score']
+        state_category[codes] = segment['category']
+        if j >= skip:
+            scores[:, j - skip] = state_score
+            categories[:, j - skip] = state_category
+    return scores, categories
+
+
+def _current_state(dataset, runs, n_leads):
+    """Every lead's last recorded (score, category), replayed from the latest keyframe"""
+    if runs.empty:
+        return np.full(n_leads, MISSING, dtype=np.uint8), np.full(n_leads, MISSING, dtype=np.uint8)
+    start = runs.index[runs['keyframe'].astype(bool)][-1]
+    directory = _history_dir(dataset)
+    score = np.full(n_leads, MISSING, dtype=np.uint8)
+    category = np.full(n_leads, MISSING, dtype=np.uint8)
+    for run_id in runs.loc[start:, 'run_id']:
+        segment = _read_segment(os.path.join(directory, f"run-{run_id}.parquet"))
+        score[segment['lead']], category[segment['lead']] = segment['score'], segment['category']
+    return score, category
+
+
+def record_run(dataset, scored_df, model_version=None):
+    """Append a scoring run's (lead, score, category) changes to the dataset's history; returns the run's report"""
+    start = time.perf_counter()
+    directory = _history_dir(dataset)
+    os.makedirs(directory, exist_ok=True)
+    init_history_runs()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False, timeout=60, isolation_level=None)
+    try:
+        # Held until the run's row commits: a concurrent recorder waits here, then sees this run
+        conn.execute("BEGIN IMMEDIATE")
+        runs = pd.read_sql_query(
+            "SELECT * FROM score_history_runs WHERE dataset = ? ORDER BY run_id", conn, params=(str(dataset),)
+        )
+        report = _record_segments(dataset, directory, runs, scored_df, model_version)
+        conn.execute("""INSERT INTO score_history_runs
+                        (dataset, run_id, model_version, leads, changed, new_leads, keyframe, bytes)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                     (report['dataset'], report['run_id'], model_version, report['leads'], report['changed'],
+                      report['new_leads'], int(report['keyframe']), report['bytes']))
+        conn.execute("COMMIT")
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+def _record_segments(dataset, directory, runs, scored_df, model_version):
+    """Write the next run's lead-dictionary and change segments after `runs`; returns the run's report"""
+    run_id = int(runs['run_id'].max()) + 1 if len(runs) else 0
+    keyframe = run_id % KEYFRAME_EVERY == 0
+
+    ids = (scored_df['lead_id'] if 'lead_id' in scored_df.columns else scored_df.index.to_series()).astype(str)
+    unique = ~ids.duplicated(keep='last').to_numpy()
+    ids, scored = ids[unique], scored_df[unique]
+    known, index = lead_dictionary(dataset, runs)
+    codes = index.get_indexer(ids.to_numpy())
+    new = codes < 0
+    codes[new] = len(known) + np.arange(new.sum())
+    n_leads = len(known) + int(new.sum())
+
+    score = pd.to_numeric(scored['lead_score'], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    # An unscored lead is recorded as MISSING, not as a score of 0
+    score = np.where(np.isnan(score), MISSING, np.clip(score, 0, 100)).astype(np.uint8)
+    category = scored['lead_category'].map(CATEGORY_CODES).fillna(MISSING).to_numpy(dtype=np.uint8)
+    next_score = np.full(n_leads, MISSING, dtype=np.uint8)
+    next_category = np.full(n_leads, MISSING, dtype=np.uint8)
+    next_score[codes], next_category[codes] = score, category
+
+    if keyframe:
+        changed = np.flatnonzero(next_score != MISSING)
+    else:
+        last_score, last_category = _current_state(dataset, runs, n_leads)
+        # Leads gone from this run are recorded once, as MISSING
+        changed = np.flatnonzero((next_score != last_score) | (next_category != last_category))
+
+    size = _write_segment(os.path.join(directory, f"leads-{run_id}.parquet"),
+                          {'lead_id': pa.array(ids.to_numpy()[new], type=pa.string())})
+    size += _write_segment(os.path.join(directory, f"run-{run_id}.parquet"), {
+        'lead': pa.array(changed.astype(np.uint32)),
+        'score': pa.array(next_score[changed]),
+        'category': pa.array(next_category[changed]),
+    }, delta_cols=['lead'])
+
+    report = {
+        'dataset': str(dataset),
+        'run_id': run_id,
+        'model_version': model_version,
+        'leads': len(ids),
+        'changed': len(changed),
+        'new_leads': int(new.sum()),
+        'keyframe': keyframe,
+        'bytes': size,
+    }
+    return report
+
+
+def load_history(dataset, last_runs=TREND_WINDOW):
+    """(lead ids, runs, scores, categories) over the last runs; matrices are (leads x runs) uint8, MISSING when absent"""
+    runs = history_runs(dataset)
+    ids, _ = lead_dictionary(dataset, runs)
+    if runs.empty:
+        empty = np.empty((0, 0), dtype=np.uint8)
+        return ids, runs, empty, empty
+    first = len(runs) - min(last_runs, len(runs))
+    # Replay from the keyframe at or before the window's first run
+    start = runs.index[runs['keyframe'].astype(bool) & (runs.index <= first)][-1]
+    scores, categories = _replay(_history_dir(dataset), runs.loc[start:], len(ids), skip=first - start)
+    return ids, runs.iloc[first:].reset_index(drop=True), scores, categories
+
+
+def lead_history(dataset, lead_id):
+    """One lead's score and category after every run: a binary search in each segment's sorted codes"""
+    runs = history_runs(dataset)
+    _, index = lead_dictionary(dataset, runs)
+    code = index.get_indexer([str(lead_id)])[0]
+    if code < 0:
+        return pd.DataFrame(columns=['run_id', 'created_at', 'model_version', 'lead_score', 'lead_category'])
+
+    directory = _history_dir(dataset)
+    score, category = MISSING, MISSING
+    rows = []
+    for run in runs.itertuples():
+        if run.keyframe:
+            # Keyframes list every lead in the run; absent means gone
+            score, category = MISSING, MISSING
+        segment = _read_segment(os.path.join(directory, f"run-{run.run_id}.parquet"))
+        i = np.searchsorted(segment['lead'], code)
+        if i < len(segment['lead']) and segment['lead'][i] == code:
+            score, category = segment['score'][i], segment['category'][i]
+        rows.append({
+            'run_id': run.run_id,
+            'created_at': run.created_at,
+            'model_version': run.model_version,
+            'lead_score': None if score == MISSING else int(score),
+            'lead_category': CATEGORY_NAMES[min(category, len(CATEGORY_NAMES) - 1)],
+        })
+    return pd.DataFrame(rows).astype({'lead_score': 'Int64'})
+
+
+def trending_up(dataset, window=TREND_WINDOW, min_change=10):
+    """Leads whose category rose, or whose score climbed by `min_change`+ points, over the last `window` runs.
+
+    The least-squares slope (points per run) over each lead's recorded runs
+    is computed for every lead at once on the history matrix.
+    """
+    ids, runs, scores, categories = load_history(dataset, window)
+    columns = ['lead_id', 'first_score', 'last_score', 'change', 'slope', 'first_category', 'last_category', 'runs']
+    if scores.shape[1] < 2:
+        return pd.DataFrame(columns=columns)
+
+    present = scores != MISSING
+    n = present.sum(axis=1)
+    # First and last recorded run of each lead in the window
+    first = np.argmax(present, axis=1)
+    last = scores.shape[1] - 1 - np.argmax(present[:, ::-1], axis=1)
+    rows = np.arange(len(ids))
+    first_score, last_score = scores[rows, first].astype(int), scores[rows, last].astype(int)
+    first_category, last_category = categories[rows, first], categories[rows, last]
+
+    x = np.broadcast_to(np.arange(scores.shape[1], dtype=float), scores.shape)
+    y = np.where(present, scores, 0).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = np.where(present, x, 0).sum(axis=1) / n
+        y_mean = y.sum(axis=1) / n
+        dx = np.where(present, x - x_mean[:, None], 0)
+        slope = (dx * (y - y_mean[:, None])).sum(axis=1) / (dx ** 2).sum(axis=1)
+
+    rising = (n >= 2) & (
+        (last_category > first_category) & (last_category != MISSING)
+        | (last_score - first_score >= min_change) & (slope > 0)
+    )
+    picked = np.flatnonzero(rising)
+    trend = pd.DataFrame({
+        'lead_id': ids[picked],
+        'first_score': first_score[picked],
+        'last_score': last_score[picked],
+        'change': last_score[picked] - first_score[picked],
+        'slope': np.round(slope[picked], 2),
+        'first_category': CATEGORY_NAMES[np.minimum(first_category[picked], len(CATEGORY_NAMES) - 1)],
+        'last_category': CATEGORY_NAMES[np.minimum(last_category[picked], len(CATEGORY_NAMES) - 1)],
+        'runs': n[picked],
+    }, columns=columns)
+    return trend.sort_values(['change', 'slope'], ascending=False).reset_index(drop=True)
+
+
+def history_size(dataset):
+    """Bytes on disk of a dataset's history"""
+    directory = _history_dir(dataset)
+    if not os.path.isdir(directory):
+        return 0
+    return sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+
+
+def benchmark_history(n_leads=1_000_000, n_runs=30, churn=0.2, seed=42):
+    """Record simulated daily runs (a share of leads drifting each day) and time the reads"""
+    from lead_features import map_probability_to_category
+
+    rng = np.random.default_rng(seed)
+    dataset = f"bench-{n_leads}x{n_runs}"
+    directory = _history_dir(dataset)
+    if os.path.isdir(directory):
+        for f in os.listdir(directory):
+            os.remove(os.path.join(directory, f))
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    init_history_runs()
+    conn.execute("DELETE FROM score_history_runs WHERE dataset = ?", (dataset,))
+    conn.commit()
+    conn.close()
+
+    category_of = np.array([map_probability_to_category(s) for s in range(101)], dtype=object)
+    lead_ids = np.array([f"L{i:08d}" for i in range(n_leads)], dtype=object)
+    score = rng.integers(0, 101, n_leads)
+    record_sec = []
+    for _ in range(n_runs):
+        moving = rng.random(n_leads) < churn
+        score[moving] = np.clip(score[moving] + rng.integers(-5, 8, moving.sum()), 0, 100)
+        frame = pd.DataFrame({'lead_id': lead_ids, 'lead_score': score, 'lead_category': category_of[score]})
+        record_sec.append(record_run(dataset, frame)['seconds'])
+
+    size = history_size(dataset)
+    start = time.perf_counter()
+    trend = trending_up(dataset)
+    trending_sec = time.perf_counter() - start
+    lead_history(dataset, lead_ids[0])
+    start = time.perf_counter()
+    for lead_id in lead_ids[rng.integers(0, n_leads, 20)]:
+        lead_history(dataset, lead_id)
+    lookup_ms = (time.perf_counter() - start) / 20 * 1000
+    full_copy = n_leads * n_runs * (len(lead_ids[0]) + 8 + 4)
+    return {
+        'leads': n_leads,
+        'runs': n_runs,
+        'daily_churn': churn,
+        'history_mb': size / 1024**2,
+        'bytes_per_lead_run': size / (n_leads * n_runs),
+        'full_copies_mb_estimate': full_copy / 1024**2,
+        'record_sec_mean': float(np.mean(record_sec)),
+        'trending_sec': trending_sec,
+        'trending_leads': len(trend),
+        'lead_lookup_ms': lookup_ms,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-lead score history")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_lead = sub.add_parser("lead", help="Score history of one lead")
+    p_lead.add_argument("dataset")
+    p_lead.add_argument("lead_id")
+
+    p_trend = sub.add_parser("trending", help="Leads trending up over the last runs")
+    p_trend.add_argument("dataset")
+    p_trend.add_argument("--window", type=int, default=TREND_WINDOW)
+
+    p_bench = sub.add_parser("bench", help="Record simulated daily runs and time the reads")
+    p_bench.add_argument("--leads", type=int, default=1_000_000)
+    p_bench.add_argument("--runs", type=int, default=30)
+    p_bench.add_argument("--churn", type=float, default=0.2)
+
+    args = parser.parse_args()
+    if args.command == "lead":
+        print(lead_history(args.dataset, args.lead_id).to_string(index=False))
+    elif args.command == "trending":
+        print(trending_up(args.dataset, args.window).head(50).to_string(index=False))
+    else:
+        print(json.dumps(benchmark_history(args.leads, args.runs, args.churn), indent=2))
@@ -0,0 +1,497 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# ============================================================================
+# COMPILED FOREST INFERENCE
+# ============================================================================
+#
+# A fitted Pipeline(preprocess -> rf) is flattened into plain numpy arrays:
+#   - preprocessing: imputer medians, scaler mean/scale and one-hot categories
+#   - forest: one contiguous node table for all trees (feature, threshold
+#     rank, interleaved children, leaf probability), leaves pointing at
+#     themselves so every path can run exactly `max_depth` steps
+#
+# Each transformed feature is cut at the sorted thresholds the forest uses on
+# it, and nodes compare the row's cell index with their threshold's rank:
+# x <= cuts[k] exactly when (number of cuts below x) <= k, so paths match the
+# float comparisons sklearn makes. Rows landing in the same cell of every
+# feature follow identical paths, so large batches only walk distinct cells.
+
+SMALL_BATCH = 64
+CHUNK_ROWS = 4096
+
+
+def _compile_preprocessor(ct):
+    """Extract the fitted ColumnTransformer into per-block numpy parameters"""
+    blocks = []
+    for name, trans, cols in ct.transformers_:
+        if trans == "drop" or name == "remainder":
+            continue
+        steps = dict(trans.named_steps)
+        if "scaler" in steps:
+            stats = steps["imputer"].statistics_
+            # SimpleImputer drops columns whose median is NaN (all values missing)
+            keep = ~np.isnan(stats)
+            blocks.append({
+                'kind': 'num',
+                'cols': [c for c, k in zip(cols, keep) if k],
+                'fill': stats[keep].astype(np.float64),
+                'mean': steps["scaler"].mean_,
+                'scale': steps["scaler"].scale_,
+            })
+        else:
+            categories = [np.asarray(c) for c in steps["ohe"].categories_]
+            blocks.append({
+                'kind': 'cat',
+                'cols': list(cols),
+                'fill': steps["imputer"].statistics_,
+                'categories': categories,
+                'lookup': [{v: i for i, v in enumerate(c.tolist())} for c in categories],
+                'index': [pd.Index(c) for c in categories],
+            })
+    return blocks
+
+
+def _compile_forest(rf):
+    """Flatten every tree of a fitted RandomForestClassifier into one node table"""
+    features, thresholds, children, leaf_values, roots = [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for est in rf.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        idx = np.arange(n)
+        is_leaf = tree.children_left == -1
+
+        # Leaf probability normalized exactly as DecisionTreeClassifier.predict_proba
+        value = tree.value[:, 0, :rf.n_classes_]
+        normalizer = value.sum(axis=1)
+        normalizer[normalizer == 0.0] = 1.0
+        proba = value[:, 1] / normalizer if rf.n_classes_ > 1 else np.zeros(n)
+
+        # children[2 * node + go_left]; leaves loop back to themselves
+        left = np.where(is_leaf, idx, tree.children_left) + offset
+        right = np.where(is_leaf, idx, tree.children_right) + offset
+        features.append(np.where(is_leaf, -1, tree.feature))
+        thresholds.append(tree.threshold)
+        children.append(np.stack([right, left], axis=1).ravel())
+        leaf_values.append(proba)
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    feature, rank, cuts, multipliers = index_cuts(
+        np.concatenate(features), np.concatenate(thresholds), rf.n_features_in_
+    )
+    return {
+        'feature': feature.astype(np.intp),
+        'rank': rank,
+        'children': np.concatenate(children).astype(np.intp),
+        'leaf_value': np.ascontiguousarray(np.concatenate(leaf_values)),
+        'leaf_scale': 1.0,
+        'roots': np.asarray(roots, dtype=np.intp),
+        'cuts': cuts,
+        'cell_multipliers': multipliers,
+        'max_depth': int(max_depth),
+        'n_features': int(rf.n_features_in_),
+    }
+
+
+def index_cuts(feature, threshold, n_features, rank_dtype=np.int32):
+    """Per-feature sorted cut points and each split node's rank among them.
+
+    `feature` is -1 at leaves. Returns (feature with leaves set to 0, rank,
+    cuts, mixed-radix cell key multipliers or None).
+    """
+    feature = feature.copy()
+    cuts = []
+    rank = np.full(len(feature), np.iinfo(rank_dtype).max, dtype=rank_dtype)
+    for f in range(n_features):
+        on_f = feature == f
+        f_cuts = np.unique(threshold[on_f])
+        rank[on_f] = np.searchsorted(f_cuts, threshold[on_f])
+        cuts.append(f_cuts)
+    feature[feature < 0] = 0
+
+    # Mixed-radix cell key, when every feature's cell index fits in one int64
+    radix = [len(c) + 1 for c in cuts]
+    multipliers = None
+    if int(np.prod([float(r) for r in radix])) < 2 ** 62:
+        multipliers = np.cumprod([1] + radix[:-1]).astype(np.int64)
+    return feature, rank, cuts, multipliers
+
+
+def compile_pipeline(pipeline):
+    """Compile a fitted preprocess + RandomForest pipeline into numpy arrays"""
+    compiled = _compile_forest(pipeline.named_steps["rf"])
+    compiled['blocks'] = _compile_preprocessor(pipeline.named_steps["preprocess"])
+    compiled['input_cols'] = [c for b in compiled['blocks'] for c in b['cols']]
+    return compiled
+
+
+def _column(X, col):
+    """Column values from a DataFrame or a {column: values} mapping"""
+    if isinstance(X, pd.DataFrame):
+        return X[col].to_numpy()
+    return np.asarray(X[col])
+
+
+def records_to_columns(records, cols):
+    """Turn a list of feature dicts into a {column: list} mapping"""
+    return {c: [r.get(c) for r in records] for c in cols}
+
+
+def transform_compiled(compiled, X):
+    """Fused imputation, scaling and one-hot encoding straight to float32"""
+    n = len(X) if isinstance(X, pd.DataFrame) else len(next(iter(X.values()), []))
+    out = np.zeros((n, compiled['n_features']), dtype=np.float32)
+
+    pos = 0
+    for b in compiled['blocks']:
+        if b['kind'] == 'num':
+            values = np.empty((n, len(b['cols'])), dtype=np.float64)
+            for j, col in enumerate(b['cols']):
+                values[:, j] = pd.to_numeric(_column(X, col), errors="coerce") if n > SMALL_BATCH else [
+                    np.nan if v is None else v for v in _column(X, col).tolist()
+                ]
+            values = np.where(np.isnan(values), b['fill'], values)
+            # Same operation order as StandardScaler.transform
+            values -= b['mean']
+            values /= b['scale']
+            out[:, pos:pos + len(b['cols'])] = values
+            pos += len(b['cols'])
+        else:
+            for col, fill, cats, lookup, index in zip(
+                b['cols'], b['fill'], b['categories'], b['lookup'], b['index']
+            ):
+                raw = _column(X, col)
+                if n > SMALL_BATCH:
+                    raw = raw.astype(object)
+                    raw[pd.isna(raw)] = fill
+                    codes = index.get_indexer(raw)
+                else:
+                    codes = np.array([
+                        lookup.get(fill if v is None or v != v else v, -1) for v in raw.tolist()
+                    ], dtype=np.intp)
+                known = codes >= 0
+                out[np.flatnonzero(known), pos + codes[known]] = 1.0
+                pos += len(cats)
+    return out
+
+
+def to_cells(compiled, Xt):
+    """Cell index of every transformed value among its feature's cut points"""
+    cells = np.empty(Xt.shape, dtype=np.int32)
+    for f, f_cuts in enumerate(compiled['cuts']):
+        cells[:, f] = np.searchsorted(f_cuts, Xt[:, f].astype(np.float64), side="left")
+    return cells
+
+
+def _predict_level_sync(compiled, cells):
+    """Advance all (row, tree) pairs one level per step; best for small batches"""
+    n_trees = len(compiled['roots'])
+    feature, rank, children = compiled['feature'], compiled['rank'], compiled['children']
+
+    flat = cells.ravel()
+    row_base = (np.arange(len(cells), dtype=np.intp) * cells.shape[1])[:, None]
+    node = np.broadcast_to(compiled['roots'], (len(cells), n_trees)).copy()
+    for _ in range(compiled['max_depth']):
+        go_left = flat[row_base + feature[node]] <= rank[node]
+        node = children[2 * node + go_left]
+
+    # Accumulate tree by tree in estimator order, like RandomForestClassifier
+    values = compiled['leaf_value'][node]
+    total = np.zeros(len(cells), dtype=np.float64)
+    for t in range(n_trees):
+        total += values[:, t]
+    return total
+
+
+def _predict_tree_major(compiled, cells):
+    """Walk one tree at a time over the whole chunk; best for large batches"""
+    feature, rank, children = compiled['feature'], compiled['rank'], compiled['children']
+    leaf_value = compiled['leaf_value']
+
+    flat = cells.ravel()
+    row_base = np.arange(len(cells), dtype=np.intp) * cells.shape[1]
+    total = np.zeros(len(cells), dtype=np.float64)
+    for root in compiled['roots']:
+        node = np.full(len(cells), root, dtype=np.intp)
+        for _ in range(compiled['max_depth']):
+            go_left = flat[row_base + feature[node]] <= rank[node]
+            node = children[2 * node + go_left]
+        total += leaf_value[node]
+    return total
+
+
+def predict_forest(compiled, Xt, n_threads=None):
+    """Vectorized traversal of every tree; returns P(class 1) per row"""
+    n_trees = len(compiled['roots'])
+    cells = to_cells(compiled, Xt)
+    if len(cells) <= SMALL_BATCH:
+        return _predict_level_sync(compiled, cells) / (n_trees * compiled['leaf_scale'])
+
+    # Only walk distinct cells, then broadcast their scores back to rows
+    inverse = None
+    if compiled['cell_multipliers'] is not None:
+        keys = cells.astype(np.int64) @ compiled['cell_multipliers']
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        cells = cells[first]
+
+    # numpy releases the GIL inside gathers and comparisons, so row chunks
+    # scale across threads the same way the forest's own n_jobs does
+    chunks = [cells[i:i + CHUNK_ROWS] for i in range(0, len(cells), CHUNK_ROWS)]
+    n_threads = n_threads or min(len(chunks), os.cpu_count() or 1)
+    if n_threads > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            totals = list(pool.map(lambda chunk: _predict_tree_major(compiled, chunk), chunks))
+    else:
+        totals = [_predict_tree_major(compiled, chunk) for chunk in chunks]
+    scores = np.concatenate(totals) / (n_trees * compiled['leaf_scale'])
+    return scores if inverse is None else scores[inverse]
+
+
+def predict_proba_compiled(compiled, X, n_threads=None):
+    """Score leads (DataFrame or {column: values}) with the compiled model; returns P(converted)"""
+    return predict_forest(compiled, transform_compiled(compiled, X), n_threads)
+
+
+def predict_records(compiled, records):
+    """Score a list of engineered-feature dicts without building a DataFrame"""
+    return predict_proba_compiled(compiled, records_to_columns(records, compiled['input_cols']))
+
+
+# ============================================================================
+# PATH CONTRIBUTIONS
+# ============================================================================
+#
+# The node table stores the class-1 probability of every node, not just the
+# leaves, so a lead's path through a tree splits that tree's output exactly:
+# leaf value = root value + the change in probability at each split taken.
+# Crediting each change to the split's feature and averaging over trees gives
+# per-feature contributions that, with the mean root value as bias, add up to
+# the forest's P(converted). One-hot columns are folded back into the input
+# column they encode, so reasons are named after engineered features.
+
+REASON_CODES = 3
+
+
+def input_feature_map(compiled):
+    """Matrix folding transformed (one-hot expanded) features onto input columns"""
+    fold = np.zeros((compiled['n_features'], len(compiled['input_cols'])))
+    pos = 0
+    col = 0
+    for b in compiled['blocks']:
+        widths = [1] * len(b['cols']) if b['kind'] == 'num' else [len(c) for c in b['categories']]
+        for width in widths:
+            fold[pos:pos + width, col] = 1.0
+            pos += width
+            col += 1
+    return fold
+
+
+def _contributions_tree_major(compiled, cells):
+    """Walk one tree at a time, crediting each split's probability change to its feature"""
+    feature, rank, children = compiled['feature'], compiled['rank'], compiled['children']
+    # Float copy so quantized (uint8) node values subtract without wrapping
+    node_value = compiled['leaf_value'].astype(np.float64)
+
+    flat = cells.ravel()
+    row_base = np.arange(len(cells), dtype=np.intp) * cells.shape[1]
+    contributions = np.zeros(cells.size, dtype=np.float64)
+    for root in compiled['roots']:
+        node = np.full(len(cells), root, dtype=np.intp)
+        for _ in range(compiled['max_depth']):
+            slot = row_base + feature[node]
+            go_left = flat[slot] <= rank[node]
+            child = children[2 * node + go_left]
+            # One slot per row, so the fancy-indexed add never collides;
+            # leaves loop back to themselves and add zero
+            contributions[slot] += node_value[child] - node_value[node]
+            node = child
+    return contributions.reshape(cells.shape)
+
+
+def predict_contributions(compiled, X, n_threads=None):
+    """Per-input-column contributions to P(converted); returns (bias, contributions)"""
+    n_trees = len(compiled['roots'])
+    cells = to_cells(compiled, transform_compiled(compiled, X))
+
+    inverse = None
+    if len(cells) > SMALL_BATCH and compiled['cell_multipliers'] is not None:
+        keys = cells.astype(np.int64) @ compiled['cell_multipliers']
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        cells = cells[first]
+
+    chunks = [cells[i:i + CHUNK_ROWS] for i in range(0, len(cells), CHUNK_ROWS)]
+    n_threads = n_threads or min(len(chunks), os.cpu_count() or 1)
+    if n_threads > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            parts = list(pool.map(lambda chunk: _contributions_tree_major(compiled, chunk), chunks))
+    else:
+        parts = [_contributions_tree_major(compiled, chunk) for chunk in chunks]
+
+    contributions = np.concatenate(parts) if parts else np.zeros((0, compiled['n_features']))
+    contributions = contributions @ input_feature_map(compiled) / (n_trees * compiled['leaf_scale'])
+    if inverse is not None:
+        contributions = contributions[inverse]
+    bias = float(compiled['leaf_value'][compiled['roots']].mean() / compiled['leaf_scale'])
+    return bias, contributions
+
+
+def reason_codes(compiled, X, top_k=REASON_CODES, n_threads=None):
+    """Top drivers per lead as compact columns.
+
+    reason_<k> is the input column with the k-th largest absolute contribution
+    (categorical) and reason_<k>_pts its signed contribution in score points
+    (int8).
+    """
+    _, contributions = predict_contributions(compiled, X, n_threads)
+    names = compiled['input_cols']
+    top_k = min(top_k, len(names))
+    order = np.argsort(-np.abs(contributions), axis=1, kind="stable")[:, :top_k]
+    points = np.round(np.take_along_axis(contributions, order, axis=1) * 100)
+
+    reasons = {}
+    for k in range(top_k):
+        reasons[f"reason_{k + 1}"] = pd.Categorical.from_codes(order[:, k], categories=names)
+        reasons[f"reason_{k + 1}_pts"] = points[:, k].astype(np.int8)
+    index = X.index if isinstance(X, pd.DataFrame) else None
+    return pd.DataFrame(reasons, index=index)
+
+
+def attach_reason_codes(scored, compiled, features, rows=None):
+    """Write reason code columns into a scored frame in place.
+
+    With `rows` (a boolean mask), only those leads are explained and the
+    existing reason columns are updated for them, keeping their compact dtypes.
+    """
+    names = compiled['input_cols']
+    existing = scored["reason_1"].dtype if "reason_1" in scored.columns else None
+    if rows is None or not isinstance(existing, pd.CategoricalDtype) or list(existing.categories) != names:
+        reasons = reason_codes(compiled, scored[features])
+        for col in reasons.columns:
+            scored[col] = reasons[col].array
+        return
+
+    rows = np.asarray(rows, dtype=bool)
+    if not rows.any():
+        return
+    reasons = reason_codes(compiled, scored.loc[rows, features])
+    for col in reasons.columns:
+        if col.endswith("_pts"):
+            values = scored[col].to_numpy(dtype=np.int8).copy()
+            values[rows] = reasons[col].to_numpy()
+        else:
+            codes = scored[col].cat.codes.to_numpy().copy()
+            codes[rows] = reasons[col].cat.codes.to_numpy()
+            values = pd.Categorical.from_codes(codes, categories=names)
+        scored[col] = values
+
+
+def format_reasons(scored):
+    """Human-readable top drivers, e.g. 'budget_match +12 · recency_score -4'"""
+    parts = []
+    k = 1
+    while f"reason_{k}" in scored.columns:
+        names = scored[f"reason_{k}"].astype(str)
+        points = scored[f"reason_{k}_pts"].astype(int)
+        parts.append(names + " " + points.map("{:+d}".format))
+        k += 1
+    if not parts:
+        return pd.Series("", index=scored.index)
+    return pd.concat(parts, axis=1).agg(" · ".join, axis=1)
+
+
+def benchmark_contributions(compiled, X, repeats=3):
+    """Contribution throughput next to plain scoring, plus the additivity check"""
+    predict_proba_compiled(compiled, X)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        probability = predict_proba_compiled(compiled, X)
+    score_sec = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        bias, contributions = predict_contributions(compiled, X)
+    explain_sec = (time.perf_counter() - start) / repeats
+
+    start = time.perf_counter()
+    reason_codes(compiled, X)
+    reasons_sec = time.perf_counter() - start
+
+    return {
+        'rows': len(X),
+        'score_rows_per_sec': len(X) / score_sec if score_sec > 0 else float("inf"),
+        'contrib_rows_per_sec': len(X) / explain_sec if explain_sec > 0 else float("inf"),
+        'reason_codes_rows_per_sec': len(X) / reasons_sec if reasons_sec > 0 else float("inf"),
+        'max_additivity_error': float(np.max(np.abs(bias + contributions.sum(axis=1) - probability))) if len(X) else 0.0,
+    }
+
+
+def check_parity(pipeline, compiled, X):
+    """Compare compiled scores with the pipeline's, forcing sequential tree accumulation"""
+    rf = pipeline.named_steps["rf"]
+    n_jobs = rf.n_jobs
+    rf.n_jobs = 1
+    try:
+        expected = pipeline.predict_proba(X)[:, 1]
+    finally:
+        rf.n_jobs = n_jobs
+    actual = predict_proba_compiled(compiled, X)
+    return {
+        'rows': len(X),
+        'identical': bool(np.array_equal(expected, actual)),
+        'max_abs_diff': float(np.max(np.abs(expected - actual))) if len(X) else 0.0,
+    }
+
+
+def benchmark_inference(pipeline, compiled, X, repeats=20):
+    """Time single-lead latency and batch throughput for sklearn vs compiled"""
+    single = X.iloc[[0]]
+    record = single.to_dict("records")
+    timings = {}
+    for label, fn, one in [
+        ('sklearn', lambda data: pipeline.predict_proba(data)[:, 1], single),
+        ('compiled', lambda data: predict_proba_compiled(compiled, data), single),
+        ('compiled_record', lambda data: predict_records(compiled, data), record),
+    ]:
+        fn(one)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            fn(one)
+        timings[label + '_single_ms'] = (time.perf_counter() - start) / repeats * 1000
+        if label == 'compiled_record':
+            continue
+
+        start = time.perf_counter()
+        fn(X)
+        elapsed = time.perf_counter() - start
+        timings[label + '_batch_rows_per_sec'] = len(X) / elapsed if elapsed > 0 else float("inf")
+    return timings
+
+
+if __name__ == "__main__":
+    import sys
+    from lead_features import engineer_features, build_target, pseudo_labels
+    from lead_model import build_pipeline
+    from lead_io import read_leads
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "5000_rental_crm_leads.xlsx"
+    df = read_leads(path)
+    feature_cols = engineer_features(df)
+    X, y = build_target(df, df[feature_cols].copy())
+    if y is None:
+        y = pseudo_labels(X)
+
+    pipeline = build_pipeline(X).fit(X, y)
+    compiled = compile_pipeline(pipeline)
+    print("parity:", check_parity(pipeline, compiled, X))
+    for key, value in benchmark_inference(pipeline, compiled, X).items():
+        print(f"{key}: {value:,.3f}")
+    for key, value in benchmark_contributions(compiled, X).items():
+        print(f"{key}: {value:,.6g}")
@@ -0,0 +1,271 @@
+import io
+import os
+import json
+import time
+import argparse
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from joblib.externals.loky import get_reusable_executor
+
+from lead_io import sheet_names, _source_name, _source_size
+from lead_schema import LEAD_SCHEMA, load_leads
+
+# ============================================================================
+# MULTI-FILE INGESTION
+# ============================================================================
+#
+# Branch offices each send a workbook, often with a sheet per team. Every
+# (file, worksheet) pair is a part, and parts are loaded with load_leads in a
+# process pool: parsing is pure-Python work, so processes scale where threads
+# would queue on the GIL. Uploaded files are shipped to workers as bytes.
+#
+# A part that fails (corrupt file, a sheet that isn't leads) is reported and
+# left out; the ingest only fails when no part loads. The loaded parts are
+# aligned to the union of their schema columns and copied straight into
+# columns allocated once at the combined length, instead of pd.concat
+# re-aligning and re-allocating part by part. Every row is tagged with the
+# file and sheet it came from.
+
+ORIGIN_FILE_COL = "origin_file"
+ORIGIN_SHEET_COL = "origin_sheet"
+WORKBOOK_EXTS = (".xlsx", ".xlsm")
+
+
+def _payload(source):
+    """Something picklable a worker can read: the path, or (name, bytes) of an upload"""
+    if isinstance(source, str):
+        return source
+    source.seek(0)
+    return (_source_name(source), source.read())
+
+
+def _open(payload):
+    """Reverse of _payload"""
+    if isinstance(payload, str):
+        return payload
+    name, data = payload
+    buffer = io.BytesIO(data)
+    buffer.name = name
+    return buffer
+
+
+def expand_parts(sources, all_sheets=True):
+    """(source, file label, sheet) for every worksheet of every source; sheet is None for CSV/Parquet"""
+    parts = []
+    for source in sources:
+        label = os.path.basename(_source_name(source)) or "upload"
+        sheets = [None]
+        if os.path.splitext(label)[1].lower() in WORKBOOK_EXTS:
+            try:
+                sheets = sheet_names(source) if all_sheets else sheet_names(source)[:1]
+            except Exception:
+                # Left to the worker, whose load fails and is reported with the other parts
+                sheets = [0]
+        parts.extend((source, label, sheet) for sheet in sheets)
+    return parts
+
+
+def _load_part(payload, sheet, engine=None):
+    """Load one part (runs in a worker process); returns (frame or None, report)"""
+    start = time.perf_counter()
+    try:
+        df = load_leads(_open(payload), engine=engine, sheet_name=0 if sheet is None else sheet)
+        return df, {
+            'rows': len(df),
+            'seconds': time.perf_counter() - start,
+            'engine': df.attrs['reader']['engine'],
+            'schema': df.attrs['schema'],
+        }
+    except Exception as e:
+        return None, {'rows': 0, 'seconds': time.perf_counter() - start, 'error': f"{type(e).__name__}: {e}"}
+
+
+def _column_dtype(frames, column, schema):
+    """Dtype of a combined column: datetime, int64 when every part has it as integers, float64, else object"""
+    dtypes = [df[column].dtype for df in frames if column in df.columns]
+    if schema.get(column, ('text',))[0] == 'datetime' and all(pd.api.types.is_datetime64_any_dtype(d) for d in dtypes):
+        return np.dtype("datetime64[us]")
+    if all(pd.api.types.is_numeric_dtype(d) and not pd.api.types.is_bool_dtype(d) for d in dtypes):
+        if len(dtypes) == len(frames) and all(pd.api.types.is_integer_dtype(d) for d in dtypes):
+            return np.dtype("int64")
+        return np.dtype("float64")
+    if all(d == "str" for d in dtypes):
+        return pd.StringDtype(na_value=np.nan)
+    return np.dtype(object)
+
+
+def combine_parts(frames, files, sheets, schema=LEAD_SCHEMA):
+    """Stack loaded parts into one frame, each output column allocated once at the combined length"""
+    columns = [c for c in schema if any(c in df.columns for df in frames)]
+    columns += [c for df in frames for c in df.columns if c not in schema and c not in columns]
+    lengths = np.array([len(df) for df in frames])
+    edges = np.r_[0, np.cumsum(lengths)]
+    total = int(edges[-1])
+
+    data = {}
+    for column in columns:
+        dtype = _column_dtype(frames, column, schema)
+        if isinstance(dtype, pd.StringDtype):
+            # Text is Arrow-backed: its buffers are stacked as they are rather than boxed into Python objects
+            data[column] = pd.concat(
+                [df[column] if column in df.columns else pd.Series(np.nan, index=df.index, dtype=dtype) for df in frames],
+                ignore_index=True,
+            ).array
+            continue
+        if dtype.kind == "M":
+            out = np.full(total, np.datetime64("NaT"), dtype=dtype)
+        elif dtype.kind == "f":
+            out = np.full(total, np.nan)
+        elif dtype.kind == "i":
+            out = np.empty(total, dtype=dtype)
+        else:
+            out = np.full(total, None, dtype=object)
+        for df, start, stop in zip(frames, edges[:-1], edges[1:]):
+            if column in df.columns:
+                if dtype.kind == "f":
+                    out[start:stop] = df[column].to_numpy(dtype=dtype, na_value=np.nan)
+                else:
+                    out[start:stop] = df[column].to_numpy(dtype=dtype)
+        data[column] = out
+
+    # Origins repeat per part, so they're stored as category codes
+    codes = np.repeat(np.arange(len(frames)), lengths)
+    for column, labels in [(ORIGIN_FILE_COL, files), (ORIGIN_SHEET_COL, sheets)]:
+        categories = pd.Index([label for label in dict.fromkeys(labels) if label is not None], dtype=object)
+        part_codes = np.array([-1 if label is None else categories.get_loc(label) for label in labels])
+        data[column] = pd.Categorical.from_codes(part_codes[codes], categories=categories)
+    return pd.DataFrame(data, copy=False)
+
+
+def _file_summary(parts):
+    """Per-file rows, bytes and throughput over its worksheets"""
+    files = {}
+    for part in parts:
+        summary = files.setdefault(part['file'], {
+            'file': part['file'], 'bytes': part['bytes'], 'sheets': 0, 'rows': 0, 'seconds': 0.0, 'errors': [],
+        })
+        summary['sheets'] += 1
+        summary['rows'] += part['rows']
+        summary['seconds'] += part['seconds']
+        if 'error' in part:
+            summary['errors'].append(part['error'] if part['sheet'] is None else f"{part['sheet']}: {part['error']}")
+    for summary in files.values():
+        seconds = summary['seconds'] or float("nan")
+        summary['rows_per_sec'] = summary['rows'] / seconds
+        summary['mb_per_sec'] = summary['bytes'] / 1024**2 / seconds
+    return list(files.values())
+
+
+def ingest_leads(sources, n_workers=None, all_sheets=True, engine=None, schema=LEAD_SCHEMA):
+    """Load every worksheet of every leads file concurrently into one tagged frame.
+
+    Parts that fail are reported in attrs['ingest'] and skipped; ValueError
+    is raised when none load. With one worker, or one part, everything is
+    loaded in this process.
+    """
+    start = time.perf_counter()
+    sources = list(sources) if isinstance(sources, (list, tuple)) else [sources]
+    parts = expand_parts(sources, all_sheets)
+    n_workers = min(n_workers or os.cpu_count() or 1, len(parts))
+    payloads = {id(source): _payload(source) for source in sources}
+    sizes = {id(source): _source_size(source) for source in sources}
+
+    if n_workers <= 1:
+        results = [_load_part(payloads[id(source)], sheet, engine) for source, _, sheet in parts]
+    else:
+        # loky workers don't re-import the Streamlit script as __main__
+        pool = get_reusable_executor(max_workers=n_workers)
+        futures = [pool.submit(_load_part, payloads[id(source)], sheet, engine) for source, _, sheet in parts]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # A worker that died (not just a load that raised) only loses its part
+                results.append((None, {'rows': 0, 'seconds': 0.0, 'error': f"{type(e).__name__}: {e}"}))
+
+    reports, frames, files, sheets = [], [], [], []
+    for (source, label, sheet), (df, report) in zip(parts, results):
+        reports.append(dict(report, file=label, sheet=sheet, bytes=sizes[id(source)]))
+        if df is not None:
+            frames.append(df)
+            files.append(label)
+            sheets.append(sheet)
+    if not frames:
+        raise ValueError("No leads could be loaded: " + "; ".join(
+            f"{r['file']}{'' if r['sheet'] is None else ' / ' + str(r['sheet'])}: {r['error']}" for r in reports))
+
+    load_sec = time.perf_counter() - start
+    combined = combine_parts(frames, files, sheets, schema)
+    elapsed = time.perf_counter() - start
+    combined.attrs['ingest'] = {
+        'workers': n_workers,
+        'parts': reports,
+        'files': _file_summary(reports),
+        'failed': sum('error' in r for r in reports),
+        'rows': len(combined),
+        'load_sec': load_sec,
+        'combine_sec': elapsed - load_sec,
+        'seconds': elapsed,
+        'rows_per_sec': len(combined) / elapsed if elapsed else None,
+    }
+    if len(frames) == 1:
+        combined.attrs['schema'] = frames[0].attrs['schema']
+    return combined
+
+
+def benchmark_ingest(paths, workers=(1, 2, 4)):
+    """Ingest wall time per worker count, and combine_parts against pd.concat on the loaded parts"""
+    results = {'parts': len(expand_parts(paths)), 'runs': []}
+    for n_workers in workers:
+        if n_workers > 1:
+            # Start the pool outside the timed region
+            list(get_reusable_executor(max_workers=n_workers).map(int, range(n_workers)))
+        start = time.perf_counter()
+        df = ingest_leads(paths, n_workers)
+        results['runs'].append({'workers': n_workers, 'rows': len(df), 'seconds': time.perf_counter() - start})
+
+    frames, files, sheets = [], [], []
+    for source, label, sheet in expand_parts(paths):
+        df, _ = _load_part(source, sheet)
+        if df is not None:
+            frames.append(df)
+            files.append(label)
+            sheets.append(sheet)
+    for label, combine in [
+        ('concat', lambda: pd.concat(
+            [df.assign(**{ORIGIN_FILE_COL: f, ORIGIN_SHEET_COL: s}) for df, f, s in zip(frames, files, sheets)],
+            ignore_index=True)),
+        ('single_allocation', lambda: combine_parts(frames, files, sheets)),
+    ]:
+        start = time.perf_counter()
+        combine()
+        seconds = time.perf_counter() - start
+        tracemalloc.start()
+        combined = combine()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[label] = {
+            'seconds': seconds,
+            'py_peak_mb': peak / 1024**2,
+            'frame_mb': float(combined.memory_usage(deep=True).sum()) / 1024**2,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel multi-file, multi-sheet lead ingestion")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--first-sheet-only", action="store_true")
+    parser.add_argument("--bench", default=None, help="Comma-separated worker counts to compare, e.g. 1,2,4")
+
+    args = parser.parse_args()
+    if args.bench:
+        print(json.dumps(benchmark_ingest(args.files, [int(w) for w in args.bench.split(",")]), indent=2))
+    else:
+        df = ingest_leads(args.files, args.workers, all_sheets=not args.first_sheet_only)
+        report = df.attrs['ingest']
+        print(json.dumps({k: v for k, v in report.items() if k != 'parts'}, indent=2, default=str))
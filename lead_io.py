@@ -0,0 +1,583 @@
+import os
+import json
+import time
+import argparse
+import posixpath
+import tracemalloc
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+# ============================================================================
+# LEAD FILE READERS
+# ============================================================================
+#
+# pd.read_excel goes through openpyxl, which builds a Python object for every
+# cell (value, style, coordinates) before pandas sees any data. The streaming
+# reader walks the worksheet XML with expat callbacks instead:
+#   - sharedStrings.xml is parsed once into an object array, and string cells
+#     keep only their index until a whole column is resolved with one take()
+#   - cells are collected per column and packed into arrays every CHUNK_ROWS
+#     rows, then typed in one numpy conversion per column (int64 / float64 /
+#     str / datetime64)
+#   - no element tree is built, so memory tracks the columns, not the XML
+#
+# Date-styled numbers are converted from Excel serials the way openpyxl does.
+# CSV and Parquet go straight to pandas. read_leads picks a reader from the
+# file type and size; small workbooks keep openpyxl, which copes with every
+# feature of the format.
+
+STREAM_MIN_BYTES = 256 * 1024
+CHUNK_ROWS = 16384
+
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# Built-in number formats that display dates or times
+DATE_FORMAT_IDS = set(range(14, 23)) | {27, 30, 36, 45, 46, 47, 50, 57}
+
+
+def _source_name(source):
+    """File name of a path or an uploaded file"""
+    return source if isinstance(source, str) else getattr(source, 'name', '') or ''
+
+
+def _source_size(source):
+    """Size in bytes of a path or an uploaded file"""
+    if isinstance(source, str):
+        return os.path.getsize(source)
+    size = getattr(source, 'size', None)
+    if size is not None:
+        return size
+    position = source.tell()
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(position)
+    return size
+
+
+def _rewind(source):
+    if not isinstance(source, str) and hasattr(source, 'seek'):
+        source.seek(0)
+    return source
+
+# ============================================================================
+# STREAMING XLSX READER
+# ============================================================================
+
+def _is_date_format(code):
+    """Whether a custom number format displays a date or time"""
+    code = code.lower()
+    out, quoted, bracket = [], False, False
+    # Quoted literals and [colour]/[$-locale] sections can't make a number a date
+    for ch in code:
+        if ch == '"':
+            quoted = not quoted
+        elif ch == '[' and not quoted:
+            bracket = True
+        elif ch == ']' and not quoted:
+            bracket = False
+        elif not quoted and not bracket:
+            out.append(ch)
+    return any(ch in "dmyhs" for ch in "".join(out).replace("general", ""))
+
+
+def _date_styles(archive):
+    """Cell style indices (the s attribute) whose number format is a date"""
+    if "xl/styles.xml" not in archive.namelist():
+        return set()
+    root = ET.fromstring(archive.read("xl/styles.xml"))
+    custom = {
+        int(fmt.get("numFmtId")): _is_date_format(fmt.get("formatCode", ""))
+        for fmt in root.iter(f"{NS}numFmt")
+    }
+    cell_xfs = root.find(f"{NS}cellXfs")
+    if cell_xfs is None:
+        return set()
+    dates = set()
+    for i, xf in enumerate(cell_xfs.findall(f"{NS}xf")):
+        fmt_id = int(xf.get("numFmtId", 0))
+        if custom.get(fmt_id, fmt_id in DATE_FORMAT_IDS):
+            dates.add(str(i))
+    return dates
+
+
+def _shared_strings(archive):
+    """All shared strings, in index order, as an object array"""
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return np.empty(0, dtype=object)
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == f"{NS}si":
+                # Plain <t>, or rich-text runs <r><t>; phonetic hints (<rPh>) are skipped
+                text = elem.findtext(f"{NS}t")
+                if text is None:
+                    text = "".join(run.findtext(f"{NS}t") or "" for run in elem.iter(f"{NS}r"))
+                strings.append(text)
+                elem.clear()
+    out = np.empty(len(strings), dtype=object)
+    out[:] = strings
+    return out
+
+
+def sheet_names(source):
+    """Worksheet names of an .xlsx workbook, in workbook order"""
+    with zipfile.ZipFile(_rewind(source)) as archive:
+        return [name for name, _ in _sheet_paths(archive)]
+
+
+def _sheet_paths(archive):
+    """(name, archive path) of every worksheet, in workbook order"""
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {rel.get("Id"): rel.get("Target") for rel in rels.iter(f"{PKG_REL_NS}Relationship")}
+    sheets = []
+    for sheet in workbook.iter(f"{NS}sheet"):
+        target = targets[sheet.get(f"{REL_NS}id")]
+        path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+        sheets.append((sheet.get("name"), path))
+    return sheets
+
+
+def _uses_1904(archive):
+    """Whether the workbook counts date serials from 1904 (old Mac Excel)"""
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    pr = workbook.find(f"{NS}workbookPr")
+    return pr is not None and pr.get("date1904") in ("1", "true")
+
+
+_COLUMN_INDEX = {}
+
+
+def _column_index(ref):
+    """Zero-based column of a cell reference like 'AB12'"""
+    letters = ref.rstrip("0123456789")
+    index = _COLUMN_INDEX.get(letters)
+    if index is None:
+        index = 0
+        for ch in letters:
+            index = index * 26 + ord(ch) - 64
+        index = _COLUMN_INDEX[letters] = index - 1
+    return index
+
+
+def _pack(rows, kinds, values):
+    """One chunk of a column's cells as arrays: (rows, kind or per-cell kinds, values)"""
+    distinct = set(kinds)
+    kind = distinct.pop() if len(distinct) == 1 else None
+    if kind == "s":
+        packed = np.asarray(values, dtype=np.intp)
+    elif kind == "n" or kind == "d":
+        packed = np.asarray(values, dtype=np.float64)
+    else:
+        packed = np.empty(len(values), dtype=object)
+        packed[:] = values
+    if kind is None:
+        kind = np.empty(len(kinds), dtype=object)
+        kind[:] = kinds
+    return np.asarray(rows, dtype=np.int64), kind, packed
+
+
+def _merge_chunks(chunks):
+    """A column's chunks joined: (rows, kind or per-cell kinds, values)"""
+    if len(chunks) == 1:
+        return chunks[0]
+    rows = np.concatenate([c[0] for c in chunks])
+    kinds = [c[1] for c in chunks]
+    if all(isinstance(k, str) and k == kinds[0] for k in kinds):
+        return rows, kinds[0], np.concatenate([c[2] for c in chunks])
+    per_cell = np.concatenate([np.full(len(c[0]), k, dtype=object) if isinstance(k, str) else k
+                               for c, k in zip(chunks, kinds)])
+    return rows, per_cell, np.concatenate([c[2].astype(object) for c in chunks])
+
+
+class _StopParsing(Exception):
+    pass
+
+
+def _collect_cells(f, date_styles, keep=None, nrows=None, chunk_rows=CHUNK_ROWS):
+    """Header and body cells of a worksheet.
+
+    Returns (header_row, {col: (kind, value)} for the first non-empty row,
+    {col: (row positions, kind or per-cell kinds, values)} for the rest,
+    last row with a value in any column).
+    Values are parsed as they're read (shared-string index, float or text)
+    and packed into arrays every `chunk_rows` rows, so only one chunk of
+    cells is ever held as Python objects.
+
+    `keep(header)` returns the columns to collect once the header is read
+    (None for all); cells of other columns are skipped without reading their
+    text. Parsing stops after `nrows` body rows.
+    """
+    chunks, pending, header = {}, {}, {}
+    text = []
+    row = col = -1
+    header_row = last_row = None
+    kept = None
+    skip = False
+    chunk_end = chunk_rows
+    kind = style = None
+    inline = False
+    tags = {}
+
+    def flush():
+        for c, cells in pending.items():
+            chunks.setdefault(c, []).append(_pack(*cells))
+        pending.clear()
+
+    # Expat callbacks rather than an element tree: nothing is built per cell
+    # beyond its text, and only <v>/<t> character data is kept
+    def start(name, attrs):
+        nonlocal row, col, kind, style, inline, chunk_end, kept, skip, last_row
+        tag = tags.get(name)
+        if tag is None:
+            # Workbooks may prefix the main namespace (<x:c>); the tag name is what counts
+            tag = tags[name] = name.rpartition(":")[2]
+        if tag == "c":
+            ref = attrs.get("r")
+            col = _column_index(ref) if ref else col + 1
+            kind = attrs.get("t", "n")
+            style = attrs.get("s")
+            text.clear()
+            skip = kept is not None and col not in kept
+        elif tag == "row":
+            r = attrs.get("r")
+            row = int(r) - 1 if r else row + 1
+            col = -1
+            if header_row is not None and row > header_row:
+                if nrows is not None and row > header_row + nrows:
+                    raise _StopParsing()
+                if kept is None and keep is not None:
+                    kept = keep(header)
+            if row >= chunk_end:
+                flush()
+                chunk_end = row + chunk_rows
+        elif skip:
+            # Skipped columns still decide how many rows the sheet has, as they do for pandas
+            if tag == "v" or tag == "t":
+                last_row = row
+            return
+        elif tag == "v" or (tag == "t" and inline):
+            parser.CharacterDataHandler = text.append
+        elif tag == "is":
+            inline = True
+
+    def end(name):
+        nonlocal inline, header_row, last_row
+        tag = tags[name]
+        if tag == "v" or tag == "t":
+            parser.CharacterDataHandler = None
+        elif tag == "is":
+            inline = False
+        elif tag == "c" and text and not skip:
+            # Date-styled numbers get their own kind so the column converts them together
+            cell_kind = "d" if kind == "n" and style in date_styles else kind
+            value = "".join(text)
+            if cell_kind == "s":
+                value = int(value)
+            elif cell_kind == "n" or cell_kind == "d":
+                value = float(value)
+            if header_row is None:
+                header_row = row
+            if row == header_row:
+                header[col] = (cell_kind, value)
+                return
+            last_row = row
+            cells = pending.get(col)
+            if cells is None:
+                cells = pending[col] = ([], [], [])
+            cells[0].append(row)
+            cells[1].append(cell_kind)
+            cells[2].append(value)
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    try:
+        parser.ParseFile(f)
+    except _StopParsing:
+        pass
+    flush()
+    return header_row, header, {c: _merge_chunks(col_chunks) for c, col_chunks in chunks.items()}, last_row
+
+
+def _number(value):
+    return int(value) if value.is_integer() else value
+
+
+def _numeric_column(values, rows, complete, n_rows):
+    """Float values placed at their rows; whole numbers with no gaps come back as int64, as pandas reads them"""
+    if complete and np.all(np.mod(values, 1) == 0) and np.all(np.abs(values) < 2**53):
+        out = np.empty(n_rows, dtype=np.int64)
+    else:
+        out = np.full(n_rows, np.nan)
+    out[rows] = values
+    return out
+
+
+def _excel_datetimes(serials, epoch):
+    """Excel serials as microsecond datetimes, whole days plus the fraction rounded to the millisecond as openpyxl does"""
+    days = np.floor(serials)
+    millis = np.round((serials - days) * 86_400_000)
+    stamps = pd.Timestamp(epoch) + pd.to_timedelta(days, unit="D") + pd.to_timedelta(millis, unit="ms")
+    return pd.DatetimeIndex(stamps).as_unit("us")
+
+
+def _uniform_column(kind, rows, values, n_rows, shared, epoch):
+    """Typed array for a column whose cells all have one kind (None if there's no typed form)"""
+    complete = len(rows) == n_rows
+    if kind in ("s", "str", "inlineStr"):
+        values = shared[values] if kind == "s" else values
+        # Numbers stored as text are read as numbers, like pandas' own parser does
+        try:
+            values = pd.to_numeric(values).astype(np.float64)
+        except (ValueError, TypeError):
+            out = np.full(n_rows, np.nan, dtype=object)
+            out[rows] = values
+            return out
+        return _numeric_column(values, rows, complete, n_rows)
+    if kind == "n":
+        return _numeric_column(values, rows, complete, n_rows)
+    if kind == "d":
+        out = np.full(n_rows, np.nan)
+        out[rows] = values
+        return _excel_datetimes(out, epoch)
+    if kind == "b":
+        # With gaps, pandas reads booleans as 1.0 / 0.0 around the NaNs
+        out = np.empty(n_rows, dtype=bool) if complete else np.full(n_rows, np.nan)
+        out[rows] = values == "1"
+        return out
+    return None
+
+
+def _column_values(rows, kind, values, n_rows, shared, epoch):
+    """Typed array for uniform columns, an object array for mixed ones"""
+    if isinstance(kind, str):
+        typed = _uniform_column(kind, rows, values, n_rows, shared, epoch)
+        if typed is not None:
+            return typed
+        kind = np.full(len(rows), kind, dtype=object)
+
+    # Mixed columns fall back to Python objects, one cell at a time
+    out = np.full(n_rows, np.nan, dtype=object)
+    for row, cell_kind, value in zip(rows, kind, values):
+        if cell_kind == "s":
+            out[row] = shared[int(value)]
+        elif cell_kind in ("str", "inlineStr"):
+            out[row] = value
+        elif cell_kind == "n":
+            out[row] = _number(float(value))
+        elif cell_kind == "b":
+            out[row] = value == "1"
+        elif cell_kind == "d":
+            out[row] = _excel_datetimes(np.array([float(value)]), epoch)[0]
+        # Error cells (#N/A, #DIV/0!) stay missing
+    return out
+
+
+def _dedupe_names(names):
+    """Column names made unique the way pandas does it (name, name.1, ...)"""
+    seen, out = {}, []
+    for name in names:
+        count = seen.get(name, 0)
+        seen[name] = count + 1
+        out.append(name if count == 0 else f"{name}.{count}")
+    return out
+
+
+def read_xlsx_stream(source, sheet_name=0, usecols=None, nrows=None):
+    """Read one worksheet (by position or name) of an .xlsx file into a DataFrame, header on its first row.
+
+    Only the columns named in `usecols` are parsed, and only the first
+    `nrows` rows below the header.
+    """
+    with zipfile.ZipFile(_rewind(source)) as archive:
+        sheets = _sheet_paths(archive)
+        if isinstance(sheet_name, int):
+            path = sheets[sheet_name][1]
+        else:
+            paths = dict(sheets)
+            if sheet_name not in paths:
+                raise ValueError(f"Worksheet named '{sheet_name}' not found")
+            path = paths[sheet_name]
+        epoch = "1904-01-01" if _uses_1904(archive) else "1899-12-30"
+        shared = _shared_strings(archive)
+
+        def header_name(cell):
+            kind, value = cell
+            return _column_values([0], np.array([kind], dtype=object), [value], 1, shared, epoch)[0]
+
+        keep = None
+        if usecols is not None:
+            wanted = set(usecols)
+            keep = lambda header: {col for col, cell in header.items() if header_name(cell) in wanted}
+        with archive.open(path) as f:
+            header_row, header, cells, last_row = _collect_cells(f, _date_styles(archive), keep, nrows)
+
+    if header_row is None:
+        return pd.DataFrame()
+    n_rows = (header_row if last_row is None else last_row) - header_row
+    empty = (np.empty(0, dtype=np.int64), "n", np.empty(0))
+
+    names, data = [], []
+    for position, col in enumerate(range(min(header.keys() | cells.keys()), max(header.keys() | cells.keys()) + 1)):
+        name = header_name(header[col]) if col in header else np.nan
+        name = f"Unnamed: {position}" if pd.isna(name) else name
+        if usecols is not None and name not in wanted:
+            continue
+        rows, kind, values = cells.get(col, empty)
+        names.append(name)
+        data.append(_column_values(rows - header_row - 1, kind, values, n_rows, shared, epoch))
+
+    if not n_rows:
+        # A header with nothing below it reads as empty object columns, as in pandas
+        data = [np.empty(0, dtype=object) for _ in names]
+    df = pd.DataFrame(dict(enumerate(data)), copy=False)
+    df.columns = _dedupe_names(names)
+    # Object columns holding only strings become the str dtype read_excel gives
+    return df.infer_objects()
+
+# ============================================================================
+# READER SELECTION
+# ============================================================================
+
+def _wanted(usecols):
+    """pandas usecols callable that tolerates names the file doesn't have"""
+    if usecols is None:
+        return None
+    wanted = set(usecols)
+    return lambda name: name in wanted
+
+
+def read_excel_openpyxl(source, sheet_name=0, usecols=None, nrows=None):
+    return pd.read_excel(_rewind(source), sheet_name=sheet_name, usecols=_wanted(usecols), nrows=nrows)
+
+
+def read_csv_file(source, sheet_name=None, usecols=None, nrows=None):
+    return pd.read_csv(_rewind(source), usecols=_wanted(usecols), nrows=nrows)
+
+
+def read_parquet_file(source, sheet_name=None, usecols=None, nrows=None):
+    parquet = pq.ParquetFile(_rewind(source))
+    columns = None if usecols is None else [c for c in parquet.schema_arrow.names if c in set(usecols)]
+    if nrows is None:
+        return parquet.read(columns=columns).to_pandas()
+    # Only the row groups holding the first nrows rows are decoded
+    batch = next(parquet.iter_batches(batch_size=max(nrows, 1), columns=columns), None)
+    if batch is None:
+        return parquet.schema_arrow.empty_table().select(columns or parquet.schema_arrow.names).to_pandas()
+    return batch.to_pandas().head(nrows)
+
+
+READERS = {
+    'xlsx-stream': read_xlsx_stream,
+    'openpyxl': read_excel_openpyxl,
+    'csv': read_csv_file,
+    'parquet': read_parquet_file,
+}
+
+
+def choose_reader(source, size=None):
+    """Reader name for a path or uploaded file, from its extension and size"""
+    ext = os.path.splitext(_source_name(source))[1].lower()
+    if ext in (".csv", ".txt"):
+        return 'csv'
+    if ext in (".parquet", ".pq"):
+        return 'parquet'
+    if ext in (".xlsx", ".xlsm"):
+        size = _source_size(source) if size is None else size
+        return 'xlsx-stream' if size >= STREAM_MIN_BYTES else 'openpyxl'
+    # .xls and anything unrecognised go through pandas' own engine detection
+    return 'openpyxl'
+
+
+def read_leads(source, engine=None, sheet_name=0, usecols=None, nrows=None):
+    """Read a leads file (path or uploaded file) with the chosen or given reader.
+
+    `usecols` limits parsing to the named columns (names the file lacks are
+    ignored) and `nrows` to the first rows below the header. Which reader
+    ran, the file size and the parse time are left in the result's
+    attrs['reader']. If the streaming reader can't make sense of a workbook,
+    it's re-read with openpyxl.
+    """
+    size = _source_size(source)
+    engine = engine or choose_reader(source, size)
+    start = time.perf_counter()
+    try:
+        df = READERS[engine](source, sheet_name=sheet_name, usecols=usecols, nrows=nrows)
+        fallback = None
+    except (KeyError, IndexError, ValueError, ET.ParseError, expat.ExpatError, zipfile.BadZipFile) as e:
+        if engine != 'xlsx-stream':
+            raise
+        df = READERS['openpyxl'](source, sheet_name=sheet_name, usecols=usecols, nrows=nrows)
+        engine, fallback = 'openpyxl', f"xlsx-stream failed: {e}"
+    df.attrs['reader'] = {
+        'engine': engine,
+        'bytes': size,
+        'seconds': time.perf_counter() - start,
+        'fallback': fallback,
+    }
+    return df
+
+
+def _parity(expected, actual):
+    """Whether two frames hold the same values, plus the columns whose dtypes differ"""
+    try:
+        pd.testing.assert_frame_equal(expected, actual, check_dtype=False)
+        same = True
+    except AssertionError:
+        same = False
+    dtypes = [c for c in expected.columns if c in actual.columns and expected[c].dtype != actual[c].dtype]
+    return same, dtypes
+
+
+def benchmark_readers(paths, engines=('openpyxl', 'xlsx-stream'), repeats=3):
+    """Parse time and Python allocation peak of each reader on each file, and parity with openpyxl"""
+    results = []
+    for path in paths:
+        baseline = None
+        for engine in engines:
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                df = read_leads(path, engine)
+                timings.append(time.perf_counter() - start)
+
+            tracemalloc.start()
+            read_leads(path, engine)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            record = {
+                'file': os.path.basename(path),
+                'bytes': os.path.getsize(path),
+                'rows': len(df),
+                'engine': engine,
+                'best_sec': min(timings),
+                'py_peak_mb': peak / 1024**2,
+            }
+            if baseline is None:
+                baseline = df
+            else:
+                record['matches_first'], record['dtype_differences'] = _parity(baseline, df)
+            results.append(record)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark lead file readers")
+    parser.add_argument("files", nargs="*", default=[
+        "5000_rental_crm_leads.xlsx", "final_lead_scores.xlsx", "lead_scoring_results.xlsx",
+    ])
+    parser.add_argument("--engines", nargs="+", default=['openpyxl', 'xlsx-stream'], choices=sorted(READERS))
+    parser.add_argument("--repeats", type=int, default=3)
+
+    args = parser.parse_args()
+    print(json.dumps(benchmark_readers(args.files, args.engines, args.repeats), indent=2))
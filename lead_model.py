@@ -0,0 +1,480 @@
+import os
+import json
+import hashlib
+import time
+import sqlite3
+from datetime import datetime
+from concurrent.futures import wait, FIRST_COMPLETED
+
+import numpy as np
+import pandas as pd
+import joblib
+from joblib import Parallel, delayed
+from joblib.externals.loky import get_reusable_executor
+from sklearn.impute import SimpleImputer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold
+from sklearn.metrics import roc_auc_score
+
+MODEL_DIR = "models"
+CACHE_DIR = os.path.join(MODEL_DIR, "cache")
+
+DEFAULT_RF_PARAMS = {
+    "n_estimators": 200,
+    "max_depth": 10,
+    "class_weight": "balanced",
+}
+
+# Estimator space searched by auto-tune
+SEARCH_SPACE = {
+    "max_depth": [4, 6, 8, 10, 12, 16, None],
+    "min_samples_leaf": [1, 2, 5, 10, 20],
+    "max_features": ["sqrt", "log2", 0.5, None],
+    "class_weight": ["balanced", "balanced_subsample", None],
+}
+
+# ============================================================================
+# PIPELINE CONSTRUCTION
+# ============================================================================
+
+def build_preprocessor(X):
+    """Build the ColumnTransformer for numeric and categorical feature columns"""
+    num_cols = X.select_dtypes(include=[np.number]).columns.tolist()
+    cat_cols = X.select_dtypes(include=["object", "category"]).columns.tolist()
+
+    transformers = []
+    if num_cols:
+        num_transformer = Pipeline([
+            ("imputer", SimpleImputer(strategy="median")),
+            ("scaler", StandardScaler())
+        ])
+        transformers.append(("num", num_transformer, num_cols))
+
+    if cat_cols:
+        cat_transformer = Pipeline([
+            ("imputer", SimpleImputer(strategy="constant", fill_value="missing")),
+            ("ohe", OneHotEncoder(handle_unknown="ignore", sparse_output=False))
+        ])
+        transformers.append(("cat", cat_transformer, cat_cols))
+
+    return ColumnTransformer(transformers=transformers)
+
+
+def build_pipeline(X, rf_params=None, n_jobs=-1):
+    """Build the preprocessing + RandomForest pipeline"""
+    params = dict(DEFAULT_RF_PARAMS)
+    params.update(rf_params or {})
+
+    rf = RandomForestClassifier(random_state=42, n_jobs=n_jobs, **params)
+
+    return Pipeline([
+        ("preprocess", build_preprocessor(X)),
+        ("rf", rf)
+    ])
+
+# ============================================================================
+# MODEL REGISTRY
+# ============================================================================
+
+def init_model_registry():
+    """Create the model registry table"""
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS models
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  version TEXT UNIQUE NOT NULL,
+                  path TEXT NOT NULL,
+                  params TEXT,
+                  features TEXT,
+                  cv_scores TEXT,
+                  training_mode TEXT,
+                  is_production BOOLEAN DEFAULT 0,
+                  feature_stats TEXT,
+                  created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)''')
+    
+    # Migration: Add missing columns
+    c.execute("PRAGMA table_info(models)")
+    columns = [column[1] for column in c.fetchall()]
+    if 'feature_stats' not in columns:
+        c.execute("ALTER TABLE models ADD COLUMN feature_stats TEXT")
+    if 'is_challenger' not in columns:
+        c.execute("ALTER TABLE models ADD COLUMN is_challenger BOOLEAN DEFAULT 0")
+    
+    conn.commit()
+    conn.close()
+
+
+def register_model(pipeline, features, params, cv_scores=None, training_mode="standard", promote=False,
+                   feature_stats=None):
+    """Persist a trained pipeline and record it in the registry, returning its version"""
+    init_model_registry()
+    os.makedirs(MODEL_DIR, exist_ok=True)
+
+    version = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    path = os.path.join(MODEL_DIR, f"model_{version}.joblib")
+    joblib.dump(pipeline, path)
+
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    if promote:
+        c.execute("UPDATE models SET is_production = 0 WHERE is_production = 1")
+    c.execute("""INSERT INTO models (version, path, params, features, cv_scores, training_mode, is_production,
+                                     feature_stats)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+              (version, path, json.dumps(params, default=str), json.dumps(list(features)),
+               json.dumps(cv_scores or {}), training_mode, 1 if promote else 0,
+               json.dumps(feature_stats) if feature_stats is not None else None))
+    conn.commit()
+    conn.close()
+    return version
+
+
+def get_registered_models():
+    """List registered models, newest first"""
+    init_model_registry()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute("""SELECT version, path, params, features, cv_scores, training_mode, is_production, created_at,
+                        feature_stats, is_challenger
+                 FROM models ORDER BY created_at DESC, id DESC""")
+    rows = c.fetchall()
+    conn.close()
+    return [
+        {
+            'version': r[0],
+            'path': r[1],
+            'params': json.loads(r[2] or "{}"),
+            'features': json.loads(r[3] or "[]"),
+            'cv_scores': json.loads(r[4] or "{}"),
+            'training_mode': r[5],
+            'is_production': bool(r[6]),
+            'created_at': r[7],
+            'feature_stats': json.loads(r[8]) if r[8] else None,
+            'is_challenger': bool(r[9]),
+        }
+        for r in rows
+    ]
+
+
+def promote_model(version):
+    """Make a registered model the production model"""
+    init_model_registry()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute("UPDATE models SET is_production = 0 WHERE is_production = 1")
+    c.execute("UPDATE models SET is_production = 1 WHERE version = ?", (version,))
+    conn.commit()
+    conn.close()
+
+
+def set_challengers(versions):
+    """Flag exactly these registered models as shadow challengers"""
+    init_model_registry()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute("UPDATE models SET is_challenger = 0 WHERE is_challenger = 1")
+    c.executemany("UPDATE models SET is_challenger = 1 WHERE version = ? AND is_production = 0",
+                  [(v,) for v in versions])
+    conn.commit()
+    conn.close()
+
+
+def get_challenger_versions():
+    """Versions flagged as shadow challengers (never the production model)"""
+    return [e['version'] for e in get_registered_models() if e['is_challenger'] and not e['is_production']]
+
+
+def get_production_version():
+    """Version of the current production model, or None"""
+    for entry in get_registered_models():
+        if entry['is_production']:
+            return entry['version']
+    return None
+
+
+def load_registered_model(version=None):
+    """Load a registered pipeline (production model when version is None)"""
+    for entry in get_registered_models():
+        if (version is None and entry['is_production']) or entry['version'] == version:
+            return joblib.load(entry['path']), entry
+    return None, None
+
+# ============================================================================
+# AUTO-TUNE (SUCCESSIVE HALVING)
+# ============================================================================
+
+_worker_matrices = {}
+
+
+def _load_cached_matrix(path):
+    """Memory-map the cached preprocessed matrix once per worker process"""
+    if path not in _worker_matrices:
+        _worker_matrices[path] = joblib.load(path, mmap_mode="r")
+    return _worker_matrices[path]
+
+
+def _evaluate_candidate(matrix_path, params, n_estimators, n_splits):
+    """Cross-validate one candidate on the cached matrix (runs in a worker process)"""
+    Xt, y = _load_cached_matrix(matrix_path)
+    skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+    scores = []
+    for train_idx, test_idx in skf.split(Xt, y):
+        rf = RandomForestClassifier(
+            n_estimators=n_estimators, random_state=42, n_jobs=1, **params
+        )
+        rf.fit(Xt[train_idx], y[train_idx])
+        scores.append(roc_auc_score(y[test_idx], rf.predict_proba(Xt[test_idx])[:, 1]))
+    return float(np.mean(scores)), float(np.std(scores))
+
+
+def _sample_candidates(n_candidates, seed=42):
+    """Draw distinct parameter sets from SEARCH_SPACE"""
+    rng = np.random.RandomState(seed)
+    seen, candidates = set(), []
+    attempts = 0
+    while len(candidates) < n_candidates and attempts < n_candidates * 20:
+        attempts += 1
+        params = {k: v[rng.randint(len(v))] for k, v in SEARCH_SPACE.items()}
+        key = json.dumps(params, sort_keys=True, default=str)
+        if key not in seen:
+            seen.add(key)
+            candidates.append(params)
+    return candidates
+
+
+def _usable_folds(y, n_splits):
+    """Stratified folds the labels support: n_splits capped at the minority class size, 0 when that's under 2"""
+    n_splits = min(n_splits, int(np.bincount(np.asarray(y, dtype=int), minlength=2).min()))
+    return n_splits if n_splits >= 2 else 0
+
+
+def _default_candidate():
+    """The untuned forest, as auto_tune reports a candidate"""
+    return {
+        'params': {k: v for k, v in DEFAULT_RF_PARAMS.items() if k != "n_estimators"},
+        'n_estimators': DEFAULT_RF_PARAMS["n_estimators"],
+        'cv_auc_mean': None,
+        'cv_auc_std': None,
+    }
+
+
+def auto_tune(X, y, time_budget=120, n_jobs=None, n_candidates=24, factor=3,
+              min_estimators=25, max_estimators=400, n_splits=3, progress_callback=None):
+    """Successive-halving random search over the forest's hyperparameters.
+
+    The preprocessor is fitted once and its output cached to disk; worker
+    processes memory-map that matrix instead of re-running the transform per
+    candidate. Each rung multiplies n_estimators by `factor` and keeps the top
+    1/factor candidates. The search stops when `time_budget` seconds elapse,
+    returning the best candidate found so far. With fewer than two leads in
+    either class there are no stratified folds to score candidates on, so the
+    defaults are returned untuned and the model is judged on its holdout.
+    """
+    start = time.time()
+    deadline = start + time_budget
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_splits = _usable_folds(y, n_splits)
+    if not n_splits:
+        return dict(_default_candidate(), history=[], elapsed_sec=time.time() - start, stopped_early=False,
+                    n_jobs=n_jobs, skipped="fewer than 2 leads in one class; no folds to tune on")
+
+    preprocessor = build_preprocessor(X)
+    Xt = np.ascontiguousarray(preprocessor.fit_transform(X), dtype=np.float64)
+    y_arr = np.asarray(y, dtype=int)
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    matrix_path = os.path.abspath(os.path.join(CACHE_DIR, f"tune_{os.getpid()}_{int(start * 1000)}.joblib"))
+    joblib.dump((Xt, y_arr), matrix_path)
+
+    candidates = _sample_candidates(n_candidates)
+    n_estimators = min_estimators
+    history = []
+    best = None
+    stopped_early = False
+
+    # loky workers don't re-import the Streamlit script as __main__ the way
+    # multiprocessing's spawn/forkserver contexts do
+    pool = get_reusable_executor(max_workers=n_jobs)
+    try:
+        while candidates:
+            futures = {
+                pool.submit(_evaluate_candidate, matrix_path, params, n_estimators, n_splits): params
+                for params in candidates
+            }
+            results = []
+            pending = set(futures)
+            while pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for f in done:
+                    mean_auc, std_auc = f.result()
+                    results.append((mean_auc, std_auc, futures[f]))
+
+            if pending:
+                stopped_early = True
+
+            for mean_auc, std_auc, params in results:
+                history.append({
+                    'n_estimators': n_estimators,
+                    'cv_auc_mean': mean_auc,
+                    'cv_auc_std': std_auc,
+                    **{k: str(v) for k, v in params.items()}
+                })
+
+            if results:
+                results.sort(key=lambda r: r[0], reverse=True)
+                top = results[0]
+                best = {
+                    'params': top[2],
+                    'n_estimators': n_estimators,
+                    'cv_auc_mean': top[0],
+                    'cv_auc_std': top[1],
+                }
+
+            if progress_callback:
+                progress_callback(min(1.0, (time.time() - start) / time_budget), n_estimators, len(results))
+
+            if stopped_early or len(results) <= 1 or n_estimators >= max_estimators:
+                break
+
+            keep = max(1, len(results) // factor)
+            candidates = [r[2] for r in results[:keep]]
+            n_estimators = min(max_estimators, n_estimators * factor)
+    finally:
+        # Kill in-flight candidates once the budget is spent
+        pool.shutdown(wait=False, kill_workers=stopped_early)
+        try:
+            os.remove(matrix_path)
+        except OSError:
+            pass
+
+    if best is None:
+        best = _default_candidate()
+
+    best['history'] = history
+    best['elapsed_sec'] = time.time() - start
+    best['stopped_early'] = stopped_early
+    best['n_jobs'] = n_jobs
+    return best
+
+# ============================================================================
+# CROSS-VALIDATED EVALUATION
+# ============================================================================
+
+_fold_cache = {}
+_FOLD_CACHE_SIZE = 4
+
+
+def dataset_fingerprint(X, y=None):
+    """Hash the feature frame (and labels) so cached matrices can be reused"""
+    h = hashlib.sha1(pd.util.hash_pandas_object(X, index=False).values.tobytes())
+    h.update(",".join(map(str, X.columns)).encode())
+    if y is not None:
+        h.update(np.asarray(y, dtype=np.int64).tobytes())
+    return h.hexdigest()
+
+
+def prepare_folds(X, y, n_splits=5):
+    """Preprocess once and cache the transformed matrix with its fold index arrays"""
+    key = (dataset_fingerprint(X, y), n_splits)
+    if key in _fold_cache:
+        return _fold_cache[key]
+
+    y_arr = np.asarray(y, dtype=int)
+    Xt = np.ascontiguousarray(build_preprocessor(X).fit_transform(X), dtype=np.float64)
+    skf = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+    folds = [(tr.astype(np.int32), te.astype(np.int32)) for tr, te in skf.split(Xt, y_arr)]
+
+    if len(_fold_cache) >= _FOLD_CACHE_SIZE:
+        _fold_cache.pop(next(iter(_fold_cache)))
+    _fold_cache[key] = {'Xt': Xt, 'y': y_arr, 'folds': folds}
+    return _fold_cache[key]
+
+
+def roc_auc_np(y_true, scores):
+    """ROC AUC via the Mann-Whitney rank statistic (ties get average ranks)"""
+    y_true = np.asarray(y_true)
+    n_pos = y_true.sum()
+    n_neg = len(y_true) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return np.nan
+    _, inverse, counts = np.unique(scores, return_inverse=True, return_counts=True)
+    ranks = (np.cumsum(counts) - (counts - 1) / 2.0)[inverse]
+    return (ranks[y_true == 1].sum() - n_pos * (n_pos + 1) / 2.0) / (n_pos * n_neg)
+
+
+def average_precision_np(y_true, scores):
+    """PR-AUC as average precision over distinct score thresholds"""
+    y_true = np.asarray(y_true)
+    n_pos = y_true.sum()
+    if n_pos == 0:
+        return np.nan
+    order = np.argsort(-np.asarray(scores), kind="mergesort")
+    s_sorted, y_sorted = np.asarray(scores)[order], y_true[order]
+    last = np.r_[np.flatnonzero(np.diff(s_sorted)), len(s_sorted) - 1]
+    tps = np.cumsum(y_sorted)[last]
+    precision = tps / (last + 1)
+    recall = tps / n_pos
+    return float(np.sum(np.diff(np.r_[0.0, recall]) * precision))
+
+
+def top_decile_lift_np(y_true, scores):
+    """Conversion rate in the top 10% of scores relative to the overall rate"""
+    y_true = np.asarray(y_true)
+    base_rate = y_true.mean()
+    if base_rate == 0:
+        return np.nan
+    k = max(1, int(np.ceil(len(y_true) * 0.1)))
+    top = np.argpartition(-np.asarray(scores), k - 1)[:k]
+    return float(y_true[top].mean() / base_rate)
+
+
+def _fit_fold(Xt, y, train_idx, test_idx, params):
+    """Fit one fold and return its held-out metrics"""
+    rf = RandomForestClassifier(random_state=42, n_jobs=1, **params)
+    rf.fit(Xt[train_idx], y[train_idx])
+    proba = rf.predict_proba(Xt[test_idx])[:, 1]
+    y_test = y[test_idx]
+    return {
+        'roc_auc': roc_auc_np(y_test, proba),
+        'pr_auc': average_precision_np(y_test, proba),
+        'top_decile_lift': top_decile_lift_np(y_test, proba),
+        'accuracy': float(((proba >= 0.5).astype(int) == y_test).mean()),
+    }
+
+
+def cross_validate_model(X, y, rf_params=None, n_splits=5, n_jobs=None):
+    """K-fold evaluation with folds fitted in parallel on a cached preprocessed matrix.
+
+    With fewer than two leads in either class there are no stratified folds:
+    the result has no metrics, only the reason in 'skipped'.
+    """
+    start = time.time()
+    params = dict(DEFAULT_RF_PARAMS)
+    params.update(rf_params or {})
+
+    y_arr = np.asarray(y, dtype=int)
+    n_splits = _usable_folds(y_arr, n_splits)
+    if not n_splits:
+        return {'n_splits': 0, 'folds': [], 'skipped': "fewer than 2 leads in one class",
+                'elapsed_sec': time.time() - start}
+    cached = prepare_folds(X, y_arr, n_splits)
+
+    n_jobs = n_jobs or min(n_splits, os.cpu_count() or 1)
+    fold_metrics = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(cached['Xt'], cached['y'], tr, te, params)
+        for tr, te in cached['folds']
+    )
+
+    result = {'n_splits': n_splits, 'folds': fold_metrics}
+    for metric in ['roc_auc', 'pr_auc', 'top_decile_lift', 'accuracy']:
+        values = np.array([f[metric] for f in fold_metrics], dtype=float)
+        result[metric + '_mean'] = float(np.nanmean(values))
+        result[metric + '_std'] = float(np.nanstd(values))
+    result['elapsed_sec'] = time.time() - start
+    return result
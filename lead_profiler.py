@@ -0,0 +1,71 @@
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ============================================================================
+# TRAINING PROFILER
+# ============================================================================
+
+
+def peak_rss_mb():
+    """High-water mark of this process's resident set size in MB (None if unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+class StageProfiler:
+    """Record wall time, CPU time and memory for named pipeline stages.
+
+    Python allocation peaks come from tracemalloc, which slows allocation-heavy
+    code noticeably, so it only runs when `trace_memory` is set.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+
+        rss_before = peak_rss_mb()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            record = {
+                'stage': name,
+                'wall_sec': time.perf_counter() - wall_start,
+                'cpu_sec': time.process_time() - cpu_start,
+                'peak_rss_mb': peak_rss_mb(),
+                'rss_growth_mb': None,
+                'py_peak_mb': None,
+            }
+            if rss_before is not None:
+                record['rss_growth_mb'] = record['peak_rss_mb'] - rss_before
+            if self.trace_memory:
+                record['py_peak_mb'] = tracemalloc.get_traced_memory()[1] / 1024**2
+                if started_tracing:
+                    tracemalloc.stop()
+            self.stages.append(record)
+
+    def has_stage(self, name):
+        return any(s['stage'] == name for s in self.stages)
+
+    def total_wall_sec(self):
+        return sum(s['wall_sec'] for s in self.stages)
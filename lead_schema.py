@@ -0,0 +1,231 @@
+import re
+import json
+import hashlib
+import time
+import argparse
+import tracemalloc
+
+import pandas as pd
+
+from lead_io import read_leads
+from lead_dates import parse_source_datetimes
+
+# ============================================================================
+# LEAD SCHEMA
+# ============================================================================
+#
+# The columns scoring, deduplication and the dashboards use, with the header
+# spellings CRM exports are known to use and the type each must parse as.
+# Loading is two passes over the file:
+#   - a pre-scan of the header and the first SAMPLE_ROWS rows, which maps
+#     headers to schema columns and fails before the body is read when no
+#     budget columns exist or a numeric column holds mostly text
+#   - the load itself, parsing only the mapped columns; free-text and
+#     derived columns in the export are never parsed
+# Each column then goes through its type's converter, and values that don't
+# convert are counted in the load report rather than failing the load. Date
+# columns are parsed with formats detected per load (lead_dates), preferring
+# those that parsed the same export layout (same headers) before.
+
+SAMPLE_ROWS = 200
+# Share of a numeric column's sampled values allowed to be non-numeric
+NON_NUMERIC_TOLERANCE = 0.05
+
+# column: (type, other header spellings)
+LEAD_SCHEMA = {
+    'lead_id': ('id', ['id', 'lead_no', 'lead_number']),
+    'name': ('text', ['lead_name', 'customer_name', 'full_name']),
+    'phone': ('id', ['phone_number', 'mobile', 'mobile_number', 'contact_number']),
+    'source': ('text', ['lead_source', 'channel']),
+    'budget_min': ('number', ['min_budget', 'minimum_budget']),
+    'budget_max': ('number', ['max_budget', 'maximum_budget']),
+    'budget': ('number', ['monthly_budget', 'rent_budget']),
+    'preferred_area': ('text', ['area', 'location', 'preferred_location', 'locality']),
+    'bhk': ('number', ['bedrooms']),
+    'user_type': ('text', ['tenant_type', 'customer_type']),
+    'move_in_time': ('text', ['move_in', 'move_in_timeline']),
+    'views_count': ('number', ['views', 'property_views']),
+    'avg_view_time_sec': ('number', ['avg_view_time', 'average_view_time_sec']),
+    'saved_properties': ('number', ['saved', 'saved_count']),
+    'repeated_visits': ('number', ['repeat_visits', 'return_visits']),
+    'whatsapp_clicks': ('number', ['whatsapp']),
+    'call_clicks': ('number', ['calls', 'call_count']),
+    'chat_messages': ('number', ['chats', 'chat_count']),
+    'last_active_time': ('datetime', ['last_active', 'last_activity', 'last_activity_time']),
+    'converted': ('number', ['is_converted', 'conversion']),
+}
+
+# At least one of these groups must be present in full
+REQUIRED_ANY = [['budget_min', 'budget_max'], ['budget']]
+
+
+def normalize_header(name):
+    """Lower-case header with spaces, dashes and dots as single underscores"""
+    return re.sub(r"[\s\-\.]+", "_", str(name).strip().lower())
+
+
+def resolve_columns(columns, schema=LEAD_SCHEMA):
+    """{file header: schema column} for the headers the schema knows (first spelling wins)"""
+    lookup = {}
+    for column, (_, aliases) in schema.items():
+        for spelling in [column] + aliases:
+            lookup.setdefault(normalize_header(spelling), column)
+    mapping, taken = {}, set()
+    for header in columns:
+        column = lookup.get(normalize_header(header))
+        if column is not None and column not in taken:
+            mapping[header] = column
+            taken.add(column)
+    return mapping
+
+
+def header_fingerprint(columns):
+    """Key of an export layout: a hash of its normalized headers (the same CRM export, whatever the file is called)"""
+    headers = "\x1f".join(normalize_header(c) for c in columns)
+    return "headers:" + hashlib.sha1(headers.encode()).hexdigest()[:16]
+
+
+def _to_number(series):
+    return pd.to_numeric(series, errors="coerce")
+
+
+def _to_text(series):
+    return series if pd.api.types.is_string_dtype(series) else series.astype("str")
+
+
+def _as_is(series):
+    return series
+
+
+# Types are converted explicitly instead of trusting each reader's inference
+CONVERTERS = {
+    'number': _to_number,
+    'text': _to_text,
+    'id': _as_is,
+    'datetime': _as_is,
+}
+
+
+def validate_sample(sample, schema=LEAD_SCHEMA):
+    """Problems with a pre-scanned sample already renamed to schema columns (empty when fine)"""
+    problems = []
+    if not any(all(c in sample.columns for c in group) for group in REQUIRED_ANY):
+        problems.append("no budget columns (needs " + " or ".join(" and ".join(g) for g in REQUIRED_ANY) + ")")
+
+    for column in sample.columns:
+        if schema[column][0] != 'number':
+            continue
+        present = sample[column].notna()
+        failed = present & _to_number(sample[column]).isna()
+        if present.any() and failed.sum() > NON_NUMERIC_TOLERANCE * present.sum():
+            examples = ", ".join(repr(v) for v in sample.loc[failed, column].unique()[:3])
+            problems.append(f"'{column}' is not numeric ({int(failed.sum())} of {int(present.sum())} "
+                            f"sampled values, e.g. {examples})")
+    return problems
+
+
+def convert_columns(df, schema=LEAD_SCHEMA, converters=CONVERTERS):
+    """Run every column through its type's converter in place; returns {column: values that didn't convert}"""
+    coerced = {}
+    for column in df.columns:
+        before = df[column].notna()
+        df[column] = converters[schema[column][0]](df[column])
+        failed = int((before & df[column].isna()).sum())
+        if failed:
+            coerced[column] = failed
+    return coerced
+
+
+def load_leads(source, schema=LEAD_SCHEMA, engine=None, sample_rows=SAMPLE_ROWS, sheet_name=0):
+    """Load only the schema's columns from a leads file (one worksheet of a workbook), validated and converted.
+
+    Raises ValueError from the pre-scan when the file can't be scored. The
+    result's attrs['schema'] reports the mapped, skipped and coerced columns
+    and an estimate of the memory the skipped columns would have taken.
+    """
+    start = time.perf_counter()
+    sample = read_leads(source, engine, sheet_name, nrows=sample_rows)
+    mapping = resolve_columns(sample.columns, schema)
+    problems = validate_sample(sample[list(mapping)].rename(columns=mapping), schema)
+    if problems:
+        raise ValueError("Leads file doesn't match the lead schema: " + "; ".join(problems))
+    skipped = [c for c in sample.columns if c not in mapping]
+    skipped_bytes_per_row = (
+        sample[skipped].memory_usage(deep=True, index=False).sum() / len(sample) if skipped and len(sample) else 0.0
+    )
+    prescan_sec = time.perf_counter() - start
+
+    df = read_leads(source, engine, sheet_name, usecols=list(mapping))
+    reader = df.attrs.get('reader', {})
+    df = df.rename(columns=mapping)
+    datetimes = {}
+    layout = header_fingerprint(sample.columns)
+
+    def parse_dates(series):
+        parsed, datetimes[series.name] = parse_source_datetimes(series, layout, series.name)
+        return parsed
+
+    coerced = convert_columns(df, schema, dict(CONVERTERS, datetime=parse_dates))
+    df.attrs['reader'] = reader
+    df.attrs['schema'] = {
+        'columns_in_file': len(sample.columns),
+        'columns_loaded': len(mapping),
+        'skipped': skipped,
+        'renamed': {header: column for header, column in mapping.items() if header != column},
+        'coerced': coerced,
+        'datetimes': datetimes,
+        'rows': len(df),
+        'cells_skipped': len(skipped) * len(df),
+        'memory_mb': float(df.memory_usage(deep=True).sum()) / 1024**2,
+        'memory_avoided_mb': float(skipped_bytes_per_row) * len(df) / 1024**2,
+        'prescan_sec': prescan_sec,
+        'load_sec': time.perf_counter() - start,
+    }
+    return df
+
+
+def benchmark_pruning(path, engine=None, repeats=3):
+    """Parse time and Python allocation peak of a full read versus the schema-pruned load"""
+    results = {}
+    for label, load in [('full', lambda: read_leads(path, engine)), ('schema', lambda: load_leads(path, engine=engine))]:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            df = load()
+            timings.append(time.perf_counter() - start)
+        tracemalloc.start()
+        load()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[label] = {
+            'engine': df.attrs['reader']['engine'],
+            'columns': len(df.columns),
+            'best_sec': min(timings),
+            'py_peak_mb': peak / 1024**2,
+            'frame_mb': float(df.memory_usage(deep=True).sum()) / 1024**2,
+        }
+    results['parse_sec_avoided'] = results['full']['best_sec'] - results['schema']['best_sec']
+    results['memory_avoided_mb'] = results['full']['frame_mb'] - results['schema']['frame_mb']
+    results['estimated_memory_avoided_mb'] = load_leads(path, engine=engine).attrs['schema']['memory_avoided_mb']
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Schema-aware lead loading")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_check = sub.add_parser("check", help="Pre-scan and load a leads file, printing the load report")
+    p_check.add_argument("data")
+    p_check.add_argument("--engine", default=None)
+
+    p_bench = sub.add_parser("bench", help="Compare a full read with the schema-pruned load")
+    p_bench.add_argument("data")
+    p_bench.add_argument("--engine", default=None)
+    p_bench.add_argument("--repeats", type=int, default=3)
+
+    args = parser.parse_args()
+    if args.command == "check":
+        df = load_leads(args.data, engine=args.engine)
+        print(json.dumps(dict(df.attrs['schema'], reader=df.attrs['reader']), indent=2, default=str))
+    else:
+        print(json.dumps(benchmark_pruning(args.data, args.engine, args.repeats), indent=2))
@@ -1,22 +1,18 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from sklearn.model_selection import train_test_split
-from sklearn.impute import SimpleImputer
-from sklearn.preprocessing import OneHotEncoder, StandardScaler
-from sklearn.compose import ColumnTransformer
-from sklearn.pipeline import Pipeline
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score, roc_auc_score
-from sklearn.cluster import KMeans
 import warnings
+import os
+import re
 import hashlib
 import sqlite3
+import threading
+import weakref
 from datetime import datetime
 import time
 from io import BytesIO
+from contextlib import nullcontext
+from lead_profiler import StageProfiler
 
 warnings.filterwarnings('ignore')
 
@@ -34,8 +30,9 @@ st.set_page_config(
 # DATABASE FUNCTIONS
 # ============================================================================
 
+@st.cache_resource(show_spinner=False)
 def init_database():
-    """Initialize database with migration support"""
+    """Initialize database with migration support (once per server process)"""
     conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
     c = conn.cursor()
     
@@ -60,6 +57,24 @@ def init_database():
                   timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                   FOREIGN KEY (user_id) REFERENCES users (id))''')
     
+    # Create training_profiles table (one row per timed stage of a run)
+    c.execute('''CREATE TABLE IF NOT EXISTS training_profiles
+                 (id INTEGER PRIMARY KEY AUTOINCREMENT,
+                  run_id TEXT NOT NULL,
+                  user_id INTEGER,
+                  model_version TEXT,
+                  training_mode TEXT,
+                  n_rows INTEGER,
+                  stage TEXT,
+                  stage_order INTEGER,
+                  wall_sec REAL,
+                  cpu_sec REAL,
+                  peak_rss_mb REAL,
+                  rss_growth_mb REAL,
+                  py_peak_mb REAL,
+                  timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  FOREIGN KEY (user_id) REFERENCES users (id))''')
+    
     # Create sessions table
     c.execute('''CREATE TABLE IF NOT EXISTS sessions
                  (id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -181,6 +196,37 @@ def log_usage(user_id, action, details="", leads_scored=0):
     conn.commit()
     conn.close()
 
+def log_training_profile(user_id, profiler, run_info, n_rows):
+    """Store the stage timings of one training run"""
+    run_id = run_info.get('model_version') or datetime.now().strftime('%Y%m%d%H%M%S%f')
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.executemany("""INSERT INTO training_profiles
+                     (run_id, user_id, model_version, training_mode, n_rows, stage, stage_order,
+                      wall_sec, cpu_sec, peak_rss_mb, rss_growth_mb, py_peak_mb)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                  [(run_id, user_id, run_info.get('model_version'), run_info.get('training_mode'), n_rows,
+                    s['stage'], i, s['wall_sec'], s['cpu_sec'], s['peak_rss_mb'], s['rss_growth_mb'], s['py_peak_mb'])
+                   for i, s in enumerate(profiler.stages)])
+    conn.commit()
+    conn.close()
+
+def get_training_profiles(limit_runs=50):
+    """Stage timings of the most recent training runs"""
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    profiles = pd.read_sql_query("""
+        SELECT p.run_id, u.username, p.model_version, p.training_mode, p.n_rows, p.stage, p.stage_order,
+               p.wall_sec, p.cpu_sec, p.peak_rss_mb, p.rss_growth_mb, p.py_peak_mb, p.timestamp
+        FROM training_profiles p
+        LEFT JOIN users u ON p.user_id = u.id
+        WHERE p.run_id IN (
+            SELECT run_id FROM training_profiles GROUP BY run_id ORDER BY MAX(id) DESC LIMIT ?
+        )
+        ORDER BY p.id
+    """, conn, params=(limit_runs,))
+    conn.close()
+    return profiles
+
 def get_user_stats(user_id):
     """Get user stats"""
     conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
@@ -297,136 +343,104 @@ def delete_user(user_id):
 # HELPER FUNCTIONS
 # ============================================================================
 
-def map_probability_to_category(prob_score):
-    """Map probability (0-100) to category label."""
-    if prob_score >= 70:
-        return "Hot"
-    elif prob_score >= 40:
-        return "Warm"
-    else:
-        return "Cold"
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+@st.cache_data(show_spinner=False)
+def load_css(name):
+    """Read a stylesheet from assets/ once and return it minified as a <style> block"""
+    with open(os.path.join(ASSETS_DIR, name)) as f:
+        css = f.read()
+    css = re.sub(r"/\*.*?\*/", "", css, flags=re.S)
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};])\s*", r"\1", css)
+    return f"<style>{css.strip()}</style>"
+
+@st.cache_resource(show_spinner=False)
+def load_model_version(version):
+    """Load a registered model and its compiled form (compact when available) once per server process"""
+    from lead_model import load_registered_model
+    from lead_compact import load_compiled_model
+    
+    pipeline, entry = load_registered_model(version)
+    if pipeline is None:
+        return None, None, None
+    return pipeline, entry, load_compiled_model(version)[1]
+
+def _warm_up():
+    """Import the ML and plotting stack and load the production model"""
+    try:
+        import plotly.express
+        import plotly.graph_objects
+        from lead_model import get_production_version
+        
+        version = get_production_version()
+        if version:
+            load_model_version(version)
+    except Exception:
+        pass
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """Run _warm_up in the background once per server, while the login page renders"""
+    thread = threading.Thread(target=_warm_up, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
 
 @st.cache_data
 def load_data(file_path):
-    """Load data from Excel file"""
+    """Load the lead schema's columns from every sheet of one or more Excel, CSV or Parquet files"""
     try:
-        if isinstance(file_path, str):
-            df = pd.read_excel(file_path)
-        else:
-            df = pd.read_excel(file_path)
+        df = ingest_leads(file_path)
         return df
     except Exception as e:
         st.error(f"Error loading file: {e}")
         return None
 
 @st.cache_resource
-def train_model(df):
-    """Train RandomForest model with progress tracking"""
+def train_model(df, training_mode="Standard", tune_budget=120, tune_jobs=None, cv_folds=0, promote=False, dataset=None,
+                recency_decay="reciprocal", half_life_days=7.0, _profiler=None):
+    """Train RandomForest model with progress tracking (stages timed by `_profiler`)"""
     
     progress_bar = st.progress(0)
     status_text = st.empty()
+    run_info = {'training_mode': training_mode}
+    stage = _profiler.stage if _profiler else (lambda name: nullcontext())
+    
+    # Fingerprint the raw rows before feature engineering converts them
+    with stage("fingerprint"):
+        fingerprints = row_fingerprints(df)
+    
+    # Conversions reported since the export fill in missing labels
+    with stage("outcomes"):
+        run_info['outcomes_applied'] = apply_outcomes(df)
     
     # Feature engineering
     status_text.markdown("🔧 **Step 1/5:** Feature Engineering...")
     progress_bar.progress(20)
     
-    if "budget_min" in df.columns and "budget_max" in df.columns:
-        df["budget_mid"] = df[["budget_min", "budget_max"]].mean(axis=1)
-    elif "budget" in df.columns:
-        df["budget_mid"] = pd.to_numeric(df["budget"], errors='coerce')
-    else:
-        df["budget_mid"] = np.nan
-
-    # Budget match feature
-    if df["budget_mid"].notna().any():
-        min_b, max_b = df["budget_mid"].min(), df["budget_mid"].max()
-        if min_b == max_b or pd.isna(min_b) or pd.isna(max_b):
-            df["budget_match"] = 1.0
-        else:
-            df["budget_match"] = (df["budget_mid"] - min_b) / (max_b - min_b)
-    else:
-        df["budget_match"] = 0.5
-
-    # Area match feature
-    if "preferred_area" in df.columns:
-        area_freq = df["preferred_area"].fillna("unknown").value_counts(normalize=True)
-        df["area_match"] = df["preferred_area"].fillna("unknown").map(area_freq).fillna(0.5)
-    else:
-        df["area_match"] = 0.5
-
-    # Behavior scores
-    beh_cols = ["views_count", "avg_view_time_sec", "saved_properties", "repeated_visits"]
-    for c in beh_cols:
-        if c not in df.columns:
-            df[c] = 0
-        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0)
-
-    # Normalize behavior columns
-    for c in beh_cols:
-        mx = df[c].max()
-        if mx > 0:
-            df[c + "_norm"] = df[c] / mx
-        else:
-            df[c + "_norm"] = 0.0
-
-    # Engagement score
-    df["engagement_score"] = (
-        0.4 * df["views_count_norm"] +
-        0.2 * df["avg_view_time_sec_norm"] +
-        0.25 * df["saved_properties_norm"] +
-        0.15 * df["repeated_visits_norm"]
-    )
-
-    # Interaction features
-    inter_cols = ["whatsapp_clicks", "call_clicks", "chat_messages"]
-    for c in inter_cols:
-        if c not in df.columns:
-            df[c] = 0
-        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0)
-
-    df["total_interactions"] = df[inter_cols].sum(axis=1)
-
-    # Recency features
-    if "last_active_time" in df.columns:
-        df["last_active_time"] = pd.to_datetime(df["last_active_time"], errors="coerce")
-        now = pd.Timestamp.now()
-        df["days_since_active"] = (now - df["last_active_time"]).dt.days.fillna(999)
-        df["recency_score"] = 1 / (1 + df["days_since_active"])
-    else:
-        df["recency_score"] = 0.0
+    reference_time = pd.Timestamp.now()
+    with stage("feature_stats"):
+        stats = feature_stats(df, {'decay': recency_decay, 'half_life_days': half_life_days})
+    # Training, evaluation, drift sketches and reason codes all read the stored feature matrix
+    feature_cols = engineer_features_cached(df, stats, reference_time, profiler=_profiler)
+    run_info['feature_store'] = df.attrs['feature_store']
+    with stage("sketch"):
+        sketches = capture_sketches(df)
 
     # Prepare features
     status_text.markdown("📊 **Step 2/5:** Preparing Features...")
     progress_bar.progress(40)
     
-    feature_cols = [
-        "budget_match", "area_match", "engagement_score",
-        "total_interactions", "recency_score",
-    ]
-    
-    if "source" in df.columns:
-        feature_cols.append("source")
-    if "bhk" in df.columns:
-        feature_cols.append("bhk")
-
-    X = df[feature_cols].copy()
-
-    # Prepare target
-    y = None
-    if "converted" in df.columns:
-        y = pd.to_numeric(df["converted"], errors="coerce")
+    with stage("target"):
+        X = df[feature_cols].copy()
+        # A handful of recorded outcomes on an unlabelled workbook are mixed with pseudo-labels
+        X, y = build_target(df, X, min_labels=RETRAIN_MIN_LABELS)
 
     # Handle missing labels
-    if y is None or y.isna().all():
+    if y is None:
         status_text.markdown("🤖 **Using unsupervised learning:** Creating pseudo-labels with KMeans...")
-        numeric_for_kmeans = X.select_dtypes(include=[np.number]).fillna(0)
-        kmeans = KMeans(n_clusters=2, random_state=42)
-        pseudo_labels = kmeans.fit_predict(numeric_for_kmeans)
-        y = pd.Series(pseudo_labels, index=X.index)
-    else:
-        mask = y.notna()
-        X = X[mask].reset_index(drop=True)
-        y = y[mask].astype(int).reset_index(drop=True)
+        with stage("kmeans"):
+            y = pseudo_labels(X)
 
     if len(X) < 10:
         raise ValueError("Not enough data to train model after cleaning")
@@ -435,55 +449,41 @@ def train_model(df):
     status_text.markdown("🔨 **Step 3/5:** Building ML Pipeline...")
     progress_bar.progress(60)
     
-    num_cols = X.select_dtypes(include=[np.number]).columns.tolist()
-    cat_cols = X.select_dtypes(include=["object", "category"]).columns.tolist()
-
-    transformers = []
-    if num_cols:
-        num_transformer = Pipeline([
-            ("imputer", SimpleImputer(strategy="median")),
-            ("scaler", StandardScaler())
-        ])
-        transformers.append(("num", num_transformer, num_cols))
-
-    if cat_cols:
-        cat_transformer = Pipeline([
-            ("imputer", SimpleImputer(strategy="constant", fill_value="missing")),
-            ("ohe", OneHotEncoder(handle_unknown="ignore", sparse_output=False))
-        ])
-        transformers.append(("cat", cat_transformer, cat_cols))
+    rf_params = None
+    if training_mode == "Auto-tune" and len(np.unique(y)) == 2:
+        status_text.markdown(f"🧪 **Auto-tune:** Successive halving search ({tune_budget}s budget)...")
 
-    preprocessor = ColumnTransformer(transformers=transformers)
+        def on_rung(fraction, n_estimators, n_evaluated):
+            progress_bar.progress(60 + int(fraction * 15))
+            status_text.markdown(
+                f"🧪 **Auto-tune:** {n_evaluated} candidates evaluated at {n_estimators} trees..."
+            )
 
-    # RandomForest model
-    rf = RandomForestClassifier(
-        n_estimators=200,
-        max_depth=10,
-        random_state=42,
-        n_jobs=-1,
-        class_weight="balanced"
-    )
+        with stage("auto_tune"):
+            tuned = auto_tune(X, y, time_budget=tune_budget, n_jobs=tune_jobs, progress_callback=on_rung)
+        rf_params = dict(tuned['params'], n_estimators=tuned['n_estimators'])
+        run_info['tuning'] = tuned
 
-    pipeline = Pipeline([
-        ("preprocess", preprocessor),
-        ("rf", rf)
-    ])
+    pipeline = build_pipeline(X, rf_params)
 
     # Train/test split
     status_text.markdown("🎯 **Step 4/5:** Training Model...")
     progress_bar.progress(80)
     
-    stratify_y = y if len(np.unique(y)) > 1 else None
+    # Stratifying needs two leads of each class; a lone positive just lands wherever the split puts it
+    stratify_y = y if len(np.unique(y)) > 1 and pd.Series(y).value_counts().min() >= 2 else None
     X_train, X_test, y_train, y_test = train_test_split(
         X, y, test_size=0.25, random_state=42, stratify=stratify_y
     )
 
     # Train model
-    pipeline.fit(X_train, y_train)
+    with stage("fit"):
+        pipeline.fit(X_train, y_train)
 
     # Predictions
-    y_pred = pipeline.predict(X_test)
-    y_proba = pipeline.predict_proba(X_test)[:, 1] if len(np.unique(y)) == 2 else None
+    with stage("predict"):
+        y_pred = pipeline.predict(X_test)
+        y_proba = pipeline.predict_proba(X_test)[:, 1] if len(np.unique(y)) == 2 else None
 
     # Evaluation metrics
     accuracy = accuracy_score(y_test, y_pred)
@@ -494,20 +494,113 @@ def train_model(df):
         except:
             pass
 
+    # Pruned, quantized artifact every scorer of this version will map. Its trees are
+    # chosen on half of the holdout; the other half measures it against the full forest,
+    # and those are the metrics reported, since the compact model is the one serving
+    with stage("compact"):
+        X_select, X_eval, y_select, y_eval = split_holdout(X_test, y_test)
+        full = compile_pipeline(pipeline)
+        compiled, compaction = compact_model(full, X_select, y_select)
+        if len(np.unique(y_eval)) == 2:
+            compaction['full_accuracy'], compaction['full_roc_auc'] = holdout_metrics(full, X_eval, y_eval)
+            accuracy, roc_auc = holdout_metrics(compiled, X_eval, y_eval)
+            compaction['eval_rows'] = len(X_eval)
+        run_info['compaction'] = compaction
+
+    # K-fold evaluation on a cached preprocessed matrix
+    if cv_folds and len(np.unique(y)) == 2:
+        status_text.markdown(f"📐 **Evaluating:** {cv_folds}-fold cross-validation...")
+        with stage("cross_validate"):
+            run_info['cv'] = cross_validate_model(X, y, rf_params, n_splits=cv_folds)
+
+    # Register the model (with the tuned winner's CV scores when auto-tuned)
+    cv_scores = {'holdout_accuracy': accuracy, 'holdout_roc_auc': roc_auc}
+    if 'full_roc_auc' in compaction:
+        cv_scores['holdout_roc_auc_full'] = compaction['full_roc_auc']
+    if 'tuning' in run_info:
+        cv_scores['cv_auc_mean'] = run_info['tuning']['cv_auc_mean']
+        cv_scores['cv_auc_std'] = run_info['tuning']['cv_auc_std']
+    if 'cv' in run_info:
+        cv_scores.update({k: v for k, v in run_info['cv'].items() if k.endswith(('_mean', '_std'))})
+    previous_version = get_production_version()
+    with stage("register"):
+        run_info['model_version'] = register_model(
+            pipeline, feature_cols, rf_params or DEFAULT_RF_PARAMS,
+            cv_scores=cv_scores,
+            training_mode="auto-tune" if 'tuning' in run_info else "standard",
+            promote=promote,
+            feature_stats=stats
+        )
+        save_registered(run_info['model_version'], compiled, compaction)
+        add_feature_ref(run_info['feature_store']['key'], f"model:{run_info['model_version']}")
+        run_info['feature_store']['gc'] = gc_feature_store()
+
     # Score all leads
     status_text.markdown("✨ **Step 5/5:** Scoring All Leads...")
     progress_bar.progress(100)
     
-    df_scored = df.copy()
-    lead_probability = pipeline.predict_proba(X)[:, 1]
-    df_scored.loc[X.index, "lead_score"] = (lead_probability * 100).round(0).astype(int)
-    df_scored["lead_score"] = df_scored["lead_score"].fillna(0).astype(int)
-    df_scored["lead_category"] = df_scored["lead_score"].apply(map_probability_to_category)
+    with stage("score"):
+        df_scored = df.copy()
+        # Every lead is scored, not just the rows the model was trained on
+        lead_probability = predict_proba_compiled(compiled, df[feature_cols])
+        df_scored["lead_score"] = (lead_probability * 100).round(0).astype(int)
+    with stage("categorize"):
+        df_scored["lead_category"] = df_scored["lead_score"].apply(map_probability_to_category)
+    with stage("explain"):
+        attach_reason_codes(df_scored, compiled, feature_cols)
     
     status_text.markdown("✅ **Model Training Complete!**")
     progress_bar.progress(100)
     
-    return pipeline, df_scored, feature_cols, accuracy, roc_auc
+    run_info['compiled'] = compiled
+    run_info['feature_stats'] = stats
+    run_info['reference_time'] = reference_time
+    
+    # This data is the new model's drift reference; compare it with what the last one saw
+    save_sketches(run_info['model_version'], dataset or 'training', 'training', sketches, len(df))
+    previous_sketches = load_reference_sketches(previous_version) if previous_version else None
+    if previous_sketches:
+        # The model is already registered; a failed comparison only loses the drift panel
+        try:
+            run_info['drift'] = dict(drift_report(previous_sketches, sketches), reference_version=previous_version)
+        except Exception as e:
+            st.warning(f"⚠️ Drift check skipped: {e}")
+    
+    # Baseline for later incremental rescores of this dataset
+    if dataset:
+        with stage("index"):
+            save_lead_index(dataset, df_scored, fingerprints, run_info['model_version'])
+    
+    return pipeline, df_scored, feature_cols, accuracy, roc_auc, run_info
+
+def dataset_name(data_path):
+    """Stable name for a data source (file path, uploaded file name, or the names of several uploads)"""
+    if isinstance(data_path, (list, tuple)):
+        return " + ".join(sorted(dataset_name(p) for p in data_path))
+    return data_path if isinstance(data_path, str) else getattr(data_path, 'name', 'upload')
+
+def rescore_leads(df, dataset):
+    """Score a fresh upload with the production model, reusing unchanged leads' scores"""
+    version = get_production_version()
+    if version is None:
+        raise ValueError("No production model registered yet - train a model first")
+    pipeline, entry, compiled = load_model_version(version)
+    
+    reference_time = pd.Timestamp.now()
+    df_scored, summary = incremental_score(df, compiled, entry, dataset, reference_time)
+    
+    cv_scores = entry['cv_scores'] or {}
+    run_info = {
+        'training_mode': 'incremental',
+        'model_version': entry['version'],
+        'incremental': summary,
+        'compiled': compiled,
+        'feature_stats': entry['feature_stats'],
+        'reference_time': reference_time,
+        'drift': check_drift(df_scored, entry['version'], dataset),
+    }
+    return (pipeline, df_scored, entry['features'],
+            cv_scores.get('holdout_accuracy') or 0, cv_scores.get('holdout_roc_auc'), run_info)
 
 def create_gauge_chart(value, title, color):
     """Create a professional gauge chart"""
@@ -544,224 +637,503 @@ def create_gauge_chart(value, title, color):
     
     return fig
 
-# ============================================================================
-# LOGIN PAGE
-# ============================================================================
-
-def show_login_page():
-    """Professional login page with modern design"""
-    
-    # Creative CSS for login page
-    st.markdown("""
-        <style>
-        @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@300;400;500;600;700;800&display=swap');
-        
-        [data-testid="stAppViewContainer"] {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            font-family: 'Poppins', sans-serif;
-        }
-        
-        .login-container {
-            max-width: 480px;
-            margin: 80px auto;
-            padding: 0;
-            background: white;
-            border-radius: 24px;
-            box-shadow: 0 30px 80px rgba(0,0,0,0.3);
-            overflow: hidden;
-            animation: slideUp 0.6s ease-out;
-        }
-        
-        @keyframes slideUp {
-            from {
-                opacity: 0;
-                transform: translateY(30px);
-            }
-            to {
-                opacity: 1;
-                transform: translateY(0);
-            }
-        }
-        
-        .login-header {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            padding: 40px 30px;
-            text-align: center;
-            color: white;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .login-header::before {
-            content: '';
-            position: absolute;
-            top: -50%;
-            left: -50%;
-            width: 200%;
-            height: 200%;
-            background: radial-gradient(circle, rgba(255,255,255,0.1) 0%, transparent 70%);
-            animation: pulse 4s ease-in-out infinite;
-        }
-        
-        @keyframes pulse {
-            0%, 100% { transform: scale(1); opacity: 0.5; }
-            50% { transform: scale(1.1); opacity: 0.3; }
-        }
-        
-        .login-icon {
-            font-size: 80px;
-            margin-bottom: 15px;
-            display: inline-block;
-            animation: float 3s ease-in-out infinite;
-            position: relative;
-            z-index: 1;
-        }
-        
-        @keyframes float {
-            0%, 100% { transform: translateY(0px); }
-            50% { transform: translateY(-15px); }
-        }
-        
-        .login-title {
-            font-size: 2.2rem;
-            font-weight: 800;
-            margin: 0;
-            position: relative;
-            z-index: 1;
-            letter-spacing: -0.5px;
-        }
+def show_tuning_summary(run_info):
+    """Show auto-tune results for the current model"""
+    tuned = (run_info or {}).get('tuning')
+    if not tuned:
+        return
+    
+    with st.expander("🧪 Auto-tune Results", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            if tuned['cv_auc_mean'] is not None:
+                st.metric("CV ROC AUC", f"{tuned['cv_auc_mean']:.3f} ± {tuned['cv_auc_std']:.3f}")
+            else:
+                st.metric("CV ROC AUC", "N/A")
+        with col2:
+            st.metric("Trees", tuned['n_estimators'])
+        with col3:
+            st.metric("Search Time", f"{tuned['elapsed_sec']:.1f}s")
+        with col4:
+            st.metric("Model Version", run_info.get('model_version', '-'))
         
-        .login-subtitle {
-            font-size: 1rem;
-            opacity: 0.95;
-            margin-top: 8px;
-            font-weight: 400;
-            position: relative;
-            z-index: 1;
-        }
+        if tuned.get('skipped'):
+            st.info(f"Auto-tune skipped ({tuned['skipped']}): default parameters, evaluated on the holdout only")
+        if tuned['stopped_early']:
+            st.warning("⏱️ Time budget reached - best candidate so far was used")
         
-        .login-body {
-            padding: 40px 35px;
-        }
+        st.json({k: str(v) for k, v in tuned['params'].items()})
+        if tuned['history']:
+            history = pd.DataFrame(tuned['history']).sort_values(
+                ['n_estimators', 'cv_auc_mean'], ascending=False
+            )
+            st.dataframe(history, use_container_width=True, hide_index=True)
+
+def show_cv_summary(run_info):
+    """Show k-fold evaluation metrics for the current model"""
+    cv = (run_info or {}).get('cv')
+    if not cv:
+        return
+    if cv.get('skipped'):
+        st.info(f"📐 Cross-validation skipped ({cv['skipped']}): metrics are from the holdout only")
+        return
+    
+    st.markdown(f"#### 📐 {cv['n_splits']}-Fold Cross-Validation")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("ROC AUC", f"{cv['roc_auc_mean']:.3f} ± {cv['roc_auc_std']:.3f}")
+    with col2:
+        st.metric("PR AUC", f"{cv['pr_auc_mean']:.3f} ± {cv['pr_auc_std']:.3f}")
+    with col3:
+        st.metric("Top-Decile Lift", f"{cv['top_decile_lift_mean']:.2f}x ± {cv['top_decile_lift_std']:.2f}")
+    with col4:
+        st.metric("Accuracy", f"{cv['accuracy_mean']:.3f} ± {cv['accuracy_std']:.3f}")
+
+def refresh_scores(force=False):
+    """Re-age the session's scores to now when they were computed on an earlier day"""
+    run_info = st.session_state.get('run_info') or {}
+    reference_time = run_info.get('reference_time')
+    if 'compiled' not in run_info or reference_time is None:
+        return
+    if not force and reference_time.date() == pd.Timestamp.now().date():
+        return
+    
+    scored_df, summary = refresh_recency(
+        st.session_state['scored_df'], run_info['compiled'],
+        st.session_state['features'], run_info.get('feature_stats')
+    )
+    st.session_state['scored_df'] = scored_df
+    st.session_state['run_info'] = dict(run_info, reference_time=summary['reference_time'], recency_refresh=summary)
+    if shadow_columns(scored_df):
+        run_shadow_scoring()
+    if run_info.get('store'):
+        publish_scores(run_info['store']['dataset'])
+
+def run_shadow_scoring():
+    """Score the session's leads with the registry's challengers, beside the production scores"""
+    run_info = st.session_state.get('run_info') or {}
+    versions = [v for v in get_challenger_versions() if v != run_info.get('model_version')]
+    if 'compiled' not in run_info:
+        return
+    
+    challengers = []
+    for version in versions:
+        _, entry, compiled = load_model_version(version)
+        if compiled is not None:
+            challengers.append((version, compiled, entry['features'], entry['feature_stats']))
+    if not challengers:
+        st.session_state['scored_df'] = drop_shadow_scores(st.session_state['scored_df'])
+        st.session_state['run_info'] = {k: v for k, v in run_info.items() if k != 'shadow'}
+        return
+    
+    champion = (run_info['model_version'], run_info['compiled'], st.session_state['features'], run_info.get('feature_stats'))
+    scored_df, report = shadow_score(st.session_state['scored_df'], champion, challengers, run_info.get('reference_time'))
+    st.session_state['scored_df'] = scored_df
+    st.session_state['run_info'] = dict(run_info, shadow=report)
+
+@st.cache_resource(show_spinner="Distilling the what-if model...")
+def get_surrogate(version, _scored_df):
+    """Saved what-if surrogate of a model, distilled from these leads the first time it's needed"""
+    surrogate = load_surrogate(version)
+    if surrogate is None:
+        _, entry, compiled = load_model_version(version)
+        if entry is None:
+            return None
+        surrogate, _ = distill(compiled, _scored_df[entry['features']], entry['feature_stats'])
+        save_surrogate(surrogate, version)
+    return surrogate
+
+def publish_scores(dataset):
+    """Publish the session's scores so other app processes can map them"""
+    run_info = st.session_state.get('run_info') or {}
+    if not run_info.get('model_version'):
+        return
+    pointer = publish_scored(dataset, run_info['model_version'], st.session_state['scored_df'])
+    history = record_run(dataset, st.session_state['scored_df'], run_info['model_version'])
+    st.session_state['run_info'] = dict(run_info, store=pointer, history=history)
+
+def load_shared_scores(dataset):
+    """Adopt the latest published scores for a dataset into a fresh session"""
+    scored_df, pointer = load_scored(dataset)
+    if scored_df is None:
+        return
+    
+    pipeline, entry, _ = load_model_version(pointer['model_version'])
+    cv_scores = (entry or {}).get('cv_scores') or {}
+    st.session_state['model'] = pipeline
+    st.session_state['scored_df'] = scored_df
+    st.session_state['features'] = entry['features'] if entry else []
+    st.session_state['accuracy'] = cv_scores.get('holdout_accuracy') or 0
+    st.session_state['roc_auc'] = cv_scores.get('holdout_roc_auc')
+    st.session_state['run_info'] = {
+        'training_mode': 'shared',
+        'model_version': pointer['model_version'],
+        'store': pointer,
+    }
+
+def show_store_status(run_info):
+    """Caption with the published scored-lead store version"""
+    pointer = (run_info or {}).get('store')
+    if not pointer:
+        return
+    st.caption(
+        f"📦 Shared store: {pointer['dataset']} @ model {pointer['model_version']} "
+        f"({pointer['rows']:,} leads, published {pointer['published_at'][:19].replace('T', ' ')})"
+    )
+
+def show_trending_leads(run_info):
+    """Leads whose score or category has been climbing over the dataset's recent scoring runs"""
+    pointer = (run_info or {}).get('store')
+    if not pointer:
+        return
+    
+    dataset = pointer['dataset']
+    with st.expander("📈 Trending Up", expanded=False):
+        trend = trending_up(dataset, TREND_WINDOW)
+        if trend.empty:
+            st.info("No leads trending up yet - trends need at least two scoring runs of this dataset")
+            return
+        st.dataframe(trend.head(100), use_container_width=True, hide_index=True)
+        st.caption(
+            f"{len(trend):,} leads rose a category or gained 10+ points over the last {TREND_WINDOW} runs · "
+            f"history store {history_size(dataset) / 1024**2:.2f} MB"
+        )
+        lead_id = st.selectbox("Lead history", trend['lead_id'].head(100), key="history_lead")
+        if lead_id is not None:
+            history = lead_history(dataset, lead_id)
+            st.line_chart(history.set_index('run_id')['lead_score'].astype(float), height=200)
+
+def show_compaction_status(run_info):
+    """Caption with the compact model artifact's size and score parity"""
+    report = (run_info or {}).get('compaction')
+    if not report:
+        return
+    st.caption(
+        f"🗜️ Compact model: {report['trees_after']}/{report['trees_before']} trees, "
+        f"{report['artifact_bytes'] / 1024**2:.1f} MB vs {report['pipeline_bytes'] / 1024**2:.1f} MB pickled, "
+        f"{report['same_category']:.1%} of holdout leads keep their category "
+        f"(mean shift {report['mean_score_shift']:.2f} pts)"
+    )
+    if report.get('full_roc_auc') is not None:
+        st.caption(
+            f"Accuracy and ROC AUC above are the compact model's, on {report['eval_rows']:,} held-out leads "
+            f"not used to prune it (full forest: ROC AUC {report['full_roc_auc']:.3f}, "
+            f"accuracy {report['full_accuracy']:.3f})"
+        )
+
+def show_recency_status(run_info):
+    """Caption with the time the scores' recency is measured against"""
+    run_info = run_info or {}
+    if run_info.get('reference_time') is None:
+        return
+    
+    recency = (run_info.get('feature_stats') or {}).get('recency') or {}
+    decay = recency.get('decay', 'reciprocal')
+    if decay == 'exponential':
+        decay = f"exponential, {recency.get('half_life_days', 7.0):g}-day half-life"
+    caption = f"🕒 Recency as of {run_info['reference_time']:%Y-%m-%d %H:%M} ({decay} decay)"
+    refresh = run_info.get('recency_refresh')
+    if refresh:
+        caption += f" - last refresh rescored {refresh['refreshed']:,} of {refresh['total']:,} leads in {refresh['elapsed_sec']:.2f}s"
+    st.caption(caption)
+
+def show_outcome_ingestion():
+    """Sidebar panel to record conversion outcomes and warm-start the production model"""
+    with st.expander("🎯 Conversion Outcomes"):
+        outcome_file = st.file_uploader(
+            "Outcomes File",
+            type=['csv', 'xlsx'],
+            help="Columns: lead_id, converted (0/1) and optionally timestamp"
+        )
+        if outcome_file is not None and st.button("📥 Record Outcomes", use_container_width=True):
+            outcomes = read_leads(outcome_file)
+            result = record_outcomes(outcomes)
+            st.success(f"✅ Recorded {result['accepted']:,} outcomes ({result['rejected']:,} rejected)")
+            st.session_state['feedback_result'] = warm_start_retrain()
         
-        .input-label {
-            font-size: 0.9rem;
-            font-weight: 600;
-            color: #334155;
-            margin-bottom: 8px;
-            display: block;
-        }
+        _, entry, _ = load_model_version(get_production_version()) if get_production_version() else (None, None, None)
+        if entry is None:
+            st.caption("Train a model to start the feedback loop")
+            return
         
-        .stTextInput > div > div > input {
-            border: 2px solid #e2e8f0;
-            border-radius: 12px;
-            padding: 14px 18px;
-            font-size: 1rem;
-            transition: all 0.3s ease;
-            background: #f8fafc;
-        }
+        pending = pending_labels(entry)
+        st.progress(min(pending / RETRAIN_MIN_LABELS, 1.0))
+        st.caption(f"{pending:,} / {RETRAIN_MIN_LABELS:,} new labels before the next warm-start retrain")
+        if st.button("🔁 Retrain on Outcomes Now", use_container_width=True, disabled=pending == 0):
+            st.session_state['feedback_result'] = warm_start_retrain(force=True)
         
-        .stTextInput > div > div > input:focus {
-            border-color: #667eea;
-            background: white;
-            box-shadow: 0 0 0 4px rgba(102, 126, 234, 0.1);
-        }
+        result = st.session_state.get('feedback_result')
+        if result and result['status'] in ('promoted', 'rejected'):
+            icon = "✅" if result['status'] == 'promoted' else "⚠️"
+            st.caption(
+                f"{icon} Warm-start {result['model_version']} {result['status']}: {result['labels']:,} labels, "
+                f"{result['trees']} trees, AUC {result['auc_before']:.3f} → {result['auc_after']:.3f}"
+            )
+        elif result and result['status'] == 'insufficient':
+            st.caption("⚠️ Not enough scored leads with both outcomes yet - score the leads first")
         
-        .login-button {
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            color: white;
-            border: none;
-            border-radius: 12px;
-            padding: 16px 24px;
-            font-size: 1.1rem;
-            font-weight: 700;
-            width: 100%;
-            margin-top: 10px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            box-shadow: 0 8px 20px rgba(102, 126, 234, 0.4);
-        }
+        runs = get_feedback_runs(5)
+        if not runs.empty:
+            st.dataframe(runs[['model_version', 'labels', 'auc_before', 'auc_after', 'promoted']], hide_index=True)
+
+def show_challenger_picker():
+    """Sidebar panel to flag registered models as shadow challengers"""
+    with st.expander("🥊 Shadow Challengers"):
+        models = [e for e in get_registered_models() if not e['is_production']][:20]
+        if not models:
+            st.caption("Train more than one model to compare challengers with production")
+            return
         
-        .login-button:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 12px 30px rgba(102, 126, 234, 0.5);
-        }
+        def describe(version):
+            entry = next(e for e in models if e['version'] == version)
+            auc = (entry['cv_scores'] or {}).get('holdout_roc_auc')
+            return f"{version} ({entry['training_mode']}" + (f", AUC {auc:.3f})" if auc else ")")
         
-        .demo-button {
-            background: white;
-            color: #667eea;
-            border: 2px solid #667eea;
-            border-radius: 12px;
-            padding: 16px 24px;
-            font-size: 1.1rem;
-            font-weight: 700;
-            width: 100%;
-            margin-top: 10px;
-            cursor: pointer;
-            transition: all 0.3s ease;
-        }
+        flagged = [e['version'] for e in models if e['is_challenger']]
+        chosen = st.multiselect(
+            "Challengers",
+            [e['version'] for e in models],
+            default=flagged,
+            format_func=describe,
+            help="Scored on every train/rescore next to production; reps only ever see the production score"
+        )
+        if set(chosen) != set(flagged):
+            set_challengers(chosen)
+
+@st.fragment
+def show_what_if(df, lead_index):
+    """Rescore one lead live as its budget, BHK or interactions are nudged (reruns only this panel)"""
+    version = (st.session_state.get('run_info') or {}).get('model_version')
+    if not version or not len(lead_index):
+        return
+    
+    with st.expander("🎛️ What-If Analysis", expanded=False):
+        surrogate = get_surrogate(version, df)
+        if surrogate is None:
+            st.caption("What-if analysis needs a registered model")
+            return
         
-        .demo-button:hover {
-            background: #f8fafc;
-            transform: translateY(-2px);
-        }
+        def describe(i):
+            parts = [str(df.at[i, c]) for c in ('lead_id', 'name') if c in df.columns]
+            return " · ".join(parts) or str(i)
         
-        .feature-card {
-            background: linear-gradient(135deg, #f8fafc 0%, #e0e7ff 100%);
-            padding: 20px;
-            border-radius: 16px;
-            margin-top: 30px;
-            border: 2px solid #e0e7ff;
-        }
+        lead = st.selectbox("Lead", list(lead_index), format_func=describe)
+        row = df.loc[lead].to_dict()
         
-        .feature-title {
-            font-size: 1rem;
-            font-weight: 700;
-            color: #1e293b;
-            margin-bottom: 12px;
-            display: flex;
-            align-items: center;
-            gap: 8px;
-        }
+        col1, col2 = st.columns(2)
+        budget = bhk = None
+        with col1:
+            low, high = surrogate['budget_range']
+            if low is not None and high is not None and low < high and 'budget_mid' in row:
+                current = row['budget_mid'] if row['budget_mid'] == row['budget_mid'] else (low + high) / 2
+                budget = st.slider("Budget (₹/month)", int(low), int(high), int(min(max(current, low), high)),
+                                   step=max(1, int((high - low) / 100)))
+            if 'bhk' in df.columns:
+                options = sorted(df['bhk'].dropna().unique().tolist())
+                if row['bhk'] in options:
+                    bhk = st.select_slider("BHK", options, value=options[options.index(row['bhk'])])
+        with col2:
+            interactions = {
+                c: st.number_input(c.replace('_', ' ').title(), 0, 1000, int(row.get(c) or 0))
+                for c in INTERACTION_COLS if c in row
+            }
         
-        .feature-item {
-            font-size: 0.9rem;
-            color: #475569;
-            margin: 8px 0;
-            padding-left: 24px;
-            position: relative;
-        }
+        start = time.perf_counter()
+        baseline = surrogate_proba(surrogate, row)
+        score = surrogate_proba(surrogate, what_if(surrogate, row, budget, bhk, interactions))
+        elapsed_us = (time.perf_counter() - start) * 1e6
         
-        .feature-item::before {
-            content: '✓';
-            position: absolute;
-            left: 0;
-            color: #10b981;
-            font-weight: 800;
-            font-size: 1.1rem;
-        }
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Current Score", int(row['lead_score']), help="Production model score")
+        with col2:
+            st.metric("What-If Score", round(score * 100), f"{(score - baseline) * 100:+.1f}")
+        with col3:
+            st.metric("What-If Category", map_probability_to_category(round(score * 100)))
         
-        /* Mobile Responsive */
-        @media (max-width: 768px) {
-            .login-container {
-                margin: 20px;
-                max-width: 100%;
-            }
-            
-            .login-title {
-                font-size: 1.8rem;
-            }
-            
-            .login-icon {
-                font-size: 60px;
-            }
-            
-            .login-body {
-                padding: 30px 25px;
-            }
-        }
-        </style>
-    """, unsafe_allow_html=True)
+        fit = surrogate['report']['fidelity_what_if']
+        st.caption(
+            f"Distilled from model {version}: {fit['mae_points']:.1f} pts mean difference from production on "
+            f"nudged leads, {fit['same_category']:.0%} same category; both scores took {elapsed_us:.0f} µs"
+        )
+
+def show_shadow_summary(run_info):
+    """Compare challenger scores with the production scores reps see"""
+    report = (run_info or {}).get('shadow')
+    if not report or not report['challengers']:
+        return
+    
+    with st.expander("🥊 Shadow Scoring vs Production", expanded=False):
+        rows = [{
+            'Challenger': c['version'],
+            'Category Agreement': f"{c['agreement']:.1%}",
+            'Rank Correlation': None if c['rank_correlation'] is None else round(c['rank_correlation'], 3),
+            'Top-Decile Overlap': f"{c['top_decile_overlap']:.1%}",
+            'Mean |Δ Score|': round(c['mean_abs_diff'], 1),
+            'Hot (champion → challenger)': f"{c['hot_champion']:,} → {c['hot_challenger']:,}",
+        } for c in report['challengers']]
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        st.caption(
+            f"Scored {report['rows']:,} leads against production model {report['champion']} "
+            f"in {report['elapsed_sec']:.2f}s; challenger scores are in the shadow_score_* columns"
+        )
+
+def show_drift_summary(run_info):
+    """PSI/KS drift between these leads and a model's training data, with a retrain alert"""
+    run_info = run_info or {}
+    report = run_info.get('drift')
+    if not report:
+        return
+    
+    scoring_model = report['reference_version'] == run_info.get('model_version')
+    if report['retrain_advised'] and scoring_model:
+        st.warning(
+            f"⚠️ Data drift: {', '.join(report['drifted'])} differ from the data model "
+            f"{report['reference_version']} was trained on - retraining is advised"
+        )
+    elif report['retrain_advised']:
+        st.info(
+            f"📉 This data differs from what model {report['reference_version']} was trained on "
+            f"({', '.join(report['drifted'])}); the new model was trained on it"
+        )
+    else:
+        st.caption(f"✅ No significant drift vs model {report['reference_version']} (max PSI {report['max_psi']:.3f})")
+    
+    with st.expander("📉 Drift by Feature", expanded=report['retrain_advised'] and scoring_model):
+        rows = [{
+            'Feature': f['feature'],
+            'PSI': None if f['psi'] is None else round(f['psi'], 4),
+            'KS': None if f.get('ks') is None else round(f['ks'], 4),
+            'New Values': ', '.join(f"{v} ({share:.0%})" for v, share in list(f.get('new_values', {}).items())[:5]),
+            'Status': f['status'],
+        } for f in report['features']]
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        st.caption("PSI under 0.1 is stable, 0.1-0.25 moderate, above 0.25 (or KS above 0.2) significant")
+
+def show_dedup_summary(report):
+    """Show how many duplicate CRM records were merged before scoring"""
+    if not report or not report['duplicates_merged']:
+        return
+    
+    st.caption(
+        f"🧬 Merged {report['duplicates_merged']:,} duplicate records into {report['clusters']:,} leads "
+        f"({report['rows_in']:,} → {report['rows_out']:,} rows, {report['pairs_compared']:,} name comparisons "
+        f"in {report['blocks']:,} phone blocks) in {report['elapsed_sec']:.2f}s"
+    )
+
+def show_load_summary(report):
+    """Show which columns the schema-aware load parsed and what skipping the rest saved"""
+    if not report:
+        return
+    
+    summary = (
+        f"📥 Loaded {report['columns_loaded']} of {report['columns_in_file']} columns in {report['load_sec']:.2f}s"
+    )
+    if report['skipped']:
+        summary += (f" · skipped {len(report['skipped'])} unused ({report['cells_skipped']:,} cells, "
+                    f"~{report['memory_avoided_mb']:.1f} MB)")
+    if report['renamed']:
+        summary += " · renamed " + ", ".join(f"{a} → {b}" for a, b in report['renamed'].items())
+    if report['coerced']:
+        summary += " · unparseable values blanked: " + ", ".join(f"{c} ({n:,})" for c, n in report['coerced'].items())
+    for column, dates in report.get('datetimes', {}).items():
+        formats = dates['formats'] + ([f"{dates['excel_serials']:,} Excel serials"] if dates['excel_serials'] else [])
+        if formats:
+            summary += f" · {column} read as " + ", ".join(formats) + (" (cached)" if dates['cache_hit'] else "")
+    st.caption(summary)
+    for column, dates in report.get('datetimes', {}).items():
+        if dates['failed']:
+            st.warning(f"⚠️ {dates['failed']:,} {column} values matched no date format (rows "
+                       + ", ".join(str(r) for r in dates['failed_rows'][:10])
+                       + f"{'…' if dates['failed'] > 10 else ''}; e.g. {', '.join(dates['failed_examples'][:3])})")
+        if dates.get('ambiguous'):
+            st.warning(f"⚠️ {dates['ambiguous']:,} {column} values only parse with day and month swapped from "
+                       f"{', '.join(dates['formats'])} and were left blank (rows "
+                       + ", ".join(str(r) for r in dates['ambiguous_rows'][:10])
+                       + f"{'…' if dates['ambiguous'] > 10 else ''})")
+
+def show_ingest_summary(report):
+    """Show per-file throughput of a multi-part load and the files or sheets that failed"""
+    if not report or len(report['parts']) < 2:
+        return
+    
+    st.caption(
+        f"📚 {len(report['files'])} files, {len(report['parts'])} sheets → {report['rows']:,} rows in "
+        f"{report['seconds']:.2f}s on {report['workers']} worker(s) ({report['rows_per_sec']:,.0f} rows/s)"
+    )
+    st.dataframe(pd.DataFrame([{
+        'File': f['file'],
+        'Sheets': f['sheets'],
+        'Rows': f['rows'],
+        'MB': f['bytes'] / 1024**2,
+        'Rows/s': f['rows_per_sec'],
+        'MB/s': f['mb_per_sec'],
+        'Errors': "; ".join(f['errors']),
+    } for f in report['files']]), hide_index=True, use_container_width=True)
+    if report['failed']:
+        st.warning(f"⚠️ {report['failed']} of {len(report['parts'])} sheets couldn't be loaded and were skipped")
+
+def analytics_cube():
+    """The analytics cube of the session's scored leads, rebuilt only when the scored frame is replaced"""
+    # Keyed on the session's frame itself: views derived from it (e.g. without shadow scores) are new on every rerun
+    scored = st.session_state['scored_df']
+    cached = st.session_state.get('analytics_cube')
+    if cached is None or cached[0]() is not scored:
+        st.session_state['analytics_cube'] = (weakref.ref(scored), build_cube(scored))
+    return st.session_state['analytics_cube'][1]
+
+def show_cube_drilldown(cube):
+    """Slice the scored leads by any profile dimensions, answered from the analytics cube"""
+    dims = cube['dimensions']
+    labels = {d: d.replace('_', ' ').title() for d in dims}
+    by = st.multiselect("Group by", dims, default=dims[:1], format_func=labels.get, key="cube_by")
+    
+    where = {}
+    cols = st.columns(len(dims))
+    for col, dim in zip(cols, dims):
+        with col:
+            where[dim] = st.multiselect(labels[dim], list(cube['members'][dim]), key=f"cube_filter_{dim}")
+    
+    start = time.perf_counter()
+    table = cube_frame(cube, by, where)
+    elapsed_us = (time.perf_counter() - start) * 1e6
+    st.dataframe(table, use_container_width=True)
+    st.caption(
+        f"🧊 Answered from the analytics cube ({cube['count'].size:,} cells over {cube['rows']:,} leads, "
+        f"built in {cube['build_sec'] * 1000:.0f} ms) in {elapsed_us:,.0f} µs"
+    )
+
+def show_incremental_summary(run_info):
+    """Show the diff between this upload and the previously scored leads"""
+    summary = (run_info or {}).get('incremental')
+    if not summary:
+        return
+    
+    st.markdown(f"#### ♻️ Incremental Rescore (model {summary['model_version']})")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("🆕 New", f"{summary['new']:,}")
+    with col2:
+        st.metric("✏️ Changed", f"{summary['changed']:,}")
+    with col3:
+        st.metric("✅ Unchanged", f"{summary['unchanged']:,}")
+    with col4:
+        st.metric("🗑️ Removed", f"{summary['removed']:,}")
+    st.caption(
+        f"Rescored {summary['rescored']:,} leads ({summary['recency_refreshed']:,} for recency, "
+        f"{summary['model_changed']:,} for a newer model) and reused {summary['reused']:,} "
+        f"stored scores in {summary['elapsed_sec']:.2f}s"
+    )
+
+# ============================================================================
+# LOGIN PAGE
+# ============================================================================
+
+def show_login_page():
+    """Professional login page with modern design"""
+    
+    # Creative CSS for login page
+    st.markdown(load_css("login.css"), unsafe_allow_html=True)
     
     col1, col2, col3 = st.columns([1, 2.5, 1])
     
@@ -848,6 +1220,7 @@ def show_login_page():
 # ============================================================================
 
 init_database()
+start_warm_up()
 
 # Initialize session state
 if 'logged_in' not in st.session_state:
@@ -860,397 +1233,37 @@ if not st.session_state.logged_in:
     show_login_page()
     st.stop()
 
+# ============================================================================
+# DEFERRED IMPORTS (the login page never needs the ML or plotting stack)
+# ============================================================================
+
+import plotly.express as px
+import plotly.graph_objects as go
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, roc_auc_score
+from lead_features import map_probability_to_category, feature_stats, build_target, pseudo_labels, INTERACTION_COLS
+from lead_model import (build_pipeline, auto_tune, register_model, cross_validate_model,
+                        get_production_version, get_registered_models, set_challengers, get_challenger_versions,
+                        DEFAULT_RF_PARAMS)
+from lead_inference import compile_pipeline, predict_proba_compiled, attach_reason_codes, format_reasons
+from lead_store import row_fingerprints, save_lead_index, incremental_score, refresh_recency, publish_scored, load_scored
+from lead_dedup import dedupe_leads
+from lead_drift import capture_sketches, save_sketches, load_reference_sketches, drift_report, check_drift
+from lead_feedback import apply_outcomes, record_outcomes, warm_start_retrain, pending_labels, get_feedback_runs, RETRAIN_MIN_LABELS
+from lead_shadow import shadow_score, shadow_columns, drop_shadow_scores
+from lead_compact import compact_model, holdout_metrics, save_registered, split_holdout
+from lead_surrogate import distill, save_surrogate, load_surrogate, surrogate_proba, what_if
+from lead_io import read_leads
+from lead_ingest import ingest_leads
+from lead_cube import build_cube, cube_frame
+from lead_featstore import engineer_features_cached, add_feature_ref, gc_feature_store
+from lead_history import record_run, trending_up, lead_history, history_size, TREND_WINDOW
+
 # ============================================================================
 # MAIN APPLICATION CSS (After Login)
 # ============================================================================
 
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700;800;900&display=swap');
-    
-    /* Global Styles */
-    * {
-        font-family: 'Inter', sans-serif;
-    }
-    
-    /* Main Background */
-    [data-testid="stAppViewContainer"] {
-        background: linear-gradient(135deg, #0f172a 0%, #1e293b 50%, #334155 100%);
-    }
-    
-    .block-container {
-        padding-top: 1rem;
-        padding-bottom: 2rem;
-        max-width: 100%;
-    }
-    
-    /* Glassmorphism Effect */
-    .glass-card {
-        background: rgba(255, 255, 255, 0.05);
-        backdrop-filter: blur(10px);
-        border-radius: 20px;
-        border: 1px solid rgba(255, 255, 255, 0.1);
-        padding: 24px;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
-    }
-    
-    /* Header Styles */
-    .main-header {
-        font-size: 3.5rem;
-        font-weight: 900;
-        background: linear-gradient(135deg, #60a5fa 0%, #a78bfa 50%, #ec4899 100%);
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        text-align: center;
-        padding: 2rem 0 0.5rem 0;
-        margin-bottom: 0;
-        letter-spacing: -0.03em;
-        text-shadow: 0 0 80px rgba(96, 165, 250, 0.5);
-    }
-    
-    .sub-header {
-        text-align: center;
-        color: #cbd5e1;
-        font-size: 1.2rem;
-        margin-bottom: 2rem;
-        font-weight: 400;
-        opacity: 0.9;
-    }
-    
-    /* Sidebar Styling */
-    [data-testid="stSidebar"] {
-        background: linear-gradient(180deg, #1e293b 0%, #0f172a 100%);
-        padding: 1rem;
-    }
-    
-    [data-testid="stSidebar"] * {
-        color: white !important;
-    }
-    
-    [data-testid="stSidebar"] .stButton > button {
-        background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%);
-        color: white;
-        border: none;
-        border-radius: 12px;
-        padding: 0.75rem 1.5rem;
-        font-weight: 700;
-        font-size: 1rem;
-        box-shadow: 0 4px 15px rgba(59, 130, 246, 0.4);
-        transition: all 0.3s ease;
-        width: 100%;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-    
-    [data-testid="stSidebar"] .stButton > button:hover {
-        transform: translateY(-3px);
-        box-shadow: 0 8px 25px rgba(59, 130, 246, 0.6);
-    }
-    
-    /* User Info Card */
-    .user-info {
-        background: linear-gradient(135deg, rgba(59, 130, 246, 0.2) 0%, rgba(139, 92, 246, 0.2) 100%);
-        padding: 20px;
-        border-radius: 16px;
-        margin-bottom: 24px;
-        border: 2px solid rgba(59, 130, 246, 0.3);
-        backdrop-filter: blur(10px);
-    }
-    
-    .user-info h3 {
-        color: #60a5fa !important;
-        margin: 0 0 12px 0;
-        font-size: 1.3rem;
-        font-weight: 800;
-    }
-    
-    /* Metric Cards */
-    .metric-card {
-        background: linear-gradient(135deg, rgba(255, 255, 255, 0.1) 0%, rgba(255, 255, 255, 0.05) 100%);
-        padding: 1.5rem;
-        border-radius: 16px;
-        border: 2px solid rgba(255, 255, 255, 0.1);
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
-        transition: all 0.3s ease;
-        height: 100%;
-        backdrop-filter: blur(10px);
-    }
-    
-    .metric-card:hover {
-        transform: translateY(-8px) scale(1.02);
-        box-shadow: 0 16px 48px rgba(0, 0, 0, 0.4);
-        border-color: rgba(255, 255, 255, 0.3);
-    }
-    
-    .metric-card-hot {
-        background: linear-gradient(135deg, rgba(239, 68, 68, 0.2) 0%, rgba(220, 38, 38, 0.1) 100%);
-        border-color: #ef4444;
-    }
-    
-    .metric-card-warm {
-        background: linear-gradient(135deg, rgba(245, 158, 11, 0.2) 0%, rgba(217, 119, 6, 0.1) 100%);
-        border-color: #f59e0b;
-    }
-    
-    .metric-card-cold {
-        background: linear-gradient(135deg, rgba(59, 130, 246, 0.2) 0%, rgba(37, 99, 235, 0.1) 100%);
-        border-color: #3b82f6;
-    }
-    
-    /* Tabs Styling */
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 1rem;
-        background: rgba(255, 255, 255, 0.05);
-        padding: 0.5rem;
-        border-radius: 16px;
-        backdrop-filter: blur(10px);
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        background: transparent;
-        border-radius: 12px;
-        padding: 1rem 2rem;
-        font-weight: 700;
-        color: #94a3b8;
-        border: none;
-        transition: all 0.3s ease;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-        font-size: 0.9rem;
-    }
-    
-    .stTabs [data-baseweb="tab"]:hover {
-        background: rgba(255, 255, 255, 0.1);
-        color: #e2e8f0;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%);
-        color: white !important;
-        box-shadow: 0 4px 20px rgba(59, 130, 246, 0.4);
-    }
-    
-    /* Buttons */
-    .stButton > button {
-        background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%);
-        color: white;
-        border: none;
-        border-radius: 12px;
-        padding: 0.75rem 1.5rem;
-        font-weight: 700;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px rgba(59, 130, 246, 0.3);
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-        font-size: 0.95rem;
-    }
-    
-    .stButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 25px rgba(59, 130, 246, 0.5);
-    }
-    
-    /* Download Buttons */
-    .stDownloadButton > button {
-        background: linear-gradient(135deg, #10b981 0%, #059669 100%);
-        color: white;
-        border: none;
-        border-radius: 12px;
-        padding: 0.75rem 1.5rem;
-        font-weight: 700;
-        transition: all 0.3s ease;
-        box-shadow: 0 4px 15px rgba(16, 185, 129, 0.3);
-    }
-    
-    .stDownloadButton > button:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 8px 25px rgba(16, 185, 129, 0.5);
-    }
-    
-    /* DataFrames */
-    [data-testid="stDataFrame"] {
-        border-radius: 16px;
-        overflow: hidden;
-        box-shadow: 0 8px 32px rgba(0, 0, 0, 0.3);
-        border: 1px solid rgba(255, 255, 255, 0.1);
-    }
-    
-    .dataframe {
-        border: none !important;
-        background: rgba(255, 255, 255, 0.05) !important;
-    }
-    
-    .dataframe thead tr th {
-        background: linear-gradient(135deg, #3b82f6 0%, #8b5cf6 100%) !important;
-        color: white !important;
-        font-weight: 700 !important;
-        padding: 16px !important;
-        text-transform: uppercase;
-        font-size: 0.85rem;
-        letter-spacing: 1px;
-        border: none !important;
-    }
-    
-    .dataframe tbody tr {
-        background: rgba(255, 255, 255, 0.02) !important;
-        transition: all 0.2s ease;
-    }
-    
-    .dataframe tbody tr:hover {
-        background: rgba(255, 255, 255, 0.08) !important;
-        transform: scale(1.005);
-    }
-    
-    .dataframe tbody td {
-        color: #e2e8f0 !important;
-        padding: 12px !important;
-        border-color: rgba(255, 255, 255, 0.05) !important;
-    }
-    
-    /* Progress Bar */
-    .stProgress > div > div > div > div {
-        background: linear-gradient(90deg, #3b82f6 0%, #8b5cf6 100%);
-        border-radius: 10px;
-    }
-    
-    /* Expanders */
-    .streamlit-expanderHeader {
-        background: linear-gradient(135deg, rgba(255, 255, 255, 0.1) 0%, rgba(255, 255, 255, 0.05) 100%);
-        border-radius: 12px;
-        border: 2px solid rgba(255, 255, 255, 0.1);
-        font-weight: 700;
-        color: #e2e8f0;
-        padding: 1rem;
-        backdrop-filter: blur(10px);
-    }
-    
-    .streamlit-expanderHeader:hover {
-        border-color: #3b82f6;
-        background: linear-gradient(135deg, rgba(59, 130, 246, 0.2) 0%, rgba(139, 92, 246, 0.1) 100%);
-    }
-    
-    /* Section Headers */
-    h3 {
-        color: #e2e8f0 !important;
-        font-weight: 800 !important;
-        margin-top: 2rem;
-        margin-bottom: 1rem;
-        border-bottom: 3px solid #3b82f6;
-        padding-bottom: 0.5rem;
-        display: inline-block;
-        letter-spacing: -0.5px;
-    }
-    
-    /* Metric Values */
-    [data-testid="stMetricValue"] {
-        font-size: 2.5rem;
-        font-weight: 900;
-        color: #e2e8f0;
-    }
-    
-    [data-testid="stMetricLabel"] {
-        font-size: 0.9rem;
-        color: #94a3b8;
-        font-weight: 600;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-    }
-    
-    /* Info/Success/Warning Boxes */
-    .stAlert {
-        border-radius: 12px;
-        border-left: 4px solid;
-        padding: 1rem 1.5rem;
-        font-weight: 500;
-        backdrop-filter: blur(10px);
-        background: rgba(255, 255, 255, 0.05);
-    }
-    
-    /* Inputs */
-    .stTextInput > div > div > input,
-    .stSelectbox > div > div > select,
-    .stNumberInput > div > div > input {
-        border-radius: 10px;
-        border: 2px solid rgba(255, 255, 255, 0.1);
-        background: rgba(255, 255, 255, 0.05);
-        color: #e2e8f0;
-        padding: 0.75rem;
-        transition: all 0.3s ease;
-        backdrop-filter: blur(10px);
-    }
-    
-    .stTextInput > div > div > input:focus,
-    .stSelectbox > div > div > select:focus,
-    .stNumberInput > div > div > input:focus {
-        border-color: #3b82f6;
-        background: rgba(255, 255, 255, 0.08);
-        box-shadow: 0 0 0 3px rgba(59, 130, 246, 0.2);
-    }
-    
-    /* Slider */
-    .stSlider > div > div > div {
-        background: linear-gradient(90deg, #3b82f6 0%, #8b5cf6 100%);
-    }
-    
-    /* Activity Card */
-    .activity-card {
-        background: linear-gradient(135deg, rgba(255, 255, 255, 0.08) 0%, rgba(255, 255, 255, 0.04) 100%);
-        padding: 16px;
-        border-radius: 12px;
-        margin: 10px 0;
-        border-left: 4px solid #3b82f6;
-        backdrop-filter: blur(10px);
-        transition: all 0.3s ease;
-    }
-    
-    .activity-card:hover {
-        transform: translateX(5px);
-        border-left-color: #8b5cf6;
-        box-shadow: 0 4px 20px rgba(59, 130, 246, 0.3);
-    }
-    
-    /* Online Indicator */
-    .online-indicator {
-        display: inline-block;
-        width: 10px;
-        height: 10px;
-        background: #10b981;
-        border-radius: 50%;
-        margin-right: 8px;
-        animation: pulse-green 2s infinite;
-        box-shadow: 0 0 10px #10b981;
-    }
-    
-    @keyframes pulse-green {
-        0%, 100% { opacity: 1; transform: scale(1); }
-        50% { opacity: 0.6; transform: scale(1.1); }
-    }
-    
-    /* Divider */
-    hr {
-        margin: 2rem 0;
-        border: none;
-        height: 2px;
-        background: linear-gradient(90deg, transparent, #3b82f6, transparent);
-    }
-    
-    /* Mobile Responsive */
-    @media (max-width: 768px) {
-        .main-header {
-            font-size: 2rem;
-        }
-        
-        .sub-header {
-            font-size: 1rem;
-        }
-        
-        .stTabs [data-baseweb="tab"] {
-            padding: 0.75rem 1rem;
-            font-size: 0.8rem;
-        }
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(load_css("app.css"), unsafe_allow_html=True)
 
 # ============================================================================
 # SIDEBAR (Common for both Admin & User)
@@ -1326,9 +1339,10 @@ if st.session_state.user['role'] == 'admin':
     st.markdown("---")
     
     # Main Admin Tabs
-    admin_main_tab1, admin_main_tab2 = st.tabs([
+    admin_main_tab1, admin_main_tab2, admin_main_tab3 = st.tabs([
         "🎯 LEAD SCORING DASHBOARD",
-        "👑 USER MANAGEMENT"
+        "👑 USER MANAGEMENT",
+        "⏱️ PERFORMANCE"
     ])
     
     # ========================================================================
@@ -1351,14 +1365,56 @@ if st.session_state.user['role'] == 'admin':
             
             if upload_option == "Upload Custom File":
                 uploaded_file = st.file_uploader(
-                    "Upload Excel File",
-                    type=['xlsx', 'xls'],
-                    help="Upload CRM leads file"
+                    "Upload Leads Files",
+                    type=['xlsx', 'xls', 'csv', 'parquet'],
+                    accept_multiple_files=True,
+                    help="Upload one or more CRM leads files (Excel, CSV or Parquet); every sheet is loaded"
                 )
                 data_path = uploaded_file
             else:
                 data_path = "5000_rental_crm_leads.xlsx"
             
+            st.markdown("---")
+            st.markdown("### ⚙️ Training Mode")
+            
+            training_mode = st.radio(
+                "Mode:",
+                ["Standard", "Auto-tune"],
+                help="Auto-tune runs a successive halving search over the forest's hyperparameters"
+            )
+            tune_budget, tune_jobs = 120, None
+            if training_mode == "Auto-tune":
+                tune_budget = st.number_input("Time Budget (sec)", 10, 3600, 120, 10)
+                tune_jobs = st.number_input("CPU Cores", 1, os.cpu_count() or 1, os.cpu_count() or 1)
+            
+            kfold_eval = st.checkbox(
+                "📐 K-fold Evaluation",
+                value=True,
+                help="Report mean ± std metrics across folds instead of a single split"
+            )
+            cv_folds = st.slider("Folds", 3, 10, 5) if kfold_eval else 0
+            
+            merge_duplicates = st.checkbox(
+                "🧬 Merge Duplicate Leads",
+                value=True,
+                help="Combine records of the same person (same phone, similar name) before scoring"
+            )
+            
+            trace_memory = st.checkbox(
+                "🧠 Trace Python Memory",
+                value=False,
+                help="Record per-stage Python allocation peaks with tracemalloc (slows training)"
+            )
+            
+            recency_decay = st.selectbox(
+                "Recency Decay:",
+                ["reciprocal", "exponential"],
+                help="How a lead's recency score fades with days since last activity"
+            )
+            half_life_days = 7.0
+            if recency_decay == "exponential":
+                half_life_days = st.number_input("Half-life (days)", 0.5, 365.0, 7.0, 0.5)
+            
             st.markdown("---")
             
             train_button = st.button(
@@ -1366,11 +1422,32 @@ if st.session_state.user['role'] == 'admin':
                 type="primary",
                 use_container_width=True
             )
+            rescore_button = st.button(
+                "♻️ RESCORE CHANGED LEADS",
+                use_container_width=True,
+                help="Score with the production model, only recomputing new or changed leads"
+            )
+            refresh_button = st.button(
+                "🕒 REFRESH RECENCY",
+                use_container_width=True,
+                help="Re-age the current scores to now without retraining"
+            )
+            
+            show_outcome_ingestion()
+            show_challenger_picker()
         
         # Main content
-        if train_button and data_path:
+        if (train_button or rescore_button) and data_path:
+            profiler = StageProfiler(trace_memory=trace_memory)
             with st.spinner("🔄 Loading data..."):
-                df = load_data(data_path)
+                with profiler.stage("load_data"):
+                    df = load_data(data_path)
+                load_report = df.attrs.get('schema') if df is not None else None
+                if df is not None and merge_duplicates:
+                    with profiler.stage("dedup"):
+                        df, st.session_state['dedup_report'] = dedupe_leads(df)
+                else:
+                    st.session_state.pop('dedup_report', None)
             
             if df is not None:
                 with st.expander("📊 Dataset Preview", expanded=False):
@@ -1386,26 +1463,52 @@ if st.session_state.user['role'] == 'admin':
                         st.metric("💾 Memory", f"{memory:.2f} MB")
                     
                     st.dataframe(df.head(10), use_container_width=True)
+                    show_load_summary(load_report)
+                    show_ingest_summary(df.attrs.get('ingest'))
                 
                 try:
-                    model, scored_df, features, accuracy, roc_auc = train_model(df)
+                    if rescore_button:
+                        model, scored_df, features, accuracy, roc_auc, run_info = rescore_leads(
+                            df, dataset_name(data_path)
+                        )
+                    else:
+                        model, scored_df, features, accuracy, roc_auc, run_info = train_model(
+                            df, training_mode, tune_budget, tune_jobs, cv_folds, promote=True,
+                            dataset=dataset_name(data_path),
+                            recency_decay=recency_decay, half_life_days=half_life_days,
+                            _profiler=profiler
+                        )
                     
                     st.session_state['model'] = model
                     st.session_state['scored_df'] = scored_df
                     st.session_state['features'] = features
                     st.session_state['accuracy'] = accuracy
                     st.session_state['roc_auc'] = roc_auc
+                    st.session_state['run_info'] = run_info
+                    with profiler.stage("shadow"):
+                        run_shadow_scoring()
+                    publish_scores(dataset_name(data_path))
                     
                     log_usage(st.session_state.user['id'], 'score_leads', 'Admin scoring', len(scored_df))
+                    if profiler.has_stage("fit"):
+                        log_training_profile(st.session_state.user['id'], profiler, run_info, len(scored_df))
                     
-                    st.success("✅ Model trained successfully!")
-                    st.balloons()
+                    if rescore_button:
+                        st.success("✅ Leads rescored with the production model!")
+                    else:
+                        st.success("✅ Model trained successfully!")
+                        st.balloons()
                     
                 except Exception as e:
                     st.error(f"❌ Error: {e}")
         
+        # Reuse scores another app process already published
+        if 'scored_df' not in st.session_state and data_path:
+            load_shared_scores(dataset_name(data_path))
+        
         # Display results
         if 'scored_df' in st.session_state:
+            refresh_scores(force=refresh_button)
             df = st.session_state['scored_df']
             accuracy = st.session_state.get('accuracy', 0)
             roc_auc = st.session_state.get('roc_auc', None)
@@ -1478,6 +1581,16 @@ if st.session_state.user['role'] == 'admin':
                     gauge = create_gauge_chart(conversion, "Hot %", "#10b981")
                     st.plotly_chart(gauge, use_container_width=True)
                 
+                show_recency_status(st.session_state.get('run_info'))
+                show_store_status(st.session_state.get('run_info'))
+                show_compaction_status(st.session_state.get('run_info'))
+                show_cv_summary(st.session_state.get('run_info'))
+                show_drift_summary(st.session_state.get('run_info'))
+                show_shadow_summary(st.session_state.get('run_info'))
+                show_dedup_summary(st.session_state.get('dedup_report'))
+                show_incremental_summary(st.session_state.get('run_info'))
+                show_tuning_summary(st.session_state.get('run_info'))
+                
                 st.markdown("---")
                 
                 st.markdown("### 📊 Distribution Analysis")
@@ -1549,7 +1662,11 @@ if st.session_state.user['role'] == 'admin':
                     selected = st.multiselect("Additional Columns", available, available[:2] if len(available) >= 2 else available)
                     display_cols.extend(selected)
                 
-                top_leads = filtered.nlargest(show_count, 'lead_score')[display_cols]
+                top_leads = filtered.nlargest(show_count, 'lead_score')
+                if 'reason_1' in top_leads.columns:
+                    top_leads = top_leads.assign(top_drivers=format_reasons(top_leads))
+                    display_cols.insert(4, 'top_drivers')
+                top_leads = top_leads[display_cols]
                 
                 def highlight_category(row):
                     if row['lead_category'] == 'Hot':
@@ -1560,6 +1677,9 @@ if st.session_state.user['role'] == 'admin':
                         return ['background-color: rgba(59, 130, 246, 0.2)'] * len(row)
                 
                 st.dataframe(top_leads.style.apply(highlight_category, axis=1), use_container_width=True, height=600)
+                if 'top_drivers' in top_leads.columns:
+                    st.caption("Top drivers: each lead's three strongest features and how many score points they add (+) or take away (-)")
+                show_what_if(df, top_leads.index)
                 
                 col1, col2, col3 = st.columns(3)
                 with col1:
@@ -1568,18 +1688,16 @@ if st.session_state.user['role'] == 'admin':
                     st.metric("📊 Avg", f"{filtered['lead_score'].mean():.1f}")
                 with col3:
                     st.metric("📈 Max", filtered['lead_score'].max())
+                
+                show_trending_leads(st.session_state.get('run_info'))
             
             with tab3:
                 st.markdown("### 📈 Advanced Analytics")
                 
-                if 'source' in df.columns:
+                cube = analytics_cube()
+                if 'source' in cube['dimensions']:
                     st.markdown("#### Performance by Source")
-                    source_stats = df.groupby('source').agg({
-                        'lead_score': ['mean', 'count'],
-                        'lead_category': lambda x: (x == 'Hot').sum()
-                    }).round(2)
-                    source_stats.columns = ['Avg Score', 'Count', 'Hot Leads']
-                    source_stats = source_stats.sort_values('Avg Score', ascending=False)
+                    source_stats = cube_frame(cube, ['source'])[['Avg Score', 'Count', 'Hot Leads']]
                     
                     col1, col2 = st.columns(2)
                     with col1:
@@ -1604,6 +1722,10 @@ if st.session_state.user['role'] == 'admin':
                         )
                         st.plotly_chart(fig_bar, use_container_width=True)
                 
+                if cube['dimensions']:
+                    st.markdown("#### Drill-down")
+                    show_cube_drilldown(cube)
+                
                 if 'budget_mid' in df.columns:
                     st.markdown("#### Score vs Budget")
                     fig_scatter = px.scatter(
@@ -1887,6 +2009,94 @@ Please share these credentials with the user.
                 st.dataframe(df_activities, use_container_width=True, height=600)
             else:
                 st.info("No activities logged yet")
+    
+    # ========================================================================
+    # ADMIN TAB 3: PERFORMANCE
+    # ========================================================================
+    
+    with admin_main_tab3:
+        st.markdown("## ⏱️ Training Performance")
+        
+        profiles = get_training_profiles()
+        
+        if profiles.empty:
+            st.info("No training runs profiled yet - train a model to record stage timings")
+        else:
+            runs = profiles.groupby('run_id', sort=False).agg(
+                timestamp=('timestamp', 'first'),
+                username=('username', 'first'),
+                training_mode=('training_mode', 'first'),
+                n_rows=('n_rows', 'first'),
+                wall_sec=('wall_sec', 'sum'),
+                cpu_sec=('cpu_sec', 'sum'),
+                peak_rss_mb=('peak_rss_mb', 'max'),
+            ).reset_index()
+            runs['rows_per_sec'] = runs['n_rows'] / runs['wall_sec']
+            
+            latest_run = runs.iloc[-1]
+            latest = profiles[profiles['run_id'] == latest_run['run_id']].sort_values('stage_order')
+            
+            st.markdown(f"### 🕒 Latest Run ({latest_run['timestamp']})")
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("⏱️ Wall Time", f"{latest_run['wall_sec']:.2f}s")
+            with col2:
+                st.metric("🧮 CPU Time", f"{latest_run['cpu_sec']:.2f}s")
+            with col3:
+                peak = latest_run['peak_rss_mb']
+                st.metric("💾 Peak RSS", f"{peak:,.0f} MB" if pd.notna(peak) else "N/A")
+            with col4:
+                st.metric("📄 Leads/sec", f"{latest_run['rows_per_sec']:,.0f}")
+            
+            fig_stages = go.Figure()
+            fig_stages.add_trace(go.Bar(
+                y=latest['stage'], x=latest['wall_sec'], name='Wall', orientation='h', marker_color='#3b82f6'
+            ))
+            fig_stages.add_trace(go.Bar(
+                y=latest['stage'], x=latest['cpu_sec'], name='CPU', orientation='h', marker_color='#8b5cf6'
+            ))
+            fig_stages.update_layout(
+                barmode='group',
+                height=max(300, 28 * len(latest)),
+                xaxis_title='Seconds',
+                yaxis=dict(autorange='reversed'),
+                paper_bgcolor='rgba(0,0,0,0)',
+                plot_bgcolor='rgba(0,0,0,0)',
+                font=dict(family='Inter')
+            )
+            st.plotly_chart(fig_stages, use_container_width=True)
+            
+            st.dataframe(
+                latest[['stage', 'wall_sec', 'cpu_sec', 'peak_rss_mb', 'rss_growth_mb', 'py_peak_mb']],
+                use_container_width=True,
+                hide_index=True
+            )
+            
+            st.markdown("---")
+            st.markdown("### 📈 Trends Across Runs")
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                fig_trend = px.bar(
+                    profiles, x='timestamp', y='wall_sec', color='stage',
+                    title='Wall Time per Stage',
+                    labels={'timestamp': 'Run', 'wall_sec': 'Seconds'}
+                )
+                fig_trend.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+                st.plotly_chart(fig_trend, use_container_width=True)
+            
+            with col2:
+                fig_size = px.scatter(
+                    runs, x='n_rows', y='wall_sec', color='training_mode',
+                    size='peak_rss_mb' if runs['peak_rss_mb'].notna().all() else None,
+                    hover_data=['timestamp', 'username', 'rows_per_sec'],
+                    title='Training Time vs Dataset Size',
+                    labels={'n_rows': 'Leads', 'wall_sec': 'Seconds'}
+                )
+                fig_size.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+                st.plotly_chart(fig_size, use_container_width=True)
+            
+            st.dataframe(runs.iloc[::-1], use_container_width=True, hide_index=True)
 
 # ============================================================================
 # USER DASHBOARD
@@ -1909,8 +2119,9 @@ else:
         
         if upload_option == "Upload Custom File":
             uploaded_file = st.file_uploader(
-                "Upload Excel File",
-                type=['xlsx', 'xls']
+                "Upload Leads Files",
+                type=['xlsx', 'xls', 'csv', 'parquet'],
+                accept_multiple_files=True
             )
             data_path = uploaded_file
         else:
@@ -1918,16 +2129,49 @@ else:
         
         st.markdown("---")
         
+        training_mode = st.radio("Training Mode:", ["Standard", "Auto-tune"])
+        tune_budget, tune_jobs = 120, None
+        if training_mode == "Auto-tune":
+            tune_budget = st.number_input("Time Budget (sec)", 10, 3600, 120, 10)
+            tune_jobs = st.number_input("CPU Cores", 1, os.cpu_count() or 1, os.cpu_count() or 1)
+        
+        kfold_eval = st.checkbox("📐 K-fold Evaluation", value=True)
+        cv_folds = st.slider("Folds", 3, 10, 5) if kfold_eval else 0
+        merge_duplicates = st.checkbox("🧬 Merge Duplicate Leads", value=True)
+        
+        recency_decay = st.selectbox("Recency Decay:", ["reciprocal", "exponential"])
+        half_life_days = 7.0
+        if recency_decay == "exponential":
+            half_life_days = st.number_input("Half-life (days)", 0.5, 365.0, 7.0, 0.5)
+        
+        st.markdown("---")
+        
         train_button = st.button(
             "🚀 TRAIN & SCORE",
             type="primary",
             use_container_width=True
         )
+        rescore_button = st.button(
+            "♻️ RESCORE CHANGED LEADS",
+            use_container_width=True
+        )
+        refresh_button = st.button(
+            "🕒 REFRESH RECENCY",
+            use_container_width=True
+        )
     
     # Training
-    if train_button and data_path:
+    if (train_button or rescore_button) and data_path:
+        profiler = StageProfiler()
         with st.spinner("🔄 Loading data..."):
-            df = load_data(data_path)
+            with profiler.stage("load_data"):
+                df = load_data(data_path)
+            load_report = df.attrs.get('schema') if df is not None else None
+            if df is not None and merge_duplicates:
+                with profiler.stage("dedup"):
+                    df, st.session_state['dedup_report'] = dedupe_leads(df)
+            else:
+                st.session_state.pop('dedup_report', None)
         
         if df is not None:
             with st.expander("📊 Dataset Preview", expanded=False):
@@ -1943,27 +2187,50 @@ else:
                     st.metric("💾 Memory", f"{memory:.2f} MB")
                 
                 st.dataframe(df.head(10), use_container_width=True)
+                show_load_summary(load_report)
+                show_ingest_summary(df.attrs.get('ingest'))
             
             try:
-                model, scored_df, features, accuracy, roc_auc = train_model(df)
+                if rescore_button:
+                    model, scored_df, features, accuracy, roc_auc, run_info = rescore_leads(
+                        df, dataset_name(data_path)
+                    )
+                else:
+                    model, scored_df, features, accuracy, roc_auc, run_info = train_model(
+                        df, training_mode, tune_budget, tune_jobs, cv_folds,
+                        dataset=dataset_name(data_path),
+                        recency_decay=recency_decay, half_life_days=half_life_days,
+                        _profiler=profiler
+                    )
                 
                 st.session_state['model'] = model
                 st.session_state['scored_df'] = scored_df
                 st.session_state['features'] = features
                 st.session_state['accuracy'] = accuracy
                 st.session_state['roc_auc'] = roc_auc
+                st.session_state['run_info'] = run_info
+                publish_scores(dataset_name(data_path))
                 
                 log_usage(st.session_state.user['id'], 'score_leads', 'User scoring', len(scored_df))
+                if profiler.has_stage("fit"):
+                    log_training_profile(st.session_state.user['id'], profiler, run_info, len(scored_df))
                 
                 st.success("✅ Scoring complete!")
-                st.balloons()
+                if not rescore_button:
+                    st.balloons()
                 
             except Exception as e:
                 st.error(f"❌ Error: {e}")
     
+    # Reuse scores another app process already published
+    if 'scored_df' not in st.session_state and data_path:
+        load_shared_scores(dataset_name(data_path))
+    
     # Display results
     if 'scored_df' in st.session_state:
-        df = st.session_state['scored_df']
+        refresh_scores(force=refresh_button)
+        # Challenger scores are for admins; reps only see production scores
+        df = drop_shadow_scores(st.session_state['scored_df'])
         accuracy = st.session_state.get('accuracy', 0)
         roc_auc = st.session_state.get('roc_auc', None)
         
@@ -2033,6 +2300,15 @@ else:
                 gauge = create_gauge_chart(conversion, "Hot %", "#10b981")
                 st.plotly_chart(gauge, use_container_width=True)
             
+            show_recency_status(st.session_state.get('run_info'))
+            show_store_status(st.session_state.get('run_info'))
+            show_compaction_status(st.session_state.get('run_info'))
+            show_cv_summary(st.session_state.get('run_info'))
+            show_drift_summary(st.session_state.get('run_info'))
+            show_dedup_summary(st.session_state.get('dedup_report'))
+            show_incremental_summary(st.session_state.get('run_info'))
+            show_tuning_summary(st.session_state.get('run_info'))
+            
             st.markdown("---")
             
             col1, col2 = st.columns(2)
@@ -2085,18 +2361,28 @@ else:
             ]
             
             top_leads = filtered.nlargest(show_count, 'lead_score')
+            if 'reason_1' in top_leads.columns:
+                # Readable drivers up front instead of the raw reason code columns
+                reason_cols = [c for c in top_leads.columns if c.startswith('reason_')]
+                top_leads = top_leads.drop(columns=reason_cols)
+                top_leads.insert(min(4, len(top_leads.columns)), 'top_drivers', format_reasons(filtered.loc[top_leads.index]))
             st.dataframe(top_leads, use_container_width=True, height=600)
+            if 'top_drivers' in top_leads.columns:
+                st.caption("Top drivers: each lead's three strongest features and how many score points they add (+) or take away (-)")
+            show_what_if(df, top_leads.index)
+            show_trending_leads(st.session_state.get('run_info'))
         
         with tab3:
             st.markdown("### 📈 Analytics")
             
-            if 'source' in df.columns:
-                source_stats = df.groupby('source')['lead_score'].agg(['mean', 'count']).sort_values('mean', ascending=False)
+            cube = analytics_cube()
+            if 'source' in cube['dimensions']:
+                source_stats = cube_frame(cube, ['source'])
                 fig_bar = go.Figure()
                 fig_bar.add_trace(go.Bar(
                     x=source_stats.index,
-                    y=source_stats['mean'],
-                    marker=dict(color=source_stats['mean'], colorscale='Viridis')
+                    y=source_stats['Avg Score'],
+                    marker=dict(color=source_stats['Avg Score'], colorscale='Viridis')
                 ))
                 fig_bar.update_layout(
                     title="Avg Score by Source",
@@ -2104,6 +2390,10 @@ else:
                     font={'color': '#e2e8f0'}
                 )
                 st.plotly_chart(fig_bar, use_container_width=True)
+            
+            if cube['dimensions']:
+                st.markdown("#### Drill-down")
+                show_cube_drilldown(cube)
         
         with tab4:
             st.markdown("### 📋 All Leads")
@@ -0,0 +1,398 @@
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request as urlrequest
+
+import numpy as np
+import pandas as pd
+
+from lead_features import engineer_features, map_probability_to_category
+from lead_inference import predict_proba_compiled
+from lead_compact import load_compiled_model
+from lead_feedback import record_outcomes, warm_start_retrain
+from lead_io import read_leads
+from lead_schema import LEAD_SCHEMA
+
+# ============================================================================
+# LOCAL SCORING SERVICE
+# ============================================================================
+#
+# POST /score     {"leads": [{...raw CRM lead fields...}, ...]} or a single lead
+# POST /outcomes  {"outcomes": [{"lead_id": ..., "converted": 0/1, "timestamp": ...}, ...]}
+# GET  /metrics   latency percentiles, batch sizes and request counts
+# GET  /health    loaded model version
+#
+# Outcomes accumulate in the feedback store; once enough new labels are
+# pending, a warm-started retrain runs in the background and a promoted model
+# is swapped in without restarting the service.
+#
+# Requests from concurrent clients are queued and coalesced by one batching
+# thread: it waits up to `max_wait_ms` for more leads (or until `max_batch`
+# leads are pending), engineers features for the whole batch with the
+# model's stored training statistics and scores it in one compiled call.
+# Each request's leads are checked against the lead schema before they join
+# a batch, so a malformed lead gets a 400 instead of failing its neighbours;
+# if a batch still fails, its requests are retried one by one. A lead's
+# features must not depend on what it was batched with, so the batch frame
+# has every raw schema column (see lead_frame).
+
+DEFAULT_PORT = 8765
+LATENCY_WINDOW = 10000
+
+
+def coerce_lead(lead, schema=LEAD_SCHEMA):
+    """Copy of a raw lead dict with numeric schema fields as floats; ValueError names a field that isn't numeric"""
+    lead = dict(lead)
+    for column, (kind, _) in schema.items():
+        value = lead.get(column)
+        if kind != 'number' or value is None or value == "":
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+            raise ValueError(f"'{column}' must be a number, got {value!r}")
+        try:
+            lead[column] = float(value)
+        except ValueError:
+            raise ValueError(f"'{column}' must be a number, got {value!r}") from None
+    return lead
+
+
+def lead_frame(leads, schema=LEAD_SCHEMA):
+    """Raw leads as a frame with every schema column, so missing fields are missing per lead, not per batch"""
+    df = pd.DataFrame.from_records(leads)
+    if "budget" in df.columns:
+        # A single budget is a range of one; every lead then reads the same budget columns
+        for col in ("budget_min", "budget_max"):
+            df[col] = df[col].fillna(df["budget"]) if col in df.columns else df["budget"]
+        df = df.drop(columns="budget")
+    raw = [c for c in schema if c != "budget"]
+    return df.reindex(columns=list(dict.fromkeys(list(df.columns) + raw)))
+
+
+def score_leads(model, leads):
+    """Engineer features and score a list of raw lead dicts with a (version, features, stats, compiled) bundle"""
+    _, features, stats, compiled = model
+    df = lead_frame(leads)
+    engineer_features(df, stats)
+    # Engineering treats a batch with no budgets at all as budget-less; decide per lead instead, as training did
+    df.loc[df["budget_mid"].isna(), "budget_match"] = np.nan if stats.get('budget_min') is not None else 0.5
+    for col in features:
+        if col not in df.columns:
+            df[col] = None
+    probability = predict_proba_compiled(compiled, df[features])
+    scores = np.round(probability * 100).astype(int)
+    return [
+        {
+            'lead_id': lead.get('lead_id'),
+            'lead_score': int(score),
+            'lead_category': map_probability_to_category(score),
+        }
+        for lead, score in zip(leads, scores)
+    ]
+
+
+class MicroBatcher:
+    """Coalesce concurrent scoring requests into batched predict_proba calls"""
+
+    def __init__(self, version=None, max_batch=256, max_wait_ms=2.0):
+        self.load_model(version)
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._latencies_ms = deque(maxlen=LATENCY_WINDOW)
+        self._batch_sizes = deque(maxlen=LATENCY_WINDOW)
+        self._requests = 0
+        self._leads = 0
+        self._errors = 0
+        self._started = time.time()
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def load_model(self, version=None):
+        """Load a registered model, compact when available; batches already running finish on the old one"""
+        entry, compiled = load_compiled_model(version)
+        if entry is None:
+            raise ValueError(f"No registered model found (version={version or 'production'})")
+
+        # score_batch reads one bundle per batch, so a swap never mixes models
+        self._model = (entry['version'], entry['features'], entry['feature_stats'], compiled)
+
+    @property
+    def version(self):
+        return self._model[0]
+
+    def submit(self, leads):
+        """Queue a list of raw lead dicts; returns a Future of the scored results"""
+        future = Future()
+        self._queue.put((leads, future, time.perf_counter()))
+        return future
+
+    def score_batch(self, leads):
+        """Engineer features and score a list of raw lead dicts with the current model"""
+        return score_leads(self._model, leads)
+
+    def _collect(self):
+        """Block for the first request, then gather more until full or timed out"""
+        batch = [self._queue.get()]
+        n_leads = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while n_leads < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            n_leads += len(item[0])
+        return batch, n_leads
+
+    def _score_items(self, batch):
+        """Score a failed batch one request at a time; only requests that fail on their own get the error.
+
+        Returns the (item, results) pairs that scored.
+        """
+        scored = []
+        for item in batch:
+            try:
+                scored.append((item, self.score_batch(item[0])))
+            except Exception as e:
+                item[1].set_exception(e)
+                with self._lock:
+                    self._errors += 1
+        return scored
+
+    def _run(self):
+        while True:
+            batch, n_leads = self._collect()
+            leads = [lead for item in batch for lead in item[0]]
+            try:
+                results = self.score_batch(leads)
+                pos, scored = 0, []
+                for item in batch:
+                    scored.append((item, results[pos:pos + len(item[0])]))
+                    pos += len(item[0])
+            except Exception:
+                scored = self._score_items(batch)
+                n_leads = sum(len(item[0]) for item, _ in scored)
+                if not scored:
+                    continue
+
+            done = time.perf_counter()
+            with self._lock:
+                self._batch_sizes.append(n_leads)
+                self._leads += n_leads
+                for (_, _, submitted), _ in scored:
+                    self._requests += 1
+                    self._latencies_ms.append((done - submitted) * 1000)
+            for (_, future, _), item_results in scored:
+                future.set_result(item_results)
+
+    def metrics(self):
+        """Latency percentiles and batch-size summary over the recent window"""
+        with self._lock:
+            latencies = np.array(self._latencies_ms, dtype=float)
+            sizes = np.array(self._batch_sizes, dtype=float)
+            requests, leads, errors = self._requests, self._leads, self._errors
+
+        def pct(values, q):
+            return float(np.percentile(values, q)) if len(values) else None
+
+        return {
+            'model_version': self.version,
+            'uptime_sec': time.time() - self._started,
+            'requests': requests,
+            'leads_scored': leads,
+            'errors': errors,
+            'latency_ms': {'p50': pct(latencies, 50), 'p90': pct(latencies, 90), 'p99': pct(latencies, 99)},
+            'batch_size': {
+                'mean': float(sizes.mean()) if len(sizes) else None,
+                'p50': pct(sizes, 50),
+                'max': float(sizes.max()) if len(sizes) else None,
+                'batches': int(len(sizes)),
+            },
+            'queue_depth': self._queue.qsize(),
+        }
+
+
+def retrain_in_background(batcher):
+    """Warm-start retrain if enough outcomes are pending and hot-swap a promoted model"""
+
+    def run():
+        try:
+            result = warm_start_retrain()
+        except Exception as e:
+            print(f"Warm-start retrain failed: {e}")
+            return
+        if result['status'] == 'promoted':
+            batcher.load_model(result['model_version'])
+        if result['status'] in ('promoted', 'rejected'):
+            print(f"Warm-start {result['model_version']} {result['status']} from {result['labels']:,} outcomes "
+                  f"(AUC {result['auc_before']:.3f} -> {result['auc_after']:.3f})")
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def make_handler(batcher):
+    """Build a request handler bound to a MicroBatcher"""
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send_json(200, batcher.metrics())
+            elif self.path == "/health":
+                self._send_json(200, {'status': 'ok', 'model_version': batcher.version})
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def _post_outcomes(self):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                outcomes = payload['outcomes'] if isinstance(payload, dict) and 'outcomes' in payload else payload
+                if isinstance(outcomes, dict):
+                    outcomes = [outcomes]
+                if not isinstance(outcomes, list) or not all(isinstance(o, dict) for o in outcomes):
+                    raise ValueError("expected an outcome object or {\"outcomes\": [...]}")
+            except (ValueError, KeyError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            result = record_outcomes(outcomes)
+            if result['accepted']:
+                retrain_in_background(batcher)
+            self._send_json(200, result)
+
+        def do_POST(self):
+            if self.path == "/outcomes":
+                self._post_outcomes()
+                return
+            if self.path != "/score":
+                self._send_json(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                leads = payload['leads'] if isinstance(payload, dict) and 'leads' in payload else payload
+                if isinstance(leads, dict):
+                    leads = [leads]
+                if not isinstance(leads, list) or not all(isinstance(l, dict) for l in leads):
+                    raise ValueError("expected a lead object or {\"leads\": [...]}")
+                leads = [coerce_lead(lead) for lead in leads]
+            except (ValueError, KeyError) as e:
+                self._send_json(400, {'error': str(e)})
+                return
+
+            if not leads:
+                self._send_json(200, {'model_version': batcher.version, 'results': []})
+                return
+            try:
+                results = batcher.submit(leads).result()
+            except Exception as e:
+                self._send_json(500, {'error': str(e)})
+                return
+            self._send_json(200, {'model_version': batcher.version, 'results': results})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ScoringHandler
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The stdlib default backlog of 5 drops connections under bursty load
+    request_queue_size = 256
+
+
+def serve(version=None, port=DEFAULT_PORT, max_batch=256, max_wait_ms=2.0):
+    """Run the scoring service on localhost until interrupted"""
+    batcher = MicroBatcher(version, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    server = ScoringServer(("127.0.0.1", port), make_handler(batcher))
+    print(f"Scoring service on http://127.0.0.1:{port} (model {batcher.version})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+# ============================================================================
+# LOAD GENERATOR
+# ============================================================================
+
+def run_load_test(url, leads, requests=2000, concurrency=32):
+    """Fire single-lead requests from `concurrency` threads and report client latency"""
+    url = url.rstrip("/")
+
+    def one(i):
+        body = json.dumps(leads[i % len(leads)]).encode('utf-8')
+        req = urlrequest.Request(url + "/score", data=body, headers={"Content-Type": "application/json"})
+        start = time.perf_counter()
+        with urlrequest.urlopen(req) as resp:
+            resp.read()
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.array(list(pool.map(one, range(requests))))
+    elapsed = time.perf_counter() - start
+
+    with urlrequest.urlopen(url + "/metrics") as resp:
+        server_metrics = json.loads(resp.read())
+
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'throughput_rps': requests / elapsed,
+        'client_latency_ms': {
+            'p50': float(np.percentile(latencies, 50)),
+            'p99': float(np.percentile(latencies, 99)),
+        },
+        'server': server_metrics,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local lead scoring service")
+    sub = parser.add_subparsers(dest="command")
+
+    p_serve = sub.add_parser("serve", help="Run the scoring service")
+    p_serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p_serve.add_argument("--model-version", default=None, help="Registered version (default: production)")
+    p_serve.add_argument("--max-batch", type=int, default=256)
+    p_serve.add_argument("--max-wait-ms", type=float, default=2.0)
+
+    p_load = sub.add_parser("loadtest", help="Generate load against a running service")
+    p_load.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_PORT}")
+    p_load.add_argument("--data", default="5000_rental_crm_leads.xlsx")
+    p_load.add_argument("--requests", type=int, default=2000)
+    p_load.add_argument("--concurrency", type=int, default=32)
+
+    args = parser.parse_args()
+    if args.command == "loadtest":
+        sample = read_leads(args.data).head(1000)
+        records = json.loads(sample.to_json(orient="records", date_format="iso"))
+        print(json.dumps(run_load_test(args.url, records, args.requests, args.concurrency), indent=2))
+    else:
+        serve(
+            getattr(args, "model_version", None),
+            port=getattr(args, "port", DEFAULT_PORT),
+            max_batch=getattr(args, "max_batch", 256),
+            max_wait_ms=getattr(args, "max_wait_ms", 2.0),
+        )
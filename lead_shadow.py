@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from lead_features import map_probability_to_category
+from lead_featstore import engineer_features_cached
+from lead_model import get_challenger_versions
+from lead_inference import predict_proba_compiled
+from lead_compact import load_compiled_model
+from lead_io import read_leads
+
+# ============================================================================
+# CHAMPION / CHALLENGER SHADOW SCORING
+# ============================================================================
+#
+# Challengers are registered models flagged in the registry. Each model must
+# see features engineered with its own training stats (budget range, area
+# frequencies, behaviour maxima, recency decay), so models are grouped by
+# stats: the champion's group scores the already engineered frame, and each
+# other distinct set of stats engineers one copy (through the feature store,
+# so repeat runs map it). Within a group each model runs on its own thread,
+# because numpy releases the GIL in the forest traversal. Challenger scores land in
+# shadow_score_<version> columns next to lead_score. lead_score and
+# lead_category are never touched, so reps keep seeing the champion only.
+
+SHADOW_PREFIX = "shadow_score_"
+TOP_FRACTION = 0.1
+
+
+def shadow_column(version):
+    """Column holding a challenger's 0-100 score"""
+    return f"{SHADOW_PREFIX}{version}"
+
+
+def shadow_columns(df):
+    """Challenger score columns present in a frame"""
+    return [c for c in df.columns if c.startswith(SHADOW_PREFIX)]
+
+
+def drop_shadow_scores(df):
+    """The frame as reps should see it, without challenger scores"""
+    cols = shadow_columns(df)
+    return df.drop(columns=cols) if cols else df
+
+
+def score_models(X, models, n_threads=None):
+    """Score one feature frame with several compiled models at once.
+
+    `models` maps a name to (compiled, features). Returns {name: P(converted)}.
+    """
+    def run(item):
+        name, (compiled, features) = item
+        # Columns a model expects but the frame lacks stay empty for its imputer
+        frame = X[features] if all(c in X.columns for c in features) else X.reindex(columns=features)
+        return name, predict_proba_compiled(compiled, frame, n_threads=1)
+
+    n_threads = n_threads or min(len(models), os.cpu_count() or 1)
+    if n_threads > 1:
+        with ThreadPoolExecutor(max_workers=n_threads) as pool:
+            return dict(pool.map(run, models.items()))
+    return dict(map(run, models.items()))
+
+
+def _stats_key(stats):
+    return json.dumps(stats, sort_keys=True, default=str)
+
+
+def score_by_stats(df, models, base_stats=None, reference_time=None, n_threads=None):
+    """Score leads with models that may normalise features with different stats.
+
+    `models` maps a name to (compiled, features, stats); `df` is already
+    engineered with `base_stats`. Features are engineered once per other
+    distinct stats, on a copy. Returns {name: P(converted)}.
+    """
+    groups = {}
+    for name, (compiled, features, stats) in models.items():
+        stats = base_stats if stats is None else stats
+        groups.setdefault(_stats_key(stats), (stats, {}))[1][name] = (compiled, features)
+
+    probabilities = {}
+    for key, (stats, group) in groups.items():
+        if key == _stats_key(base_stats):
+            frame = df
+        else:
+            frame = df.copy()
+            engineer_features_cached(frame, stats, reference_time)
+        probabilities.update(score_models(frame, group, n_threads))
+    return probabilities
+
+
+def compare_scores(champion, challenger, top_fraction=TOP_FRACTION):
+    """Category agreement, Spearman rank correlation and top-decile overlap of two P(converted) arrays"""
+    champion = np.asarray(champion, dtype=float)
+    challenger = np.asarray(challenger, dtype=float)
+    n = len(champion)
+    if n == 0:
+        return {'agreement': None, 'rank_correlation': None, 'top_decile_overlap': None,
+                'mean_abs_diff': None, 'hot_champion': 0, 'hot_challenger': 0}
+
+    scores_a = np.round(champion * 100).astype(int)
+    scores_b = np.round(challenger * 100).astype(int)
+    categories_a = pd.Series(scores_a).map(map_probability_to_category).to_numpy()
+    categories_b = pd.Series(scores_b).map(map_probability_to_category).to_numpy()
+
+    # Stable sort so tied leads are cut at the same place for both models
+    k = max(1, int(np.ceil(n * top_fraction)))
+    top_a = np.zeros(n, dtype=bool)
+    top_b = np.zeros(n, dtype=bool)
+    top_a[np.argsort(-champion, kind="stable")[:k]] = True
+    top_b[np.argsort(-challenger, kind="stable")[:k]] = True
+
+    rank_corr = pd.Series(champion).corr(pd.Series(challenger), method="spearman")
+    return {
+        'agreement': float(np.mean(categories_a == categories_b)),
+        'rank_correlation': None if pd.isna(rank_corr) else float(rank_corr),
+        'top_decile_overlap': float((top_a & top_b).sum() / k),
+        'mean_abs_diff': float(np.mean(np.abs(scores_a - scores_b))),
+        'hot_champion': int((categories_a == "Hot").sum()),
+        'hot_challenger': int((categories_b == "Hot").sum()),
+    }
+
+
+def _attach_shadow(scored, champion_version, challenger_versions, probabilities, start):
+    """Add challenger score columns and compare each challenger with the champion"""
+    baseline = probabilities[champion_version]
+    columns, comparisons = {}, []
+    for version in challenger_versions:
+        columns[shadow_column(version)] = np.round(probabilities[version] * 100).astype(int)
+        comparisons.append(dict(compare_scores(baseline, probabilities[version]), version=version))
+
+    # Columns of challengers no longer flagged are dropped rather than left stale
+    shadowed = drop_shadow_scores(scored).assign(**columns)
+    report = {
+        'champion': champion_version,
+        'rows': len(scored),
+        'challengers': comparisons,
+        'elapsed_sec': time.perf_counter() - start,
+    }
+    return shadowed, report
+
+
+def shadow_score(scored, champion, challengers, reference_time=None, n_threads=None):
+    """Score challengers beside the champion on a lead frame engineered with the champion's stats.
+
+    `champion` and each challenger are (version, compiled, features, feature
+    stats); recency is measured against `reference_time`. Returns the frame
+    with fresh shadow_score_<version> columns and a comparison report.
+    """
+    start = time.perf_counter()
+    models = {version: (compiled, features, stats) for version, compiled, features, stats in [champion] + list(challengers)}
+    probabilities = score_by_stats(scored, models, champion[3], reference_time, n_threads)
+    return _attach_shadow(scored, champion[0], [c[0] for c in challengers], probabilities, start)
+
+
+def load_models(versions):
+    """(version, compiled, features, feature stats) for each registered version that still loads"""
+    models = []
+    for version in versions:
+        entry, compiled = load_compiled_model(version)
+        if entry is not None:
+            models.append((entry['version'], compiled, entry['features'], entry['feature_stats']))
+    return models
+
+
+def shadow_file(path, challenger_versions=None, n_threads=None):
+    """Score a leads file with the production model and its challengers; returns (frame, report)"""
+    entry, compiled = load_compiled_model()
+    if entry is None:
+        raise ValueError("No production model registered yet - train a model first")
+    versions = get_challenger_versions() if challenger_versions is None else challenger_versions
+    challengers = load_models([v for v in versions if v != entry['version']])
+    if not challengers:
+        raise ValueError("No challenger models to shadow-score - flag registered models as challengers first")
+
+    df = read_leads(path)
+    start = time.perf_counter()
+    reference_time = pd.Timestamp.now()
+    engineer_features_cached(df, entry['feature_stats'], reference_time)
+    models = {entry['version']: (compiled, entry['features'], entry['feature_stats'])}
+    models.update({version: (compiled, features, stats) for version, compiled, features, stats in challengers})
+    probabilities = score_by_stats(df, models, entry['feature_stats'], reference_time, n_threads)
+
+    # The champion's score is the live one, exactly as the batch scorer writes it
+    df["lead_score"] = np.round(probabilities[entry['version']] * 100).astype(int)
+    df["lead_category"] = df["lead_score"].apply(map_probability_to_category)
+    return _attach_shadow(df, entry['version'], [c[0] for c in challengers], probabilities, start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Champion/challenger shadow scoring")
+    parser.add_argument("data")
+    parser.add_argument("--challengers", nargs="+", default=None,
+                        help="Registered versions to shadow (default: the registry's challengers)")
+    parser.add_argument("--output", default="shadow_lead_scores.csv")
+    parser.add_argument("--threads", type=int, default=None)
+
+    args = parser.parse_args()
+    scored, report = shadow_file(args.data, args.challengers, args.threads)
+    scored.to_csv(args.output, index=False)
+    print(json.dumps(report, indent=2))
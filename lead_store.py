@@ -0,0 +1,362 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from lead_features import engineer_features, recency_features, map_probability_to_category, BEHAVIOR_COLS, INTERACTION_COLS
+from lead_inference import predict_proba_compiled, attach_reason_codes
+
+# ============================================================================
+# ROW FINGERPRINT INDEX
+# ============================================================================
+
+# Raw columns engineer_features reads; a change in any of them changes the score
+FINGERPRINT_COLS = (
+    ["budget_min", "budget_max", "budget", "preferred_area", "source", "bhk", "last_active_time"]
+    + BEHAVIOR_COLS + INTERACTION_COLS
+)
+
+# Unchanged leads are only rescored when their recency moved more than this
+RECENCY_TOLERANCE = 1e-3
+
+
+def row_fingerprints(df):
+    """Vectorized 64-bit hash of each lead's feature-relevant raw columns"""
+    cols = [c for c in FINGERPRINT_COLS if c in df.columns]
+    if not cols:
+        return np.zeros(len(df), dtype=np.int64)
+    hashed = pd.util.hash_pandas_object(df[cols].astype(str), index=False).to_numpy()
+    # SQLite integers are signed 64-bit
+    return hashed.view(np.int64)
+
+
+def init_lead_index():
+    """Create the lead fingerprint index table"""
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS lead_index
+                 (dataset TEXT NOT NULL,
+                  lead_id TEXT NOT NULL,
+                  fingerprint INTEGER,
+                  lead_score INTEGER,
+                  lead_category TEXT,
+                  recency_score REAL,
+                  model_version TEXT,
+                  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                  PRIMARY KEY (dataset, lead_id))''')
+    conn.commit()
+    conn.close()
+
+
+def load_lead_index(dataset):
+    """Load the stored fingerprints and last scores for a dataset"""
+    init_lead_index()
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    index = pd.read_sql_query(
+        "SELECT lead_id, fingerprint, lead_score, lead_category, recency_score, model_version "
+        "FROM lead_index WHERE dataset = ?",
+        conn, params=(dataset,)
+    )
+    conn.close()
+    return index
+
+
+def save_lead_index(dataset, scored_df, fingerprints, model_version):
+    """Replace a dataset's index with the latest fingerprints and scores"""
+    if "lead_id" not in scored_df.columns:
+        return
+    init_lead_index()
+    recency = scored_df["recency_score"] if "recency_score" in scored_df.columns else pd.Series(0.0, index=scored_df.index)
+    rows = pd.DataFrame({
+        'lead_id': scored_df["lead_id"].astype(str).to_numpy(),
+        'fingerprint': fingerprints,
+        'lead_score': scored_df["lead_score"].astype(int).to_numpy(),
+        'lead_category': scored_df["lead_category"].astype(str).to_numpy(),
+        'recency_score': recency.astype(float).to_numpy(),
+    }).drop_duplicates('lead_id', keep='last')
+
+    conn = sqlite3.connect('lead_scoring.db', check_same_thread=False)
+    c = conn.cursor()
+    c.execute("DELETE FROM lead_index WHERE dataset = ?", (dataset,))
+    c.executemany(
+        "INSERT INTO lead_index (dataset, lead_id, fingerprint, lead_score, lead_category, recency_score, model_version) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        ((dataset, r[0], int(r[1]), int(r[2]), r[3], float(r[4]), model_version)
+         for r in rows.itertuples(index=False))
+    )
+    conn.commit()
+    conn.close()
+
+# ============================================================================
+# INCREMENTAL RESCORING
+# ============================================================================
+
+def incremental_score(df, compiled, entry, dataset, reference_time=None):
+    """Rescore only new, changed or recency-drifted leads against the stored index.
+
+    Leads whose fingerprint matches the index entry written by the same model
+    version, and whose recency moved less than RECENCY_TOLERANCE, keep their
+    stored score; everything else goes through the model. Returns the scored
+    frame and a diff summary. Recency is measured against `reference_time`.
+    """
+    start = time.time()
+    fingerprints = row_fingerprints(df)
+    index = load_lead_index(dataset)
+
+    if "lead_id" in df.columns:
+        lead_ids = df["lead_id"].astype(str)
+    else:
+        lead_ids = pd.Series(np.arange(len(df)).astype(str), index=df.index)
+    duplicated = lead_ids.duplicated(keep=False).to_numpy()
+
+    # Time-dependent features are recomputed for every lead (vectorized)
+    scored = df.copy()
+    engineer_features(scored, entry['feature_stats'], reference_time)
+    for col in entry['features']:
+        if col not in scored.columns:
+            scored[col] = None
+
+    # Nullable ints keep the 64-bit hashes exact across the reindex
+    index["fingerprint"] = index["fingerprint"].astype("Int64")
+    prev = index.set_index("lead_id").reindex(lead_ids.to_numpy())
+    known = prev["fingerprint"].notna().to_numpy() & ~duplicated
+    same_model = (prev["model_version"] == entry['version']).to_numpy()
+    same_row = known & (prev["fingerprint"].to_numpy(dtype=np.int64, na_value=0) == fingerprints)
+    recency_drift = np.abs(
+        scored["recency_score"].to_numpy(dtype=float) - prev["recency_score"].to_numpy(dtype=float, na_value=np.nan)
+    ) > RECENCY_TOLERANCE
+
+    reuse = same_row & same_model & ~recency_drift
+    rescore = ~reuse
+
+    scores = np.zeros(len(scored), dtype=int)
+    if reuse.any():
+        scores[reuse] = prev["lead_score"].to_numpy()[reuse].astype(int)
+    if rescore.any():
+        probability = predict_proba_compiled(compiled, scored.loc[rescore, entry['features']])
+        scores[rescore] = np.round(probability * 100).astype(int)
+
+    scored["lead_score"] = scores
+    scored["lead_category"] = scored["lead_score"].apply(map_probability_to_category)
+    # Reasons aren't kept in the index; explaining every lead is cheap next to the I/O
+    attach_reason_codes(scored, compiled, entry['features'])
+
+    save_lead_index(dataset, scored, fingerprints, entry['version'])
+
+    summary = {
+        'dataset': dataset,
+        'model_version': entry['version'],
+        'new': int((~known).sum()),
+        'changed': int((known & ~same_row).sum()),
+        'unchanged': int(same_row.sum()),
+        'removed': int((~index["lead_id"].isin(lead_ids)).sum()),
+        'recency_refreshed': int((same_row & same_model & recency_drift).sum()),
+        'model_changed': int((same_row & ~same_model).sum()),
+        'rescored': int(rescore.sum()),
+        'reused': int(reuse.sum()),
+        'elapsed_sec': time.time() - start,
+    }
+    return scored, summary
+
+# ============================================================================
+# RECENCY REFRESH
+# ============================================================================
+
+def refresh_recency(scored_df, compiled, features, stats, reference_time=None):
+    """Re-age a scored frame to `reference_time` without retraining.
+
+    Only the time-dependent columns are recomputed (with the decay curve the
+    model was trained with), and only leads whose recency actually moved are
+    sent back through the compiled model. Returns the refreshed frame and a
+    summary.
+    """
+    start = time.time()
+    reference_time = pd.Timestamp.now() if reference_time is None else pd.Timestamp(reference_time)
+
+    refreshed = scored_df.copy()
+    previous = refreshed["recency_score"].to_numpy(dtype=float) if "recency_score" in refreshed.columns else None
+    recency_features(refreshed, (stats or {}).get('recency'), reference_time)
+
+    if previous is None:
+        moved = np.ones(len(refreshed), dtype=bool)
+    else:
+        moved = refreshed["recency_score"].to_numpy(dtype=float) != previous
+
+    if moved.any():
+        probability = predict_proba_compiled(compiled, refreshed.loc[moved, features])
+        scores = refreshed["lead_score"].to_numpy(dtype=int).copy()
+        scores[moved] = np.round(probability * 100).astype(int)
+        refreshed["lead_score"] = scores
+        refreshed["lead_category"] = refreshed["lead_score"].apply(map_probability_to_category)
+        attach_reason_codes(refreshed, compiled, features, rows=moved)
+
+    summary = {
+        'reference_time': reference_time,
+        'refreshed': int(moved.sum()),
+        'total': len(refreshed),
+        'elapsed_sec': time.time() - start,
+    }
+    return refreshed, summary
+
+# ============================================================================
+# SCORED LEAD STORE
+# ============================================================================
+#
+# scored_store/<dataset>/<model_version>.arrow   uncompressed Arrow IPC file
+# scored_store/<dataset>/CURRENT                 JSON pointer to the live file
+#
+# Writers build the file under a temporary name and os.replace() it into
+# place, then replace CURRENT the same way. Both renames are atomic, so a
+# reader sees either the old or the new version, never a partial file. Readers
+# memory-map the file read-only: every process serving the dataset shares the
+# same page-cache pages, and a reader still holding the previous mapping keeps
+# a valid view of it after the rename.
+
+SCORED_STORE_DIR = "scored_store"
+KEEP_VERSIONS = 3
+
+_mapped_tables = {}
+
+
+def _dataset_dir(dataset):
+    """Directory for a dataset's published versions"""
+    key = re.sub(r"[^A-Za-z0-9_.-]", "_", str(dataset)) or "dataset"
+    return os.path.join(SCORED_STORE_DIR, key)
+
+
+def _atomic_write(path, write):
+    """Write via a temporary file in the same directory, then rename into place.
+
+    The temporary name is unique per call: Streamlit sessions are threads of
+    one process, so two sessions may publish the same path at once.
+    """
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".tmp-")
+    os.close(fd)
+    # mkstemp creates the file private; store files are read by other processes
+    os.chmod(tmp, 0o644)
+    try:
+        write(tmp)
+        with open(tmp, "rb+") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _to_arrow_table(df):
+    """Arrow table from a scored frame; mixed-type object columns are stored as strings"""
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        try:
+            columns[str(col)] = pa.array(values, from_pandas=True)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            columns[str(col)] = pa.array(values.astype(str).where(values.notna()), from_pandas=True)
+    return pa.table(columns)
+
+
+def publish_scored(dataset, model_version, scored_df):
+    """Publish scored leads for (dataset, model version) and point readers at them"""
+    directory = _dataset_dir(dataset)
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{model_version}.arrow"
+    table = _to_arrow_table(scored_df)
+
+    def write_table(tmp):
+        with pa.OSFile(tmp, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    _atomic_write(os.path.join(directory, filename), write_table)
+
+    pointer = {
+        'dataset': str(dataset),
+        'model_version': model_version,
+        'file': filename,
+        'rows': len(scored_df),
+        'published_at': pd.Timestamp.now().isoformat(),
+    }
+
+    def write_pointer(tmp):
+        with open(tmp, "w") as f:
+            json.dump(pointer, f)
+
+    _atomic_write(os.path.join(directory, "CURRENT"), write_pointer)
+    _prune_versions(directory, filename)
+    return pointer
+
+
+def _prune_versions(directory, current):
+    """Remove all but the newest KEEP_VERSIONS files (open mappings stay valid on POSIX)"""
+    files = sorted(
+        (f for f in os.listdir(directory) if f.endswith(".arrow")),
+        key=lambda f: os.path.getmtime(os.path.join(directory, f)),
+        reverse=True,
+    )
+    for f in files[KEEP_VERSIONS:]:
+        if f != current:
+            try:
+                os.remove(os.path.join(directory, f))
+            except OSError:
+                pass
+
+
+def current_version(dataset):
+    """The CURRENT pointer for a dataset, or None when nothing is published"""
+    try:
+        with open(os.path.join(_dataset_dir(dataset), "CURRENT")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def published_datasets():
+    """CURRENT pointers of every dataset in the store"""
+    if not os.path.isdir(SCORED_STORE_DIR):
+        return []
+    pointers = []
+    for entry in sorted(os.listdir(SCORED_STORE_DIR)):
+        try:
+            with open(os.path.join(SCORED_STORE_DIR, entry, "CURRENT")) as f:
+                pointers.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return pointers
+
+
+def load_scored(dataset, model_version=None):
+    """Map a published version read-only (CURRENT when model_version is None).
+
+    Returns (DataFrame, pointer) or (None, None). The mapping is cached per
+    process and reopened only when the file behind the name changes.
+    """
+    pointer = current_version(dataset)
+    if model_version is not None:
+        pointer = dict(pointer or {'dataset': str(dataset)}, model_version=model_version, file=f"{model_version}.arrow")
+    if pointer is None:
+        return None, None
+
+    path = os.path.join(_dataset_dir(dataset), pointer['file'])
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None, None
+
+    path = os.path.abspath(path)
+    identity = (stat.st_ino, stat.st_mtime_ns)
+    cached = _mapped_tables.get(path)
+    if cached is None or cached[0] != identity:
+        source = pa.memory_map(path, "r")
+        table = pa.ipc.open_file(source).read_all()
+        # split_blocks lets numeric columns wrap the mapped buffers instead of
+        # being consolidated into fresh 2-D blocks
+        cached = (identity, table.to_pandas(split_blocks=True))
+        _mapped_tables[path] = cached
+    return cached[1], pointer
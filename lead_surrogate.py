@@ -0,0 +1,250 @@
+import os
+import json
+import time
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import GradientBoostingRegressor
+
+from lead_features import INTERACTION_COLS, map_probability_to_category
+from lead_model import MODEL_DIR
+from lead_inference import predict_proba_compiled
+
+# ============================================================================
+# DISTILLED WHAT-IF SCORER
+# ============================================================================
+#
+# A small gradient-boosted regressor is fitted to the production model's
+# P(converted), i.e. the model is the teacher and its probabilities the
+# labels. Training rows are real leads plus copies whose what-if inputs
+# (budget, bhk, interactions) are resampled independently, so the surrogate
+# has seen the combinations a rep can dial in. The fitted trees are flattened
+# into plain Python lists: scoring one lead is a few hundred comparisons with
+# no numpy or pandas overhead, well under a millisecond.
+
+SURROGATE_TREES = 100
+SURROGATE_DEPTH = 4
+LEARNING_RATE = 0.1
+MAX_DISTILL_ROWS = 10000
+WHAT_IF_COLS = ["budget_match", "total_interactions", "bhk"]
+
+
+def surrogate_path(version):
+    """Surrogate artifact path of a registered version (next to its pipeline)"""
+    return os.path.join(MODEL_DIR, f"model_{version}.surrogate.joblib")
+
+
+def _build_encoder(compiled, X, teacher):
+    """Numeric fills from the production preprocessor; categories ranked by mean teacher score"""
+    columns, fills, categories = [], {}, {}
+    for block in compiled['blocks']:
+        for j, col in enumerate(block['cols']):
+            columns.append(col)
+            if block['kind'] == 'num':
+                fills[col] = float(block['fill'][j])
+            else:
+                fills[col] = str(block['fill'][j])
+                # Ordering categories by the teacher's mean score lets shallow trees split them in one cut
+                values = X[col].astype(object).where(X[col].notna(), fills[col]).astype(str)
+                means = pd.Series(teacher, index=X.index).groupby(values.to_numpy()).mean().sort_values()
+                categories[col] = {value: float(rank) for rank, value in enumerate(means.index)}
+    return {'columns': columns, 'fills': fills, 'categories': categories}
+
+
+def encode_frame(encoder, X):
+    """Surrogate input matrix for a frame of engineered features"""
+    out = np.empty((len(X), len(encoder['columns'])))
+    for j, col in enumerate(encoder['columns']):
+        values = X[col] if col in X.columns else pd.Series(np.nan, index=X.index)
+        if col in encoder['categories']:
+            values = values.astype(object).where(values.notna(), encoder['fills'][col]).astype(str)
+            out[:, j] = values.map(encoder['categories'][col]).fillna(-1.0).to_numpy(dtype=float)
+        else:
+            out[:, j] = pd.to_numeric(values, errors="coerce").fillna(encoder['fills'][col]).to_numpy(dtype=float)
+    return out
+
+
+def encode_row(encoder, row):
+    """Surrogate input vector for one lead's engineered features (a dict)"""
+    x = []
+    for col in encoder['columns']:
+        value = row.get(col)
+        if value is None or value != value:
+            value = encoder['fills'][col]
+        if col in encoder['categories']:
+            x.append(encoder['categories'][col].get(str(value), -1.0))
+        else:
+            x.append(float(value))
+    return x
+
+
+def _perturb(X, rng):
+    """Copies of the leads with each what-if column resampled from its own distribution"""
+    perturbed = X.copy()
+    for col in WHAT_IF_COLS:
+        if col in perturbed.columns:
+            perturbed[col] = X[col].to_numpy()[rng.integers(0, len(X), len(X))]
+    return perturbed
+
+
+def _flatten(gbr):
+    """Per-tree node lists (feature, threshold, left, right, learning-rate-scaled value)"""
+    trees = []
+    for est in gbr.estimators_[:, 0]:
+        tree = est.tree_
+        trees.append((
+            tree.feature.tolist(),
+            tree.threshold.tolist(),
+            tree.children_left.tolist(),
+            tree.children_right.tolist(),
+            (tree.value[:, 0, 0] * gbr.learning_rate).tolist(),
+        ))
+    return trees
+
+
+def surrogate_proba(surrogate, row):
+    """P(converted) for one lead's engineered features (a dict)"""
+    x = encode_row(surrogate['encoder'], row)
+    total = surrogate['init']
+    for feature, threshold, left, right, value in surrogate['trees']:
+        node = 0
+        while left[node] >= 0:
+            node = left[node] if x[feature[node]] <= threshold[node] else right[node]
+        total += value[node]
+    return min(max(total, 0.0), 1.0)
+
+
+def surrogate_proba_frame(surrogate, X):
+    """P(converted) for a frame of leads (vectorized, for fidelity checks)"""
+    return np.clip(surrogate['model'].predict(encode_frame(surrogate['encoder'], X)), 0.0, 1.0)
+
+
+def what_if(surrogate, row, budget=None, bhk=None, interactions=None):
+    """A lead's engineered features with nudged raw inputs re-engineered the production way.
+
+    `budget` is the monthly budget midpoint, `interactions` a {column: count}
+    mapping over INTERACTION_COLS.
+    """
+    nudged = dict(row)
+    if budget is not None:
+        low, high = surrogate['budget_range']
+        nudged['budget_mid'] = budget
+        nudged['budget_match'] = 1.0 if low is None or high is None or low == high else (budget - low) / (high - low)
+    if bhk is not None:
+        nudged['bhk'] = bhk
+    if interactions is not None:
+        for col, count in interactions.items():
+            nudged[col] = count
+        nudged['total_interactions'] = float(sum(nudged.get(c) or 0 for c in INTERACTION_COLS))
+    return nudged
+
+
+def fidelity(teacher, student):
+    """How closely surrogate probabilities track the production model's"""
+    teacher_pts, student_pts = teacher * 100, student * 100
+    residual = teacher - student
+    total = np.sum((teacher - teacher.mean()) ** 2)
+    categories = (pd.Series(np.round(teacher_pts)).map(map_probability_to_category).to_numpy()
+                  == pd.Series(np.round(student_pts)).map(map_probability_to_category).to_numpy())
+    rank_corr = pd.Series(teacher).corr(pd.Series(student), method="spearman")
+    return {
+        'rows': len(teacher),
+        'mae_points': float(np.mean(np.abs(teacher_pts - student_pts))),
+        'p95_error_points': float(np.percentile(np.abs(teacher_pts - student_pts), 95)),
+        'r2': float(1 - np.sum(residual ** 2) / total) if total > 0 else None,
+        'same_category': float(np.mean(categories)),
+        'rank_correlation': None if pd.isna(rank_corr) else float(rank_corr),
+    }
+
+
+def distill(compiled, X, stats=None, n_trees=SURROGATE_TREES, depth=SURROGATE_DEPTH, seed=42):
+    """Fit a surrogate to a compiled model's scores on X; returns (surrogate, report)"""
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    sample = X.sample(min(len(X), MAX_DISTILL_ROWS), random_state=seed).reset_index(drop=True)
+    rows = pd.concat([sample, _perturb(sample, rng)], ignore_index=True)
+    teacher = predict_proba_compiled(compiled, rows)
+
+    # Fidelity is measured on leads (and perturbed copies) the surrogate never saw
+    holdout = rng.random(len(rows)) < 0.2
+    encoder = _build_encoder(compiled, rows[~holdout], teacher[~holdout])
+    gbr = GradientBoostingRegressor(
+        n_estimators=n_trees, max_depth=depth, learning_rate=LEARNING_RATE, subsample=0.8, random_state=seed
+    )
+    gbr.fit(encode_frame(encoder, rows[~holdout]), teacher[~holdout])
+
+    surrogate = {
+        'encoder': encoder,
+        'init': float(gbr.init_.constant_.ravel()[0]),
+        'trees': _flatten(gbr),
+        'model': gbr,
+        'budget_range': ((stats or {}).get('budget_min'), (stats or {}).get('budget_max')),
+    }
+    fit_sec = time.perf_counter() - start
+
+    student = surrogate_proba_frame(surrogate, rows[holdout])
+    perturbed = holdout & (np.arange(len(rows)) >= len(sample))
+    report = {
+        'trees': n_trees,
+        'depth': depth,
+        'fit_sec': fit_sec,
+        'fidelity': fidelity(teacher[holdout], student),
+        'fidelity_what_if': fidelity(teacher[perturbed], surrogate_proba_frame(surrogate, rows[perturbed])),
+    }
+    report.update(benchmark_surrogate(surrogate, compiled, rows[holdout].head(200)))
+    surrogate['report'] = report
+    return surrogate, report
+
+
+def benchmark_surrogate(surrogate, compiled, X):
+    """Single-lead latency of the surrogate next to the compiled production model"""
+    records = X.to_dict("records")
+    start = time.perf_counter()
+    for record in records:
+        surrogate_proba(surrogate, record)
+    surrogate_us = (time.perf_counter() - start) / len(records) * 1e6
+
+    start = time.perf_counter()
+    for i in range(len(X)):
+        predict_proba_compiled(compiled, X.iloc[[i]])
+    compiled_us = (time.perf_counter() - start) / len(X) * 1e6
+    return {'surrogate_single_us': surrogate_us, 'compiled_single_us': compiled_us}
+
+
+def save_surrogate(surrogate, version):
+    """Write a version's surrogate under a temporary name, then rename"""
+    path = surrogate_path(version)
+    joblib.dump(surrogate, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+    return path
+
+
+def load_surrogate(version):
+    """A version's saved surrogate, or None"""
+    path = surrogate_path(version)
+    return joblib.load(path) if os.path.exists(path) else None
+
+
+if __name__ == "__main__":
+    from lead_featstore import engineer_features_cached
+    from lead_compact import load_compiled_model
+    from lead_io import read_leads
+
+    parser = argparse.ArgumentParser(description="Distil a what-if surrogate from a registered model")
+    parser.add_argument("data", help="Leads to distil on")
+    parser.add_argument("--model-version", default=None, help="Registered version (default: production)")
+    parser.add_argument("--trees", type=int, default=SURROGATE_TREES)
+    parser.add_argument("--depth", type=int, default=SURROGATE_DEPTH)
+
+    args = parser.parse_args()
+    entry, compiled = load_compiled_model(args.model_version)
+    if entry is None:
+        raise SystemExit(f"No registered model found (version={args.model_version or 'production'})")
+
+    df = read_leads(args.data)
+    engineer_features_cached(df, entry['feature_stats'])
+    surrogate, report = distill(compiled, df[entry['features']], entry['feature_stats'], args.trees, args.depth)
+    save_surrogate(surrogate, entry['version'])
+    print(json.dumps(report, indent=2))
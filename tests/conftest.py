@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The lead_* modules live at the repository root, next to the Streamlit app
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pytest
+from sklearn.model_selection import train_test_split
+
+from lead_compact import (LEAF_LEVELS, compact_forest, compact_model, holdout_metrics, load_compact,
+                          save_compact, split_holdout)
+from lead_features import engineer_features, build_target, pseudo_labels
+from lead_inference import compile_pipeline, predict_proba_compiled
+from lead_io import read_leads
+from lead_model import build_pipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKBOOKS = ["5000_rental_crm_leads.xlsx", "final_lead_scores.xlsx"]
+
+
+@pytest.fixture(scope="module", params=WORKBOOKS)
+def trained(request):
+    """(compiled, X_test, y_test) for a forest trained on three quarters of a bundled workbook"""
+    df = read_leads(os.path.join(ROOT, request.param))
+    feature_cols = engineer_features(df)
+    X, y = build_target(df, df[feature_cols].copy())
+    if y is None:
+        y = pseudo_labels(X)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.25, random_state=42, stratify=y)
+    pipeline = build_pipeline(X_train, {'n_estimators': 60}, n_jobs=1).fit(X_train, y_train)
+    return compile_pipeline(pipeline), X_test, y_test
+
+
+def test_every_tree_kept_only_quantizes(trained):
+    compiled, X, _ = trained
+    compact = compact_forest(compiled, np.arange(len(compiled['roots'])))
+    diff = np.abs(predict_proba_compiled(compact, X) - predict_proba_compiled(compiled, X))
+    # Each leaf rounds to the nearest 1/255, so neither a tree nor their mean moves further
+    assert diff.max() <= 0.5 / LEAF_LEVELS + 1e-12
+
+
+def test_saved_artifact_scores_identically(trained, tmp_path):
+    compiled, X, y = trained
+    compact, _ = compact_model(compiled, X, y)
+    path = str(tmp_path / "model.compact.joblib")
+    save_compact(compact, path)
+    loaded = load_compact(path)
+    assert np.array_equal(predict_proba_compiled(loaded, X), predict_proba_compiled(compact, X))
+    assert np.array_equal(predict_proba_compiled(loaded, X.iloc[[3]]), predict_proba_compiled(compact, X.iloc[[3]]))
+
+
+def test_report_matches_compact_scores(trained):
+    compiled, X, y = trained
+    X_select, X_eval, y_select, y_eval = split_holdout(X, y)
+    assert not set(X_select.index) & set(X_eval.index)
+    assert len(X_select) + len(X_eval) == len(X)
+
+    compact, report = compact_model(compiled, X_select, y_select)
+    assert report['trees_after'] <= report['trees_before']
+    _, auc_select = holdout_metrics(compact, X_select, y_select)
+    assert auc_select == pytest.approx(report['auc_after'])
+
+    accuracy, auc = holdout_metrics(compact, X_eval, y_eval)
+    proba = predict_proba_compiled(compact, X_eval)
+    assert accuracy == pytest.approx(np.mean((proba > 0.5) == np.asarray(y_eval)))
+    assert 0.5 < auc <= 1.0
+
+
+def test_small_holdout_is_not_split(trained):
+    _, X, y = trained
+    X_select, X_eval, _, _ = split_holdout(X.head(30), y.head(30))
+    assert X_select is X_eval
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from lead_cube import OTHER, build_cube, cube_frame
+
+
+def _scored(n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    score = rng.integers(0, 100, n)
+    return pd.DataFrame({
+        'source': rng.choice(["Website", "Facebook", "Referral", None], n),
+        'preferred_area': rng.integers(0, 80, n).astype(str),
+        'bhk': rng.integers(1, 5, n),
+        'user_type': rng.choice(["Family", "Bachelor", "Student"], n),
+        'move_in_time': rng.integers(0, 30, n).astype(str),
+        'lead_score': score,
+        'lead_category': np.where(score >= 70, "Hot", np.where(score >= 40, "Warm", "Cold")),
+    })
+
+
+def test_drilldown_matches_groupby():
+    df = _scored()
+    table = cube_frame(build_cube(df), ['user_type'], where={'bhk': [2, 3]})
+    subset = df[df['bhk'].isin([2, 3])]
+    expected = subset.groupby('user_type')['lead_score'].agg(['count', 'mean'])
+    for user_type, row in expected.iterrows():
+        assert table.loc[user_type, 'Count'] == row['count']
+        assert table.loc[user_type, 'Avg Score'] == round(row['mean'], 2)
+        assert table.loc[user_type, 'Hot Leads'] == (subset[subset['user_type'] == user_type]['lead_category'] == "Hot").sum()
+
+
+def test_cell_cap_folds_rare_members():
+    df = _scored()
+    cube = build_cube(df, max_cells=20_000)
+    assert cube['count'].size <= 20_000
+    assert OTHER in cube['members']['preferred_area']
+    # Folding only merges cells, so totals per kept dimension are unchanged
+    assert cube['count'].sum() == len(df)
+    by_source = cube_frame(cube, ['source'])['Count']
+    assert by_source.to_dict() == df['source'].fillna("(missing)").value_counts().to_dict()
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from lead_dates import parse_datetimes, parse_source_datetimes, save_formats, cached_formats
+from lead_schema import load_leads, header_fingerprint
+
+
+@pytest.fixture(autouse=True)
+def scratch_db(tmp_path, monkeypatch):
+    """The format cache lives in lead_scoring.db in the working directory"""
+    monkeypatch.chdir(tmp_path)
+
+
+def test_cached_format_loses_to_better_detection():
+    parsed, report = parse_datetimes(pd.Series(["03/04/2025", "12/25/2025"]), ["%d/%m/%Y"])
+    assert parsed.tolist() == [pd.Timestamp("2025-03-04"), pd.Timestamp("2025-12-25")]
+    assert report['formats'] == ["%m/%d/%Y"]
+
+
+def test_cached_format_wins_ties():
+    values = pd.Series(["03/04/2025", "05/06/2025"])
+    assert parse_datetimes(values, ["%m/%d/%Y"])[0].tolist() == [pd.Timestamp("2025-03-04"), pd.Timestamp("2025-05-06")]
+    assert parse_datetimes(values)[0].tolist() == [pd.Timestamp("2025-04-03"), pd.Timestamp("2025-06-05")]
+
+
+def test_day_month_swap_is_ambiguous():
+    parsed, report = parse_datetimes(pd.Series(["25/12/2025", "12/25/2025", "03/04/2025", "soon"]))
+    assert report['formats'] == ["%d/%m/%Y"]
+    assert parsed[0] == pd.Timestamp("2025-12-25") and parsed[2] == pd.Timestamp("2025-04-03")
+    assert pd.isna(parsed[1])
+    assert report['ambiguous'] == 1 and report['ambiguous_rows'] == [1]
+    assert report['failed'] == 1 and report['failed_rows'] == [3]
+
+
+def test_cache_never_holds_a_swap():
+    save_formats("layout", "last_active_time", ["%d/%m/%Y"])
+    parse_source_datetimes(pd.Series(["03/04/2025", "12/25/2025"]), "layout", "last_active_time")
+    assert cached_formats("layout", "last_active_time") == ["%m/%d/%Y"]
+
+
+def test_load_cache_keyed_by_headers_not_file_name(tmp_path):
+    columns = ["lead_id", "budget_min", "budget_max", "last_active_time"]
+    for folder, dates in [("east", ["25/12/2025", "13/01/2025"]), ("west", ["03/04/2025", "12/25/2025"])]:
+        (tmp_path / folder).mkdir()
+        pd.DataFrame({'lead_id': [1, 2], 'budget_min': [10000, 12000], 'budget_max': [15000, 18000],
+                      'last_active_time': dates}).to_csv(tmp_path / folder / "leads.csv", index=False)
+
+    east = load_leads(str(tmp_path / "east" / "leads.csv"))
+    west = load_leads(str(tmp_path / "west" / "leads.csv"))
+    assert east['last_active_time'].tolist() == [pd.Timestamp("2025-12-25"), pd.Timestamp("2025-01-13")]
+    assert west['last_active_time'].tolist() == [pd.Timestamp("2025-03-04"), pd.Timestamp("2025-12-25")]
+    assert cached_formats(header_fingerprint(columns), "last_active_time") == ["%m/%d/%Y"]
@@ -0,0 +1,38 @@
+import pandas as pd
+
+from lead_dedup import dedupe_leads, find_duplicates
+
+
+def test_nameless_lead_does_not_bridge_people():
+    df = pd.DataFrame({
+        'lead_id': [1, 2, 3, 4],
+        'name': ["Amit", "amit", "Riya", None],
+        'phone': ["98765 43210", "+91-9876543210", "9876543210", "(987) 654-3210"],
+    })
+    deduped, report = dedupe_leads(df)
+    assert deduped['lead_id'].tolist() == [1, 3, 4]
+    assert deduped['merged_lead_ids'].tolist() == ["1;2", "", ""]
+    assert report['duplicates_merged'] == 1
+
+
+def test_nameless_lead_attaches_to_single_person():
+    df = pd.DataFrame({
+        'lead_id': [1, 2, 3],
+        'name': [None, "Kiran Rao", "kiran"],
+        'phone': ["9000000001", "90000 00001", "+91 9000000001"],
+        'views_count': [2, 3, 4],
+    })
+    deduped, _ = dedupe_leads(df)
+    assert len(deduped) == 1
+    # The named lead represents the cluster
+    assert deduped['name'].iloc[0] == "Kiran Rao"
+    assert deduped['views_count'].iloc[0] == 9
+
+
+def test_nameless_leads_on_shared_number_stay_apart_from_people():
+    df = pd.DataFrame({
+        'name': ["Amit", None, "Riya", None],
+        'phone': ["9876543210"] * 4,
+    })
+    cluster, _ = find_duplicates(df)
+    assert cluster.tolist() == [0, 1, 2, 1]
@@ -0,0 +1,62 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lead_history import MISSING, load_history, lead_history, record_run
+
+
+@pytest.fixture(autouse=True)
+def scratch_dir(tmp_path, monkeypatch):
+    """The history store and its run table live in the working directory"""
+    monkeypatch.chdir(tmp_path)
+
+
+def _run(seed, n=300):
+    rng = np.random.default_rng(seed)
+    score = rng.integers(0, 100, n).astype(float)
+    return pd.DataFrame({
+        'lead_id': rng.choice(400, n, replace=False),
+        'lead_score': score,
+        'lead_category': np.where(score >= 70, "Hot", np.where(score >= 40, "Warm", "Cold")),
+    })
+
+
+def test_concurrent_runs_get_distinct_ids_and_replay_exactly():
+    frames, reports, errors = {}, [], []
+
+    def publish(worker):
+        try:
+            for k in range(3):
+                frame = _run(worker * 10 + k)
+                report = record_run("shared", frame, f"v{worker}")
+                frames[report['run_id']] = frame
+                reports.append(report)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=publish, args=(w,)) for w in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert sorted(r['run_id'] for r in reports) == list(range(12))
+    ids, runs, scores, _ = load_history("shared", last_runs=12)
+    codes = pd.Index(ids)
+    for j, run_id in enumerate(runs['run_id']):
+        expected = np.full(len(ids), MISSING, dtype=np.uint8)
+        frame = frames[run_id]
+        expected[codes.get_indexer(frame['lead_id'].astype(str))] = frame['lead_score'].astype(np.uint8)
+        assert np.array_equal(scores[:, j], expected)
+
+
+def test_unscored_lead_is_missing_not_zero():
+    frame = _run(1, n=5)
+    frame.loc[2, 'lead_score'] = np.nan
+    record_run("nan", frame)
+    history = lead_history("nan", frame.loc[2, 'lead_id'])
+    assert history['lead_score'].isna().all()
+    assert history['lead_score'].dtype == "Int64"
@@ -0,0 +1,56 @@
+import os
+
+import numpy as np
+import pytest
+
+from lead_features import engineer_features, build_target, pseudo_labels
+from lead_inference import compile_pipeline, predict_proba_compiled, predict_records
+from lead_io import read_leads
+from lead_model import build_pipeline
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKBOOKS = ["5000_rental_crm_leads.xlsx", "final_lead_scores.xlsx"]
+
+
+@pytest.fixture(scope="module", params=WORKBOOKS)
+def trained(request):
+    """(pipeline, compiled, X) for a forest trained on a bundled workbook"""
+    df = read_leads(os.path.join(ROOT, request.param))
+    feature_cols = engineer_features(df)
+    X, y = build_target(df, df[feature_cols].copy())
+    if y is None:
+        y = pseudo_labels(X)
+    # One job, so sklearn sums tree probabilities in the same order as the compiled model
+    pipeline = build_pipeline(X, {'n_estimators': 60}, n_jobs=1).fit(X, y)
+    return pipeline, compile_pipeline(pipeline), X
+
+
+def test_batch_parity(trained):
+    pipeline, compiled, X = trained
+    expected = pipeline.predict_proba(X)[:, 1]
+    assert np.array_equal(predict_proba_compiled(compiled, X), expected)
+    assert np.array_equal(predict_proba_compiled(compiled, X, n_threads=2), expected)
+
+
+def test_single_row_parity(trained):
+    pipeline, compiled, X = trained
+    for i in (0, len(X) // 2, len(X) - 1):
+        one = X.iloc[[i]]
+        assert np.array_equal(predict_proba_compiled(compiled, one), pipeline.predict_proba(one)[:, 1])
+
+
+def test_record_parity(trained):
+    pipeline, compiled, X = trained
+    rows = X.head(25)
+    records = rows.to_dict("records")
+    assert np.array_equal(predict_records(compiled, records), pipeline.predict_proba(rows)[:, 1])
+
+
+def test_unseen_and_missing_values(trained):
+    pipeline, compiled, X = trained
+    rows = X.head(4).copy()
+    rows.loc[rows.index[0], "source"] = "Billboard"
+    rows.loc[rows.index[1], "bhk"] = 17
+    rows.loc[rows.index[2], "source"] = None
+    rows.loc[rows.index[3], "engagement_score"] = np.nan
+    assert np.array_equal(predict_proba_compiled(compiled, rows), pipeline.predict_proba(rows)[:, 1])
@@ -0,0 +1,98 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from lead_ingest import ORIGIN_FILE_COL, ORIGIN_SHEET_COL, combine_parts, ingest_leads
+
+
+@pytest.fixture(autouse=True)
+def scratch_db(tmp_path, monkeypatch):
+    """load_leads caches date formats in lead_scoring.db in the working directory"""
+    monkeypatch.chdir(tmp_path)
+
+
+def parts():
+    """Parts as load_leads leaves them: the same schema columns typed differently, some missing"""
+    north = pd.DataFrame({
+        "lead_id": np.array([1, 2, 3]),
+        "name": pd.array(["Asha", "Ravi", None], dtype="str"),
+        "budget_min": np.array([20000, 25000, 30000]),
+        "bhk": np.array([1, 2, 3]),
+        "last_active_time": pd.to_datetime(["2025-01-01", None, "2025-02-01"]).as_unit("us"),
+        "agent": pd.array(["x", "y", "z"], dtype="str"),
+    })
+    south = pd.DataFrame({
+        "lead_id": pd.array(["S-1", "S-2"], dtype="str"),
+        "name": pd.array(["Mo", "Li"], dtype="str"),
+        "budget_min": np.array([18000.5, np.nan]),
+        "last_active_time": pd.to_datetime(["2025-03-01 10:00", "2025-03-02 00:00"]).as_unit("us"),
+    })
+    empty = north.iloc[:0]
+    return [north, south, empty], ["north.xlsx", "south.csv", "north.xlsx"], ["Team A", None, "Team B"]
+
+
+def test_matches_concat():
+    frames, files, sheets = parts()
+    combined = combine_parts(frames, files, sheets)
+    expected = pd.concat(frames, ignore_index=True)
+    pd.testing.assert_frame_equal(combined[expected.columns], expected, check_dtype=False)
+    assert list(combined.columns) == ["lead_id", "name", "budget_min", "bhk", "last_active_time", "agent",
+                                      ORIGIN_FILE_COL, ORIGIN_SHEET_COL]
+
+
+def test_column_types():
+    combined = combine_parts(*parts())
+    assert combined["lead_id"].dtype == object
+    assert combined["name"].dtype == "str"
+    assert combined["budget_min"].dtype == "float64"
+    # Integers in one part only turn float, with NaN for the parts without the column
+    assert combined["bhk"].dtype == "float64" and combined["bhk"].isna().tolist() == [False] * 3 + [True] * 2
+    assert combined["last_active_time"].dtype == "datetime64[us]"
+    assert combined["agent"].dtype == "str" and combined["agent"].isna().tolist() == [False] * 3 + [True] * 2
+
+
+def test_integers_stay_integers_in_every_part():
+    north = parts()[0][0]
+    combined = combine_parts([north, north], ["a.csv", "b.csv"], [None, None])
+    assert combined["lead_id"].dtype == "int64" and combined["lead_id"].tolist() == [1, 2, 3] * 2
+
+
+def test_origins():
+    combined = combine_parts(*parts())
+    assert combined[ORIGIN_FILE_COL].tolist() == ["north.xlsx"] * 3 + ["south.csv"] * 2
+    assert combined[ORIGIN_SHEET_COL].tolist()[:3] == ["Team A"] * 3
+    assert combined[ORIGIN_SHEET_COL].isna().tolist()[3:] == [True, True]
+    assert list(combined[ORIGIN_FILE_COL].cat.categories) == ["north.xlsx", "south.csv"]
+
+
+@pytest.mark.parametrize("n_workers", [1, 2])
+def test_ingest_reports_failed_parts(tmp_path, n_workers):
+    wb = openpyxl.Workbook()
+    team = wb.active
+    team.title = "Team A"
+    team.append(["lead_id", "budget_min", "budget_max"])
+    team.append([1, 20000, 30000])
+    team.append([2, 22000, 32000])
+    notes = wb.create_sheet("Notes")
+    notes.append(["remarks"])
+    notes.append(["call back on Monday"])
+    workbook = str(tmp_path / "branch.xlsx")
+    wb.save(workbook)
+    csv = str(tmp_path / "south.csv")
+    pd.DataFrame({"id": [7], "monthly_budget": [15000]}).to_csv(csv, index=False)
+
+    combined = ingest_leads([workbook, csv], n_workers=n_workers)
+    assert combined["lead_id"].tolist() == [1, 2, 7]
+    assert combined[ORIGIN_SHEET_COL].tolist()[:2] == ["Team A", "Team A"]
+    report = combined.attrs['ingest']
+    assert report['failed'] == 1 and report['rows'] == 3
+    failed = [part for part in report['parts'] if 'error' in part]
+    assert failed[0]['sheet'] == "Notes" and "no budget columns" in failed[0]['error']
+
+
+def test_ingest_fails_when_nothing_loads(tmp_path):
+    csv = str(tmp_path / "notes.csv")
+    pd.DataFrame({"remarks": ["hello"]}).to_csv(csv, index=False)
+    with pytest.raises(ValueError, match="No leads could be loaded"):
+        ingest_leads([csv], n_workers=1)
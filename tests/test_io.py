@@ -0,0 +1,85 @@
+import datetime as dt
+import os
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import lead_io
+from lead_io import read_leads, read_xlsx_stream
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKBOOKS = ["5000_rental_crm_leads.xlsx", "final_lead_scores.xlsx"]
+
+HEADER = ["lead_id", "budget", "source", "views_count", "last_active_time", "move_in", "is_verified", "name"]
+ROWS = [
+    # Budgets stored as text, a column mixing text, numbers and dates, gaps everywhere
+    [1, "25000", "Website", 12, dt.datetime(2024, 3, 1, 10, 30), dt.date(2024, 3, 1), True, "Asha"],
+    [2, "18500.5", 7, None, dt.datetime(2024, 3, 2), dt.date(2024, 1, 31), False, None],
+    [3, "40000", dt.datetime(2024, 1, 1, 0, 0, 0, 123456), 3, None, dt.date(2023, 12, 25), True, "Ravi"],
+    [4, "9000", 2.5, None, dt.datetime(2025, 1, 1, 23, 59, 59), None, None, "Mo"],
+]
+
+
+def read_excel(path, usecols=None, nrows=None):
+    return pd.read_excel(path, usecols=None if usecols is None else (lambda name: name in usecols), nrows=nrows)
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """Small workbook with the cell kinds CRM exports mix; the last lead sits below two blank rows"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.append(HEADER)
+    for row in ROWS:
+        ws.append(row)
+    ws.cell(row=3, column=6).number_format = "dd/mm/yyyy"
+    ws.cell(row=8, column=1, value=9)
+    ws.cell(row=8, column=8, value="Late Lead")
+    path = str(tmp_path / "leads.xlsx")
+    wb.save(path)
+    return path
+
+
+def test_matches_read_excel(workbook):
+    pd.testing.assert_frame_equal(read_xlsx_stream(workbook), read_excel(workbook))
+
+
+def test_cell_kinds(workbook):
+    df = read_xlsx_stream(workbook)
+    assert df["budget"].dtype == "float64"
+    assert df["source"].dtype == object
+    assert df["last_active_time"].iloc[3] == pd.Timestamp("2025-01-01 23:59:59")
+    # Booleans with gaps come back as 1.0 / 0.0, as pandas reads them
+    assert df["is_verified"].dtype == "float64"
+    assert len(df) == 7
+
+
+@pytest.mark.parametrize("usecols, nrows", [
+    (["name", "last_active_time", "not_in_file"], None),
+    (["move_in"], None),
+    (None, 2),
+    (["is_verified", "budget"], 3),
+    (None, 0),
+])
+def test_usecols_and_nrows(workbook, usecols, nrows):
+    expected = read_excel(workbook, usecols, nrows)
+    pd.testing.assert_frame_equal(read_xlsx_stream(workbook, usecols=usecols, nrows=nrows), expected)
+
+
+@pytest.mark.parametrize("name", WORKBOOKS)
+def test_bundled_workbooks(name):
+    path = os.path.join(ROOT, name)
+    pd.testing.assert_frame_equal(read_leads(path, engine="xlsx-stream"), read_leads(path, engine="openpyxl"))
+
+
+def test_falls_back_to_openpyxl(workbook, monkeypatch):
+    def broken(source, **kwargs):
+        raise ValueError("unsupported worksheet")
+
+    monkeypatch.setitem(lead_io.READERS, "xlsx-stream", broken)
+    df = read_leads(workbook, engine="xlsx-stream")
+    assert df.attrs["reader"]["engine"] == "openpyxl"
+    assert "unsupported worksheet" in df.attrs["reader"]["fallback"]
+    pd.testing.assert_frame_equal(df, read_excel(workbook))
+
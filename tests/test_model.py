@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lead_model import auto_tune, cross_validate_model
+
+
+def leads(n_positive, n=60):
+    """Engineered-feature-like frame with `n_positive` converted leads"""
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame({
+        "budget_match": rng.random(n),
+        "engagement_score": rng.random(n) * 10,
+        "source": pd.array(rng.choice(["Website", "Referral"], n), dtype="str"),
+    })
+    y = pd.Series(np.r_[np.ones(n_positive, dtype=int), np.zeros(n - n_positive, dtype=int)])
+    return X, y
+
+
+@pytest.mark.parametrize("n_positive", [0, 1])
+def test_auto_tune_skips_without_folds(tmp_path, monkeypatch, n_positive):
+    monkeypatch.chdir(tmp_path)
+    X, y = leads(n_positive)
+    tuned = auto_tune(X, y, time_budget=30, n_jobs=1)
+    assert tuned['skipped'] and tuned['history'] == []
+    assert tuned['cv_auc_mean'] is None and tuned['n_estimators'] == 200
+
+
+@pytest.mark.parametrize("n_positive", [0, 1])
+def test_cross_validation_skips_without_folds(n_positive):
+    X, y = leads(n_positive)
+    cv = cross_validate_model(X, y, {'n_estimators': 10}, n_jobs=1)
+    assert cv['skipped'] and cv['n_splits'] == 0
+    assert not [k for k in cv if k.endswith(('_mean', '_std'))]
+
+
+def test_cross_validation_caps_folds_at_minority_class():
+    X, y = leads(3)
+    cv = cross_validate_model(X, y, {'n_estimators': 10}, n_jobs=1)
+    assert cv['n_splits'] == 3 and len(cv['folds']) == 3
+    assert 'skipped' not in cv
@@ -0,0 +1,83 @@
+import os
+
+import pandas as pd
+import pytest
+
+from lead_io import read_leads
+from lead_schema import load_leads, resolve_columns
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def scratch_db(tmp_path, monkeypatch):
+    """Date formats are cached in lead_scoring.db in the working directory"""
+    monkeypatch.chdir(tmp_path)
+
+
+def write_csv(tmp_path, frame, name="export.csv"):
+    path = str(tmp_path / name)
+    frame.to_csv(path, index=False)
+    return path
+
+
+def export(n=40):
+    """A CRM export using other header spellings, with a free-text column the schema doesn't know"""
+    return pd.DataFrame({
+        "Lead No": range(1, n + 1),
+        "Customer Name": [f"Lead {i}" for i in range(n)],
+        "Min Budget": [20000 + 100 * i for i in range(n)],
+        "max-budget": [30000 + 100 * i for i in range(n)],
+        "Bedrooms": [1, 2, 3, 2] * (n // 4 - 1) + [1, 2, 3, "2 BHK"],
+        "Last Activity": ["25/12/2025 10:00", "03/04/2025 09:30"] * (n // 2),
+        "Agent Notes": ["called twice, wants a balcony"] * n,
+    })
+
+
+def test_loads_only_schema_columns(tmp_path):
+    df = load_leads(write_csv(tmp_path, export()))
+    assert list(df.columns) == ["lead_id", "name", "budget_min", "budget_max", "bhk", "last_active_time"]
+    report = df.attrs['schema']
+    assert report['skipped'] == ["Agent Notes"]
+    assert report['renamed']["Min Budget"] == "budget_min"
+    assert report['rows'] == 40 and report['cells_skipped'] == 40
+
+
+def test_converts_and_counts_bad_values(tmp_path):
+    df = load_leads(write_csv(tmp_path, export()))
+    assert pd.api.types.is_numeric_dtype(df["bhk"])
+    assert df["bhk"].isna().sum() == 1
+    assert df.attrs['schema']['coerced'] == {"bhk": 1}
+    # 25/12 only reads day first, so 03/04 is the 3rd of April
+    assert df["last_active_time"].iloc[:2].tolist() == [pd.Timestamp("2025-12-25 10:00"), pd.Timestamp("2025-04-03 09:30")]
+    assert df.attrs['schema']['datetimes']["last_active_time"]['formats'] == ["%d/%m/%Y %H:%M"]
+
+
+def test_single_budget_column_is_enough(tmp_path):
+    frame = export().drop(columns=["Min Budget", "max-budget"]).assign(**{"Rent Budget": 25000})
+    assert "budget" in load_leads(write_csv(tmp_path, frame)).columns
+
+
+def test_rejects_file_without_budget(tmp_path):
+    frame = export().drop(columns=["Min Budget"])
+    with pytest.raises(ValueError, match="no budget columns"):
+        load_leads(write_csv(tmp_path, frame))
+
+
+def test_rejects_text_in_numeric_column(tmp_path):
+    frame = export().assign(**{"Min Budget": "ask"})
+    with pytest.raises(ValueError, match="'budget_min' is not numeric"):
+        load_leads(write_csv(tmp_path, frame))
+
+
+def test_first_spelling_wins():
+    assert resolve_columns(["Mobile", "phone", "Area", "location"]) == {"Mobile": "phone", "Area": "preferred_area"}
+
+
+def test_matches_full_read_of_bundled_workbook():
+    path = os.path.join(ROOT, "5000_rental_crm_leads.xlsx")
+    df = load_leads(path)
+    full = read_leads(path)
+    assert len(df) == len(full)
+    for column in ["lead_id", "budget_min", "budget_max", "bhk", "preferred_area"]:
+        assert df[column].tolist() == full[column].tolist()
@@ -0,0 +1,53 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from lead_features import engineer_features, feature_stats
+from lead_inference import compile_pipeline
+from lead_io import read_leads
+from lead_model import build_pipeline
+from lead_service import score_leads
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FULL_LEAD = {
+    'lead_id': 1, 'source': 'Website', 'budget_min': 15000, 'budget_max': 25000, 'preferred_area': 'Andheri',
+    'bhk': 2, 'views_count': 12, 'saved_properties': 3, 'call_clicks': 2, 'last_active_time': '2025-01-10',
+}
+SPARSE_LEAD = {'lead_id': 2, 'source': 'Facebook', 'bhk': 3}
+
+
+@pytest.fixture(scope="module")
+def model():
+    """(version, features, stats, compiled) trained on the bundled workbook, with activity dates.
+
+    Labels follow budget_match, so a lead scored with an imputed budget
+    instead of the budget-less 0.5 lands on the other side of the split.
+    """
+    df = read_leads(os.path.join(ROOT, "5000_rental_crm_leads.xlsx"))
+    days = np.random.default_rng(0).integers(0, 60, len(df))
+    df["last_active_time"] = pd.Timestamp("2025-01-15") - pd.to_timedelta(days, unit="D")
+    stats = feature_stats(df)
+    features = engineer_features(df, stats)
+    X = df[features]
+    y = (X['budget_match'] < 0.45).astype(int)
+    pipeline = build_pipeline(X, {'n_estimators': 40}, n_jobs=1).fit(X, y)
+    return 'test', features, stats, compile_pipeline(pipeline)
+
+
+def test_score_independent_of_batch(model):
+    alone = score_leads(model, [SPARSE_LEAD])[0]['lead_score']
+    for batch in ([FULL_LEAD, SPARSE_LEAD], [SPARSE_LEAD, FULL_LEAD, dict(FULL_LEAD, lead_id=3)]):
+        scores = {r['lead_id']: r['lead_score'] for r in score_leads(model, batch)}
+        assert scores[2] == alone
+    assert score_leads(model, [FULL_LEAD])[0]['lead_score'] == score_leads(model, [SPARSE_LEAD, FULL_LEAD])[1]['lead_score']
+
+
+def test_single_budget_matches_range(model):
+    ranged = dict(SPARSE_LEAD, budget_min=20000, budget_max=20000)
+    single = dict(SPARSE_LEAD, budget=20000)
+    expected = score_leads(model, [ranged])[0]['lead_score']
+    assert score_leads(model, [single])[0]['lead_score'] == expected
+    assert score_leads(model, [FULL_LEAD, single])[1]['lead_score'] == expected